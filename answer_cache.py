@@ -0,0 +1,196 @@
+"""
+Answer Cache
+
+Two-tier in-memory cache for LennyRAG.ask results:
+1. Exact tier: normalized query text + scope
+2. Semantic tier: a cached answer whose query embedding is within a cosine
+   similarity threshold of the new query's embedding, in the same scope
+
+The scope is n_results, plus the search filters if any (see
+rag_system.answer_scope): answers are never shared between different
+retrieval settings.
+
+Entries expire after a TTL, the least recently used ones are evicted past
+max_entries, and everything is dropped when the collection version changes
+(i.e. after re-ingestion).
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from embedding_cache import normalize_text
+
+DEFAULT_TTL = float(os.getenv("LENNY_ANSWER_CACHE_TTL", str(24 * 3600)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("LENNY_ANSWER_CACHE_SIZE", "1000"))
+DEFAULT_THRESHOLD = float(os.getenv("LENNY_ANSWER_CACHE_THRESHOLD", "0.95"))
+
+
+Scope = Union[int, str]
+
+
+def query_key(query: str, scope: Scope) -> str:
+    """Exact-tier key: case- and whitespace-insensitive query plus scope"""
+    return f"{scope}:{normalize_text(query).lower()}"
+
+
+class AnswerCache:
+    """LRU + TTL answer cache with an exact and a semantic (embedding) tier"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL,
+                 threshold: float = DEFAULT_THRESHOLD):
+        """
+        Args:
+            max_entries: Answers kept before LRU eviction (0 disables the cache)
+            ttl: Seconds an answer stays valid
+            threshold: Minimum cosine similarity for a semantic hit
+                (above 1.0 disables the semantic tier)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.version = None
+
+        # key -> (slot, scope, created, result); order is recency
+        self._entries: "OrderedDict[str, Tuple[int, Scope, float, Dict]]" = OrderedDict()
+        # Query embeddings live in a fixed matrix so a semantic lookup is one matmul
+        self._vectors: Optional[np.ndarray] = None
+        self._slot_keys: List[Optional[str]] = [None] * max_entries
+        # Scope of each slot as a small integer code, so lookups can mask in NumPy
+        self._scope_codes: Dict[Scope, int] = {}
+        self._slot_scopes = np.full(max_entries, -1, dtype=np.int64)
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def set_version(self, version: str):
+        """Record the collection version, clearing the cache if it changed"""
+        with self._lock:
+            if self.version is not None and version != self.version and self._entries:
+                self._clear()
+                self.invalidations += 1
+            self.version = version
+
+    def get_exact(self, query: str, scope: Scope) -> Optional[Dict]:
+        """Cached result for the same normalized query, if any (counts a hit only)"""
+        if not self.enabled:
+            return None
+        key = query_key(query, scope)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expire(key, entry):
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry[3]
+
+    def get_similar(self, embedding: List[float], scope: Scope) -> Optional[Dict]:
+        """Cached result for the most similar cached query above the threshold"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._vectors is None or not self._entries or self.threshold > 1.0:
+                self.misses += 1
+                return None
+            code = self._scope_codes.get(scope)
+            if code is None:
+                self.misses += 1
+                return None
+            query = self._normalize(embedding)
+            scores = self._vectors @ query
+            scores[self._slot_scopes != code] = -np.inf
+            # Best candidates first; expired ones are dropped as we go
+            for slot in np.argsort(-scores)[:8]:
+                if scores[slot] < self.threshold:
+                    break
+                key = self._slot_keys[slot]
+                entry = self._entries[key]
+                if self._expire(key, entry):
+                    continue
+                self._entries.move_to_end(key)
+                self.semantic_hits += 1
+                return entry[3]
+            self.misses += 1
+            return None
+
+    def put(self, query: str, scope: Scope, embedding: Optional[List[float]], result: Dict):
+        """Cache a result; embedding enables semantic hits for it"""
+        if not self.enabled:
+            return
+        key = query_key(query, scope)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+            slot = self._free_slots.pop()
+            if embedding is not None:
+                if self._vectors is None:
+                    self._vectors = np.zeros((self.max_entries, len(embedding)), dtype=np.float32)
+                self._vectors[slot] = self._normalize(embedding)
+                self._slot_scopes[slot] = self._scope_codes.setdefault(scope, len(self._scope_codes))
+            self._slot_keys[slot] = key
+            self._entries[key] = (slot, scope, time.time(), result)
+
+    def _normalize(self, embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, key: str, entry: Tuple) -> bool:
+        """Drop the entry if it outlived the TTL (caller holds the lock)"""
+        if time.time() - entry[2] <= self.ttl:
+            return False
+        self._remove(key)
+        self.expirations += 1
+        return True
+
+    def _remove(self, key: str):
+        slot = self._entries.pop(key)[0]
+        self._slot_keys[slot] = None
+        self._slot_scopes[slot] = -1
+        self._free_slots.append(slot)
+
+    def _clear(self):
+        for key in list(self._entries):
+            self._remove(key)
+        self._scope_codes.clear()
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {
+            'exact_hits': self.exact_hits,
+            'semantic_hits': self.semantic_hits,
+            'misses': self.misses,
+            'hit_rate': hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'entries': len(self),
+            'max_entries': self.max_entries
+        }
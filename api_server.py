@@ -0,0 +1,259 @@
+"""
+Ask Lenny HTTP API
+
+JSON API over AsyncLennyRAG for other services and load-balanced serving,
+independent of the Streamlit UI:
+
+    GET  /health       liveness: the process is up
+    GET  /ready        readiness: 200 once the engine and indexes are loaded
+    GET  /stats        cache and concurrency counters
+    GET  /metrics      stage latency histograms, token, cache and error
+                       counters (Prometheus text format, per worker)
+    POST /search       {"query", "n_results", "filters"} -> retrieved chunks
+    POST /ask          {"query", "n_results", "filters"} -> answer, citations, chunks
+    POST /ask/stream   same body; newline-delimited JSON events
+                       ('sources', 'token'..., 'done')
+    POST /export       an /ask result, or {"query", "n_results", "filters"}
+                       -> markdown
+
+"filters" is optional and restricts the sources by "guest", publish date
+("date_from"/"date_to": YYYY, YYYY-MM or YYYY-MM-DD) and episode
+"keywords", e.g. 2024 episodes tagged monetization:
+{"date_from": "2024", "date_to": "2024", "keywords": ["monetization"]}
+
+Each worker process loads one engine in the background at startup, so
+/health answers immediately and /ready flips once it is warm.
+
+Usage:
+    python api_server.py --port 8000 --workers 4
+    uvicorn api_server:app --workers 4
+"""
+
+import os
+import json
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from metadata_filters import SearchFilter
+from instrumentation import METRICS
+
+MAX_RESULTS = 50
+
+
+class EngineState:
+    """The worker's shared engine and its loading status"""
+
+    def __init__(self):
+        self.rag = None
+        self.error = None
+        self.task = None
+
+    @property
+    def ready(self) -> bool:
+        return self.rag is not None
+
+    async def load(self):
+        try:
+            from rag_system import LennyRAG
+            from async_rag import AsyncLennyRAG
+
+            # Loading touches disk and the network; keep the loop responsive
+            sync_rag = await asyncio.to_thread(LennyRAG)
+            await asyncio.to_thread(sync_rag.warm_up)
+            self.rag = AsyncLennyRAG(sync_rag)
+        except Exception as e:
+            self.error = f"{e.__class__.__name__}: {e}"
+            print(f"❌ Engine failed to load: {self.error}")
+
+
+engine = EngineState()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    engine.task = asyncio.create_task(engine.load())
+    yield
+    if engine.rag is not None:
+        await engine.rag.close()
+
+
+def error(status: int, message: str) -> JSONResponse:
+    return JSONResponse({'error': message}, status_code=status)
+
+
+async def parse_query(request: Request) -> Tuple[str, int, Optional[SearchFilter]]:
+    """Validated (query, n_results, filters) from a JSON body; raises ValueError"""
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise ValueError("Body must be JSON")
+    if not isinstance(body, dict):
+        raise ValueError("Body must be a JSON object")
+    query = body.get('query')
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("'query' must be a non-empty string")
+    n_results = body.get('n_results', 10)
+    if not isinstance(n_results, int) or not 1 <= n_results <= MAX_RESULTS:
+        raise ValueError(f"'n_results' must be an integer between 1 and {MAX_RESULTS}")
+    return query.strip(), n_results, SearchFilter.from_dict(body.get('filters'))
+
+
+ASK_RESULT_FIELDS = ('query', 'answer', 'citations', 'n_sources')
+CITATION_FIELDS = ('guest', 'title', 'youtube_url', 'text_snippet')
+
+
+def parse_ask_result(body: Dict) -> Dict:
+    """Validated /ask result to export; raises ValueError"""
+    for field in ('query', 'answer'):
+        if not isinstance(body[field], str):
+            raise ValueError(f"'{field}' must be a string")
+    if not isinstance(body['n_sources'], int):
+        raise ValueError("'n_sources' must be an integer")
+    if not isinstance(body['citations'], list):
+        raise ValueError("'citations' must be a list")
+    for i, citation in enumerate(body['citations']):
+        if not isinstance(citation, dict):
+            raise ValueError(f"citations[{i}] must be an object")
+        for field in CITATION_FIELDS:
+            if not isinstance(citation.get(field), str):
+                raise ValueError(f"citations[{i}].{field} must be a string")
+    return body
+
+
+def not_ready() -> JSONResponse:
+    if engine.error:
+        return error(503, f"Engine failed to load: {engine.error}")
+    return error(503, "Engine is still loading")
+
+
+async def health(request: Request) -> JSONResponse:
+    return JSONResponse({'status': 'ok'})
+
+
+async def ready(request: Request) -> JSONResponse:
+    if not engine.ready:
+        return JSONResponse({'ready': False, 'error': engine.error}, status_code=503)
+    rag = engine.rag.rag
+    return JSONResponse({
+        'ready': True,
+        'chunks': await asyncio.to_thread(rag.collection.count),
+        'retriever': rag.retriever,
+        'snapshot': rag.snapshot,
+        'vector_index': rag.index.count if rag.index is not None else None,
+        'bm25_index': rag.bm25.count if rag.bm25 is not None else None,
+        'episode_index': rag.episode_index.count if rag.episode_index is not None else None
+    })
+
+
+async def stats(request: Request) -> JSONResponse:
+    if not engine.ready:
+        return not_ready()
+    return JSONResponse({
+        'engine': engine.rag.stats(),
+        'answer_cache': engine.rag.rag.answer_cache.stats(),
+        'query_embeddings': engine.rag.rag.query_embedder.stats(),
+        'metrics': METRICS.snapshot()
+    })
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(METRICS.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+async def search(request: Request) -> JSONResponse:
+    if not engine.ready:
+        return not_ready()
+    try:
+        query, n_results, filters = await parse_query(request)
+    except ValueError as e:
+        return error(400, str(e))
+    async with engine.rag.semaphore:
+        return JSONResponse(await engine.rag.search(query, n_results, filters=filters))
+
+
+async def ask(request: Request) -> JSONResponse:
+    if not engine.ready:
+        return not_ready()
+    try:
+        query, n_results, filters = await parse_query(request)
+    except ValueError as e:
+        return error(400, str(e))
+    return JSONResponse(await engine.rag.ask(query, n_results, filters))
+
+
+async def ask_stream(request: Request) -> StreamingResponse:
+    if not engine.ready:
+        return not_ready()
+    try:
+        query, n_results, filters = await parse_query(request)
+    except ValueError as e:
+        return error(400, str(e))
+
+    async def events():
+        try:
+            async for event in engine.rag.ask_stream(query, n_results, filters):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            yield json.dumps({'type': 'error', 'error': str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def export(request: Request) -> PlainTextResponse:
+    if not engine.ready:
+        return not_ready()
+    try:
+        body: Dict = await request.json()
+    except json.JSONDecodeError:
+        return error(400, "Body must be JSON")
+    if isinstance(body, dict) and set(ASK_RESULT_FIELDS) <= body.keys():
+        try:
+            result = parse_ask_result(body)
+        except ValueError as e:
+            return error(400, f"Invalid /ask result: {e}")
+    else:
+        try:
+            query, n_results, filters = await parse_query(request)
+        except ValueError as e:
+            return error(400, f"Expected an /ask result or a query: {e}")
+        result = await engine.rag.ask(query, n_results, filters)
+    return PlainTextResponse(engine.rag.rag.export_to_markdown(result), media_type="text/markdown")
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/ready", ready),
+        Route("/stats", stats),
+        Route("/metrics", metrics),
+        Route("/search", search, methods=["POST"]),
+        Route("/ask", ask, methods=["POST"]),
+        Route("/ask/stream", ask_stream, methods=["POST"]),
+        Route("/export", export, methods=["POST"]),
+    ],
+    lifespan=lifespan
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ask Lenny HTTP API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="Worker processes, each with its own engine")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ A simple chat interface to query Lenny's Podcast transcripts
 """
 
 import streamlit as st
-from rag_system import LennyRAG
+from engine_loader import EngineLoader, FAST_START
 import os
 from pathlib import Path
 
@@ -46,14 +46,27 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'rag' not in st.session_state:
-    try:
-        st.session_state.rag = LennyRAG()
-        st.session_state.ready = True
-    except Exception as e:
-        st.session_state.ready = False
-        st.session_state.error = str(e)
+@st.cache_resource(show_spinner=False)
+def get_loader() -> EngineLoader:
+    """
+    One RAG engine per server process, shared by every browser session
+
+    LennyRAG is safe to use from concurrent script runs, so sessions share
+    its ChromaDB client, OpenAI connection pool, indexes and answer cache.
+    It loads in a background thread (see engine_loader.py), so this
+    returns immediately.
+    """
+    return EngineLoader().start()
+
+# Shared engine; per-session state is only the query history
+loader = get_loader()
+if not FAST_START:
+    with st.spinner("🔥 Loading the transcript index..."):
+        loader.wait()
+if loader.error:
+    # Failures are not cached, so the next page load retries
+    get_loader.clear()
+rag = loader.rag
 
 if 'history' not in st.session_state:
     st.session_state.history = []
@@ -63,19 +76,34 @@ st.markdown('<div class="main-header">🎙️ Ask Lenny</div>', unsafe_allow_htm
 st.markdown('<div class="sub-header">Query 269 episodes of Lenny\'s Podcast with citations</div>', unsafe_allow_html=True)
 
 # Check if system is ready
-if not st.session_state.ready:
+if loader.error:
     st.error("❌ RAG system not initialized!")
-    st.error(f"Error: {st.session_state.error}")
+    st.error(f"Error: {loader.error}")
     st.info("💡 Make sure you've run: `python ingest_transcripts.py`")
     st.stop()
 
+if not loader.ready:
+    @st.fragment(run_every=1.0)
+    def warming_up():
+        """Progress until the engine is in, then the full page"""
+        if loader.ready or loader.error:
+            st.rerun()
+        st.info(f"🔥 Warming up: {loader.phase}... ({loader.elapsed:.0f}s)")
+        st.caption("The page will switch to the search box as soon as the transcript index is loaded.")
+
+    warming_up()
+    st.stop()
+
+from metadata_filters import SearchFilter  # Loaded by the engine by now
+
 # Sidebar
 with st.sidebar:
     st.header("📊 System Info")
     
-    collection_size = st.session_state.rag.collection.count()
+    collection_size = rag.collection.count()
     st.metric("Total Chunks", f"{collection_size:,}")
     st.metric("Episodes", "269")
+    st.caption(f"⚡ Ready {loader.timings['ready_s']:.1f}s after start")
     
     st.divider()
     
@@ -99,6 +127,20 @@ with st.sidebar:
     
     st.header("⚙️ Settings")
     n_results = st.slider("Number of sources", 5, 20, 10)
+    show_timing = st.checkbox("Show timing breakdown", value=False)
+    
+    st.header("🔎 Filters")
+    options = rag.filter_options()
+    guest = st.selectbox("Guest", ["Any guest"] + options['guests'])
+    years = options['years']
+    year_range = st.select_slider("Published", years, value=(years[0], years[-1])) if len(years) > 1 else None
+    keywords = st.multiselect("Episode keywords (all must match)", options['keywords'])
+    filters = SearchFilter(
+        guest=None if guest == "Any guest" else guest,
+        date_from=str(year_range[0]) if year_range and year_range[0] != years[0] else None,
+        date_to=str(year_range[1]) if year_range and year_range[1] != years[-1] else None,
+        keywords=keywords
+    )
     
     st.divider()
     
@@ -124,14 +166,28 @@ with col1:
     search_button = st.button("🔍 Search", type="primary", use_container_width=True)
     
     if search_button and query:
-        with st.spinner("🔍 Searching 269 episodes..."):
-            try:
-                result = st.session_state.rag.ask(query, n_results=n_results)
-                st.session_state.history.insert(0, result)
-                st.session_state.current_query = ""
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Error: {e}")
+        # Show sources as soon as retrieval finishes, then the answer as it streams
+        status = st.empty()
+        answer_box = st.empty()
+        status.caption("🔍 Searching 269 episodes...")
+        try:
+            answer = ""
+            result = None
+            for event in rag.ask_stream(query, n_results=n_results, filters=filters or None):
+                if event['type'] == 'sources':
+                    guests = ", ".join(dict.fromkeys(c['guest'] for c in event['citations'][:3]))
+                    status.caption(f"📚 Found {event['n_sources']} excerpts ({guests}), writing answer...")
+                elif event['type'] == 'token':
+                    answer += event['text']
+                    answer_box.markdown(answer + "▌")
+                else:
+                    result = event['result']
+            st.session_state.history.insert(0, result)
+            loader.record_answer()
+            st.session_state.current_query = ""
+            st.rerun()
+        except Exception as e:
+            st.error(f"❌ Error: {e}")
 
 # Display results
 if st.session_state.history:
@@ -146,7 +202,7 @@ if st.session_state.history:
     # Export button
     col1, col2, col3 = st.columns([1, 1, 2])
     with col1:
-        markdown_export = st.session_state.rag.export_to_markdown(result)
+        markdown_export = rag.export_to_markdown(result)
         st.download_button(
             "📥 Export Markdown",
             markdown_export,
@@ -162,7 +218,10 @@ if st.session_state.history:
     
     # Citations
     st.header("📚 Sources")
-    st.caption(f"Based on {result['n_sources']} relevant transcript excerpts")
+    caption = f"Based on {result['n_sources']} relevant transcript excerpts"
+    if result.get('cache_hit'):
+        caption += f" · ⚡ answered from cache ({result['cache_hit']} match)"
+    st.caption(caption)
     
     for i, citation in enumerate(result['citations']):
         with st.expander(f"**{i+1}. {citation['guest']}** - {citation['title'][:60]}..."):
@@ -173,6 +232,26 @@ if st.session_state.history:
             
             st.markdown("**Excerpt:**")
             st.info(citation['text_snippet'])
+    
+    # Debug panel: where this query's time went
+    trace = result.get('trace')
+    if show_timing and trace:
+        st.divider()
+        st.header("⏱️ Timing Breakdown")
+        st.caption(f"{trace['total_ms']:.0f} ms end to end · trace {trace['trace_id'][:12]}"
+                   + (f" · ❌ {trace['error']}" if trace['error'] else ""))
+        st.dataframe(
+            [{
+                'stage': "\u2003" * (stage['depth'] - 1) + stage['name'],
+                'ms': round(stage['ms'], 1),
+                'calls': stage['count'],
+                '% of total': round(100 * stage['ms'] / trace['total_ms'], 1) if trace['total_ms'] else 0.0
+            } for stage in trace['stages']],
+            hide_index=True,
+            use_container_width=True
+        )
+        if trace['counters']:
+            st.caption(" · ".join(f"{name}: {value:g}" for name, value in trace['counters'].items()))
 
 with col2:
     st.header("📜 Query History")
@@ -0,0 +1,369 @@
+"""
+Async RAG API
+
+Non-blocking counterpart of LennyRAG for serving many concurrent users from
+one event loop:
+1. Query embedding (AsyncOpenAI, or the local model in a worker thread)
+   runs concurrently with BM25 prefiltering; misses arriving within a few
+   milliseconds share one embeddings request
+2. Index, ChromaDB and cache calls run in worker threads, never on the loop
+3. Identical in-flight questions share one pipeline run (single flight), so
+   a burst of the same query makes one LLM call
+4. A semaphore caps concurrent pipeline runs for backpressure
+
+It reuses a LennyRAG instance for the collection, indexes, caches and
+prompt, so both APIs can be served from one process.
+"""
+
+import os
+import time
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from rag_system import LennyRAG, CHAT_MODEL, fusion_candidates, answer_scope
+from reranking import rerank_candidates
+from answer_cache import query_key
+from metadata_filters import SearchFilter
+from instrumentation import TRACER, stage, record, count, count_usage
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LENNY_MAX_CONCURRENCY", "32"))
+
+
+class AsyncLennyRAG:
+    """asyncio API over a shared LennyRAG"""
+
+    def __init__(self, rag: Optional[LennyRAG] = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        """
+        Args:
+            rag: Synchronous engine whose indexes and caches are reused
+                (default: a new LennyRAG())
+            max_concurrency: Pipeline runs allowed at once; further
+                requests wait their turn
+        """
+        self.rag = rag if rag is not None else LennyRAG()
+        self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.embedder = self.rag.query_embedder
+        self.max_concurrency = max_concurrency
+
+        # Created lazily so the instance can be built outside the event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # Embedding misses waiting for the next batched request
+        self._embed_queue: List[Tuple[str, str]] = []
+        self._embed_pending: Dict[str, asyncio.Future] = {}
+        self._embed_tasks = set()  # Strong references, so batches aren't garbage collected
+
+        self.n_requests = 0
+        self.n_coalesced = 0
+        self.n_active = 0
+        self.peak_active = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def embed_query(self, query: str) -> List[float]:
+        """Query embedding from the shared caches, else from a batched API call or the local model"""
+        embedding = self.embedder.cached(query)
+        if embedding is not None:
+            count("query_embedding_hits")
+            return embedding
+        if self.rag.embedding_backend != "openai":
+            # CPU-bound; the embedder batches concurrent threads (and times itself)
+            return await asyncio.to_thread(self.embedder.embed, query)
+        with stage("embed"):
+            embedding = (await asyncio.to_thread(self.embedder.lookup, [query]))[0]
+            if embedding is not None:
+                count("query_embedding_hits")
+                return embedding
+            count("query_embedding_misses")
+
+            key = self.embedder.key(query)
+            future = self._embed_pending.get(key)
+            if future is None:
+                future = self._embed_pending[key] = asyncio.get_running_loop().create_future()
+                self._embed_queue.append((key, query))
+                if len(self._embed_queue) == 1:
+                    self._start_embed_batch()
+            # A cancelled caller must not cancel the shared request
+            return await asyncio.shield(future)
+
+    def _start_embed_batch(self):
+        task = asyncio.create_task(self._embed_batch())
+        self._embed_tasks.add(task)
+        task.add_done_callback(self._embed_tasks.discard)
+
+    async def _embed_batch(self):
+        """Wait out the batch window, then embed every queued miss in one request"""
+        await asyncio.sleep(self.embedder.batch_window)
+        batch = self._embed_queue[:self.embedder.max_batch_size]
+        del self._embed_queue[:len(batch)]
+        if self._embed_queue:
+            self._start_embed_batch()
+        queries = [query for _, query in batch]
+        try:
+            response = await self.openai_client.embeddings.create(
+                model=self.embedder.model_name,
+                input=queries
+            )
+            embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            await asyncio.to_thread(self.embedder.store, queries, embeddings)
+        except Exception as e:
+            for key, _ in batch:
+                self._embed_pending.pop(key).set_exception(e)
+            return
+        for (key, _), embedding in zip(batch, embeddings):
+            self._embed_pending.pop(key).set_result(embedding)
+
+    async def search(self, query: str, n_results: int = 10,
+                     query_embedding: Optional[List[float]] = None,
+                     filters: Optional[SearchFilter] = None) -> Dict:
+        """
+        Hybrid search without blocking the event loop
+
+        Args:
+            query: User's question
+            n_results: Number of chunks to retrieve
+            query_embedding: Precomputed embedding of query, if available
+            filters: Guest/date/keyword restrictions, as LennyRAG.search
+
+        Returns:
+            Dict with results and metadata, as LennyRAG.search
+        """
+        rag = self.rag
+        n_ranked = rerank_candidates(n_results) if rag.reranker is not None else n_results
+        n_candidates = fusion_candidates(n_results) if rag.bm25 is not None else n_ranked
+
+        with stage("retrieve"):
+            # The BM25 lookup overlaps the embedding round trip
+            keyword_task = None
+            if rag.bm25 is not None:
+                keyword_task = asyncio.create_task(asyncio.to_thread(rag.keyword_search, query, n_candidates, filters))
+            if query_embedding is None:
+                try:
+                    query_embedding = await self.embed_query(query)
+                except BaseException:
+                    if keyword_task is not None:
+                        keyword_task.cancel()
+                    raise
+
+            vector_chunks = await asyncio.to_thread(rag.vector_search, query, n_candidates,
+                                                    query_embedding, filters)
+            chunks = vector_chunks
+            if keyword_task is not None:
+                keyword_hits = await keyword_task
+                chunks = await asyncio.to_thread(rag.fuse_results, vector_chunks, keyword_hits, n_ranked)
+            if rag.reranker is not None:
+                chunks = await asyncio.to_thread(rag.rerank_results, query, chunks, n_results)
+            return {'query': query, 'chunks': chunks}
+
+    async def synthesize_answer(self, query: str, chunks: List[Dict]) -> Dict:
+        """Async LennyRAG.synthesize_answer"""
+        with stage("prompt"):
+            prompt = self.rag.build_prompt(query, chunks)
+        with stage("llm", model=CHAT_MODEL):
+            response = await self.openai_client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=[{
+                    "role": "user",
+                    "content": prompt
+                }],
+                temperature=0.3,
+                max_tokens=2000
+            )
+        count_usage(response.usage)
+        return {
+            'answer': response.choices[0].message.content,
+            'citations': self.rag.extract_citations(chunks),
+            'n_sources': len(chunks)
+        }
+
+    async def synthesize_answer_stream(self, query: str, chunks: List[Dict]) -> AsyncIterator[str]:
+        """Async LennyRAG.synthesize_answer_stream"""
+        with stage("prompt"):
+            prompt = self.rag.build_prompt(query, chunks)
+        with stage("llm", model=CHAT_MODEL) as span:
+            stream = await self.openai_client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=[{
+                    "role": "user",
+                    "content": prompt
+                }],
+                temperature=0.3,
+                max_tokens=2000,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            first_token = True
+            async for event in stream:
+                if event.choices and event.choices[0].delta.content:
+                    if first_token:
+                        record("llm_first_token", span.start)
+                        first_token = False
+                    yield event.choices[0].delta.content
+                if event.usage:
+                    count_usage(event.usage)
+
+    async def _cached_answer(self, query: str, n_results: int,
+                             filters: Optional[SearchFilter] = None) -> Tuple[Optional[Dict], Optional[List[float]]]:
+        """Async LennyRAG._cached_answer"""
+        rag = self.rag
+        await asyncio.to_thread(rag._check_version)
+        scope = answer_scope(n_results, filters)
+
+        with stage("answer_cache"):
+            cached = rag.answer_cache.get_exact(query, scope)
+        if cached is not None:
+            count("answer_cache_hits")
+            return dict(cached, query=query, cache_hit='exact'), None
+
+        query_embedding = await self.embed_query(query)
+        with stage("answer_cache"):
+            cached = rag.answer_cache.get_similar(query_embedding, scope)
+        if cached is not None:
+            count("answer_cache_hits")
+            return dict(cached, query=query, cache_hit='semantic'), query_embedding
+        count("answer_cache_misses")
+        return None, query_embedding
+
+    async def _ask(self, query: str, n_results: int, filters: Optional[SearchFilter]) -> Dict:
+        async with self.semaphore:
+            self.n_active += 1
+            self.peak_active = max(self.peak_active, self.n_active)
+            try:
+                with TRACER.trace("ask", query=query) as trace:
+                    cached, query_embedding = await self._cached_answer(query, n_results, filters)
+                    if cached is not None:
+                        return dict(cached, trace=trace.summary())
+
+                    search_results = await self.search(query, n_results, query_embedding, filters)
+                    answer_data = await self.synthesize_answer(query, search_results['chunks'])
+                    result = {
+                        'query': query,
+                        'answer': answer_data['answer'],
+                        'citations': answer_data['citations'],
+                        'n_sources': answer_data['n_sources'],
+                        'raw_chunks': search_results['chunks']
+                    }
+                    self.rag.answer_cache.put(query, answer_scope(n_results, filters), query_embedding, result)
+                    return dict(result, cache_hit=None, trace=trace.summary())
+            finally:
+                self.n_active -= 1
+
+    async def ask(self, query: str, n_results: int = 10,
+                  filters: Optional[SearchFilter] = None) -> Dict:
+        """
+        Main RAG pipeline: search + synthesize
+
+        Concurrent calls with the same normalized query, n_results and
+        filters await the same run instead of starting their own.
+
+        Args:
+            query: User's question
+            n_results: Number of chunks to retrieve
+            filters: Guest/date/keyword restrictions on the sources
+
+        Returns:
+            Dict with answer and full context, as LennyRAG.ask
+        """
+        self.n_requests += 1
+        key = query_key(query, answer_scope(n_results, filters))
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._ask(query, n_results, filters))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.n_coalesced += 1
+
+        # A cancelled caller must not cancel the run other callers share
+        result = await asyncio.shield(future)
+        return dict(result, query=query)
+
+    async def ask_stream(self, query: str, n_results: int = 10,
+                         filters: Optional[SearchFilter] = None) -> AsyncIterator[Dict]:
+        """
+        Async LennyRAG.ask_stream (events: 'sources', 'token'..., 'done')
+
+        Streams are per caller, so they are not merged with other requests,
+        but they count against the same concurrency limit.
+        """
+        self.n_requests += 1
+        async with self.semaphore:
+            with TRACER.trace("ask_stream", query=query) as trace:
+                cached, query_embedding = await self._cached_answer(query, n_results, filters)
+                if cached is not None:
+                    yield {
+                        'type': 'sources',
+                        'citations': cached['citations'],
+                        'n_sources': cached['n_sources'],
+                        'raw_chunks': cached['raw_chunks'],
+                        'cache_hit': cached['cache_hit']
+                    }
+                    yield {'type': 'token', 'text': cached['answer']}
+                    yield {'type': 'done', 'result': dict(cached, trace=trace.summary())}
+                    return
+
+                chunks = (await self.search(query, n_results, query_embedding, filters))['chunks']
+                citations = self.rag.extract_citations(chunks)
+                yield {
+                    'type': 'sources',
+                    'citations': citations,
+                    'n_sources': len(chunks),
+                    'raw_chunks': chunks,
+                    'cache_hit': None
+                }
+
+                parts = []
+                async for text in self.synthesize_answer_stream(query, chunks):
+                    parts.append(text)
+                    yield {'type': 'token', 'text': text}
+
+                result = {
+                    'query': query,
+                    'answer': "".join(parts),
+                    'citations': citations,
+                    'n_sources': len(chunks),
+                    'raw_chunks': chunks
+                }
+                self.rag.answer_cache.put(query, answer_scope(n_results, filters), query_embedding, result)
+                yield {'type': 'done', 'result': dict(result, cache_hit=None, trace=trace.summary())}
+
+    def stats(self) -> Dict:
+        return {
+            'requests': self.n_requests,
+            'coalesced': self.n_coalesced,
+            'active': self.n_active,
+            'peak_active': self.peak_active,
+            'in_flight': len(self._in_flight),
+            'max_concurrency': self.max_concurrency
+        }
+
+    async def close(self):
+        await self.openai_client.close()
+
+
+async def main():
+    """Ask the sample questions concurrently"""
+    rag = AsyncLennyRAG()
+    queries = [
+        "What causes analytics projects to fail?",
+        "How long does it take to build trust in data systems?",
+        "What do founders say about build vs buy decisions?"
+    ]
+    start = time.time()
+    results = await asyncio.gather(*(rag.ask(query, n_results=5) for query in queries))
+    for result in results:
+        print(f"\n📝 Query: {result['query']}")
+        print(f"✅ Answer:\n{result['answer'][:300]}...")
+    print(f"\n⏱️  {len(queries)} questions in {time.time() - start:.1f}s")
+    await rag.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,258 @@
+"""
+Batch Question Answering
+
+Answers a file of research questions and writes each result to disk as
+soon as it is done:
+1. Embeds every pending question in one batched embedding call
+2. Retrieves for all of them with one vector index call (a single
+   matrix product with the local index)
+3. Runs the chat completions concurrently within an RPM/TPM budget
+4. Appends each answer to results.jsonl and writes its markdown export
+
+Re-running with the same output directory skips questions already in
+results.jsonl, so an interrupted run picks up where it stopped.
+
+Usage:
+    python batch_qa.py questions.txt --output reports/batch-01
+    python batch_qa.py questions.jsonl --output reports/batch-01 --concurrency 16
+
+Questions files are plain text (one question per line, # for comments) or
+JSONL with a "question" field per line.
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from rag_system import LennyRAG
+from async_rag import AsyncLennyRAG
+from embedding_pipeline import RateLimiter, is_retryable, retry_after_seconds
+from token_counting import count_tokens
+
+# gpt-4-turbo budgets vary a lot by account tier; override per deployment
+DEFAULT_CHAT_RPM = int(os.getenv("OPENAI_CHAT_RPM", "500"))
+DEFAULT_CHAT_TPM = int(os.getenv("OPENAI_CHAT_TPM", "300000"))
+MAX_COMPLETION_TOKENS = 2000
+EMBED_BATCH_SIZE = 2048  # OpenAI's input limit per embedding request
+RESULTS_FILE = "results.jsonl"
+
+
+def question_id(question: str, n_results: int) -> str:
+    """Stable ID used to recognise already-answered questions on resume"""
+    return hashlib.sha256(f"{n_results}:{question}".encode('utf-8')).hexdigest()[:16]
+
+
+def slugify(text: str, max_length: int = 60) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')[:max_length] or "question"
+
+
+def load_questions(path: str) -> List[str]:
+    """Questions from a .txt (one per line) or .jsonl ({"question": ...}) file"""
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if path.endswith('.jsonl'):
+                questions.append(json.loads(line)['question'].strip())
+            else:
+                questions.append(line)
+    # Duplicates would only be answered (and billed) twice
+    return list(dict.fromkeys(questions))
+
+
+def load_completed(results_path: Path) -> Set[str]:
+    """
+    IDs already in results.jsonl
+
+    A line cut short by an interruption is dropped from the file, so the
+    question is answered again and new lines append cleanly.
+    """
+    if not results_path.exists():
+        return set()
+    with open(results_path, 'rb') as f:
+        data = f.read()
+    complete = data[:data.rfind(b"\n") + 1]
+    if len(complete) != len(data):
+        with open(results_path, 'wb') as f:
+            f.write(complete)
+    completed = set()
+    for line in complete.splitlines():
+        if line.strip():
+            completed.add(json.loads(line)['id'])
+    return completed
+
+
+class BatchRunner:
+    """Answers many questions with batched retrieval and rate-limited concurrent completions"""
+
+    def __init__(self, rag: LennyRAG, output_dir: str, n_results: int = 10,
+                 concurrency: int = 8, requests_per_minute: int = DEFAULT_CHAT_RPM,
+                 tokens_per_minute: int = DEFAULT_CHAT_TPM, max_retries: int = 6):
+        """
+        Args:
+            rag: Engine used for embedding, retrieval and prompts
+            output_dir: Directory for results.jsonl and the markdown exports
+            n_results: Chunks retrieved per question
+            concurrency: Completions in flight at once
+            requests_per_minute: Chat request budget
+            tokens_per_minute: Chat token budget (prompt + max completion)
+            max_retries: Attempts per completion before giving up on it
+        """
+        self.rag = rag
+        self.async_rag = AsyncLennyRAG(rag, max_concurrency=concurrency)
+        self.output_dir = Path(output_dir)
+        self.results_path = self.output_dir / RESULTS_FILE
+        self.n_results = n_results
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+
+        self.n_done = 0
+        self.n_failed = 0
+        self.n_retries = 0
+
+    def retrieve(self, questions: List[str]) -> List[Dict]:
+        """Batched embedding + retrieval for all questions"""
+        embeddings = []
+        for i in range(0, len(questions), EMBED_BATCH_SIZE):
+            embeddings.extend(self.rag.query_embedder.embed_many(questions[i:i + EMBED_BATCH_SIZE]))
+        return self.rag.search_batch(questions, self.n_results, embeddings)
+
+    async def synthesize(self, question: str, chunks: List[Dict]) -> Dict:
+        """One completion within the rate budget, retrying retryable errors"""
+        n_tokens = count_tokens(self.rag.build_prompt(question, chunks)) + MAX_COMPLETION_TOKENS
+        for attempt in range(self.max_retries):
+            await asyncio.to_thread(self.limiter.acquire, n_tokens)
+            try:
+                return await self.async_rag.synthesize_answer(question, chunks)
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries - 1:
+                    raise
+                self.n_retries += 1
+                wait_time = (retry_after_seconds(e) or min(60.0, 2 ** attempt)) * random.uniform(1.0, 1.25)
+                print(f"  ⏳ {e.__class__.__name__}, retrying in {wait_time:.1f}s")
+                await asyncio.sleep(wait_time)
+
+    def write_result(self, index: int, question: str, search_result: Dict,
+                     answer_data: Dict, elapsed: float):
+        """Write the markdown export, then record the answer in results.jsonl"""
+        result = {
+            'query': question,
+            'answer': answer_data['answer'],
+            'citations': answer_data['citations'],
+            'n_sources': answer_data['n_sources'],
+            'raw_chunks': search_result['chunks']
+        }
+        markdown_name = f"{index + 1:04d}_{slugify(question)}.md"
+        tmp = self.output_dir / (markdown_name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.rag.export_to_markdown(result))
+        os.replace(tmp, self.output_dir / markdown_name)
+
+        record = {
+            'id': question_id(question, self.n_results),
+            'index': index,
+            'question': question,
+            'n_results': self.n_results,
+            'answer': result['answer'],
+            'citations': result['citations'],
+            'n_sources': result['n_sources'],
+            'chunk_ids': [chunk['id'] for chunk in result['raw_chunks']],
+            'markdown': markdown_name,
+            'seconds': round(elapsed, 2)
+        }
+        with open(self.results_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def run(self, questions: List[str]) -> Dict:
+        """
+        Answer every question not already in results.jsonl
+
+        Returns:
+            Counts of answered, skipped and failed questions
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        completed = load_completed(self.results_path)
+        pending = [(i, q) for i, q in enumerate(questions)
+                   if question_id(q, self.n_results) not in completed]
+        skipped = len(questions) - len(pending)
+        print(f"📋 {len(questions)} questions, {skipped} already answered, {len(pending)} to go")
+        if not pending:
+            return {'answered': 0, 'skipped': skipped, 'failed': 0}
+
+        start = time.time()
+        search_results = await asyncio.to_thread(self.retrieve, [q for _, q in pending])
+        print(f"🔍 Retrieved context for {len(pending)} questions in {time.time() - start:.1f}s")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def answer(index: int, question: str, search_result: Dict):
+            async with semaphore:
+                started = time.time()
+                try:
+                    answer_data = await self.synthesize(question, search_result['chunks'])
+                except Exception as e:
+                    self.n_failed += 1
+                    print(f"  ❌ [{index + 1}] {question[:60]}: {e}")
+                    return
+                self.write_result(index, question, search_result, answer_data, time.time() - started)
+                self.n_done += 1
+                print(f"  ✅ [{self.n_done + skipped}/{len(questions)}] {question[:60]}")
+
+        await asyncio.gather(*(
+            answer(index, question, search_result)
+            for (index, question), search_result in zip(pending, search_results)
+        ))
+        await self.async_rag.close()
+
+        print(f"\n📊 Answered {self.n_done}, failed {self.n_failed}, skipped {skipped} "
+              f"in {time.time() - start:.1f}s ({self.n_retries} retries)")
+        return {'answered': self.n_done, 'skipped': skipped, 'failed': self.n_failed}
+
+
+def answer_batch(questions: List[str], output_dir: str, rag: Optional[LennyRAG] = None,
+                 **kwargs) -> Dict:
+    """Run a batch from Python; kwargs are passed to BatchRunner"""
+    runner = BatchRunner(rag if rag is not None else LennyRAG(), output_dir, **kwargs)
+    return asyncio.run(runner.run(questions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions to markdown + JSONL")
+    parser.add_argument("questions", help="Questions file (.txt or .jsonl)")
+    parser.add_argument("--output", required=True, help="Output directory (re-use it to resume)")
+    parser.add_argument("--n-results", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=int, default=DEFAULT_CHAT_RPM, help="Chat requests per minute")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_CHAT_TPM, help="Chat tokens per minute")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    try:
+        summary = answer_batch(
+            questions, args.output,
+            n_results=args.n_results,
+            concurrency=args.concurrency,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm
+        )
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted; run the same command again to resume")
+        return
+    if summary['failed']:
+        print("⚠️  Some questions failed; run the same command again to retry them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Concurrent Load Benchmark
+
+Simulates N concurrent users asking questions against the fake OpenAI
+server and compares:
+- sync:  LennyRAG.ask on a thread pool (like Streamlit script threads)
+- async: AsyncLennyRAG.ask, one task per user on a single event loop
+
+Each user asks --questions questions drawn from a small pool, so bursts of
+identical questions occur. The answer cache is disabled to measure the
+pipeline itself; LLM calls saved by single-flight merging show up as fewer
+chat requests than questions.
+
+Needs an ingested collection (data/vector_db) and the BM25/vector indexes.
+
+Usage:
+    python benchmarks/bench_async_load.py --users 100 --questions 3 --latency-ms 800
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+QUESTIONS = [
+    "What causes analytics projects to fail?",
+    "How long does it take to build trust in data?",
+    "Build vs buy analytics platforms",
+    "Schema evolution challenges",
+    "Data governance at scale",
+    "Metric consistency across teams",
+    "What makes Palantir's data platform different?",
+    "Why did companies switch from Mixpanel?",
+    "How do you find product-market fit?",
+    "How should a PM prioritize a roadmap?",
+    "What makes a great first PM hire?",
+    "How do you run a good pricing experiment?",
+]
+
+
+def workload(users: int, questions: int, pool: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [[rng.choice(QUESTIONS[:pool]) for _ in range(questions)] for _ in range(users)]
+
+
+def summarize(name: str, latencies, elapsed: float, chat_requests: int):
+    n = len(latencies)
+    print(f"  {name:<6} {n / elapsed:7.1f} req/s   "
+          f"p50 {np.percentile(latencies, 50) * 1000:7.0f} ms   "
+          f"p95 {np.percentile(latencies, 95) * 1000:7.0f} ms   "
+          f"{chat_requests} LLM calls for {n} questions   ({elapsed:.1f}s)")
+
+
+def run_sync(rag, users, n_threads: int):
+    latencies = []
+
+    def user(questions):
+        for question in questions:
+            start = time.perf_counter()
+            rag.ask(question, n_results=5)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        list(executor.map(user, users))
+    return latencies, time.perf_counter() - start
+
+
+async def run_async(rag, users):
+    latencies = []
+
+    async def user(questions):
+        for question in questions:
+            start = time.perf_counter()
+            await rag.ask(question, n_results=5)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(questions) for questions in users))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async RAG under concurrent load")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=3, help="Questions per user")
+    parser.add_argument("--pool", type=int, default=len(QUESTIONS), help="Distinct questions to draw from")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Fake chat/embedding latency")
+    parser.add_argument("--threads", type=int, default=8, help="Thread pool size for the sync run")
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency_ms=args.latency_ms, answer_tokens=100) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+        from rag_system import LennyRAG
+        from async_rag import AsyncLennyRAG
+        from answer_cache import AnswerCache
+
+        users = workload(args.users, args.questions, args.pool)
+        print(f"📊 {args.users} users x {args.questions} questions "
+              f"({args.pool} distinct), {args.latency_ms:.0f} ms API latency")
+
+        rag = LennyRAG(answer_cache=AnswerCache(max_entries=0))
+        rag.warm_up()
+
+        before = server.n_chat_requests
+        latencies, elapsed = run_sync(rag, users, args.threads)
+        summarize("sync", latencies, elapsed, server.n_chat_requests - before)
+
+        async_rag = AsyncLennyRAG(rag, max_concurrency=args.max_concurrency)
+        before = server.n_chat_requests
+        latencies, elapsed = asyncio.run(run_async(async_rag, users))
+        summarize("async", latencies, elapsed, server.n_chat_requests - before)
+        print(f"  {async_rag.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Cold Start Benchmark
+
+Time to first paint and time to first answer of the Streamlit app after a
+restart, with the engine loaded before the page (default) and in the
+background (LENNY_FAST_START=1):
+- first paint: process start until the first script run has rendered the
+  page (in fast start, its warming-up state)
+- ready: process start until the search box is on the page
+- first answer: process start until the first question is answered
+
+Each run is a fresh process (cold imports, nothing cached in memory)
+against an existing index, with the local fake OpenAI server standing in
+for the API. The app script is driven by Streamlit's AppTest, without a
+browser, so the web server's own startup is not included.
+
+Usage:
+    python benchmarks/bench_cold_start.py --workspace . --runs 3
+    python benchmarks/bench_cold_start.py --workspace /tmp/lenny-bench-xyz   # a bench_suite.py workspace
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+APP_PATH = REPO_ROOT / "app.py"
+QUERY = "How do you find product-market fit?"
+# Reruns while warming up; polling harder steals the GIL from the loader thread
+POLL_INTERVAL = 0.25
+
+
+def measure(launched: float, query: str) -> Dict:
+    """Child process: drive the app from a cold start through one answer"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(APP_PATH), default_timeout=600)
+    app.run()
+    first_paint = time.time() - launched
+    while not app.text_input:
+        if app.error:
+            raise RuntimeError(app.error[0].value)
+        time.sleep(POLL_INTERVAL)
+        app.run()
+    ready = time.time() - launched
+
+    app.text_input(key="query_input").input(query)
+    next(button for button in app.button if button.label.startswith("🔍")).click().run()
+    if app.error:
+        raise RuntimeError(app.error[0].value)
+    if not any(header.value == "💡 Answer" for header in app.header):
+        raise RuntimeError("No answer rendered")
+    return {'first_paint_s': first_paint, 'ready_s': ready, 'first_answer_s': time.time() - launched}
+
+
+def run_cold_start(workspace: str, fast_start: bool, query: str) -> Dict:
+    """One measurement in a fresh interpreter"""
+    env = dict(os.environ, LENNY_FAST_START="1" if fast_start else "0",
+               PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_ROOT), os.getenv("PYTHONPATH")])))
+    launched = time.time()
+    output = subprocess.run([sys.executable, __file__, "--child", str(launched), query],
+                            cwd=workspace, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(f"Cold start run failed:\n{output.stderr[-2000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        result = measure(float(sys.argv[2]), sys.argv[3])
+        print(json.dumps(result))
+        return
+
+    parser = argparse.ArgumentParser(description="Streamlit app time to first paint and first answer")
+    parser.add_argument("--workspace", default=".", help="Directory with an ingested ./data")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Fake embedding/chat latency")
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    with FakeOpenAIServer(latency_ms=args.latency_ms, answer_tokens=100) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+        print(f"🧪 {args.runs} cold starts per mode in {os.path.abspath(args.workspace)}")
+        for label, fast_start in (("blocking", False), ("fast start", True)):
+            # A new question each run, so no cache makes the first answer cheaper
+            runs = [run_cold_start(args.workspace, fast_start, f"{QUERY} (run {i} {label})")
+                    for i in range(args.runs)]
+            results[label] = {key: sorted(run[key] for run in runs)[len(runs) // 2] for key in runs[0]}
+            print(f"  {label:<11} first paint {results[label]['first_paint_s']:6.2f}s   "
+                  f"ready {results[label]['ready_s']:6.2f}s   "
+                  f"first answer {results[label]['first_answer_s']:6.2f}s   (median of {args.runs})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
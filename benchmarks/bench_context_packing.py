@@ -0,0 +1,84 @@
+"""
+Context Packing Benchmark
+
+Retrieves chunks for a set of questions and compares the prompt context
+built the old way (every chunk verbatim under its own header) with the
+packed context from context_packing.ContextPacker:
+- context tokens per query
+- citation coverage: share of the cited episodes (top 5 chunks) whose
+  excerpts are still in the context
+
+Query embeddings come from the fake OpenAI server, so no API key is needed.
+
+Usage:
+    python benchmarks/bench_context_packing.py --n-results 10 --budget 4000
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from benchmarks.bench_async_load import QUESTIONS
+from token_counting import count_tokens
+
+
+def verbatim_context(chunks):
+    """The original format_context: all chunks, one header each"""
+    return "\n---\n\n".join(
+        f"[Source {i + 1}]\n"
+        f"Guest: {chunk['metadata'].get('guest', 'Unknown')}\n"
+        f"Episode: {chunk['metadata'].get('title', 'Unknown')}\n"
+        f"Content:\n{chunk['text']}\n"
+        for i, chunk in enumerate(chunks)
+    )
+
+
+def citation_coverage(context, citations):
+    titles = {citation['title'] for citation in citations}
+    return sum(f"Episode: {title}\n" in context for title in titles) / len(titles) if titles else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt context size before/after packing")
+    parser.add_argument("--n-results", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=None, help="Context token budget (default: packer default)")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer() as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+        from rag_system import LennyRAG
+        from context_packing import ContextPacker
+
+        rag = LennyRAG()
+        packer = ContextPacker(args.budget) if args.budget is not None else rag.context_packer
+
+        before, after, coverage, stats = [], [], [], []
+        for question in QUESTIONS:
+            chunks = rag.search(question, args.n_results)['chunks']
+            citations = rag.extract_citations(chunks)
+            old = verbatim_context(chunks)
+            new, pack_stats = packer.pack(chunks)
+            before.append(count_tokens(old))
+            after.append(pack_stats['tokens'])
+            coverage.append(citation_coverage(new, citations))
+            stats.append(pack_stats)
+
+    print(f"📊 {len(QUESTIONS)} questions, n_results={args.n_results}, budget={packer.max_tokens}")
+    print(f"  verbatim  mean {np.mean(before):7.0f} tokens   max {np.max(before):6.0f}")
+    print(f"  packed    mean {np.mean(after):7.0f} tokens   max {np.max(after):6.0f}   "
+          f"({1 - np.sum(after) / np.sum(before):.0%} fewer)")
+    print(f"  citation coverage {np.mean(coverage):.1%}   "
+          f"duplicates dropped {sum(s['duplicates'] for s in stats)}   "
+          f"over budget {sum(s['over_budget'] for s in stats)}   "
+          f"sources/query {np.mean([s['sources'] for s in stats]):.1f}")
+
+
+if __name__ == "__main__":
+    main()
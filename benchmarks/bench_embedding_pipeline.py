@@ -0,0 +1,83 @@
+"""
+Embedding Pipeline Benchmark
+
+Embeds chunks of the bundled transcripts against the local fake OpenAI server
+twice: the old way (fixed batches of 50, one request at a time, 2s pause
+between batches) and through EmbeddingPipeline (token-packed batches, several
+requests in flight, token-bucket pacing).
+
+Usage:
+    python benchmarks/bench_embedding_pipeline.py --episodes 20 --latency-ms 300
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from transcript_parser import process_transcript_file
+
+
+def load_chunks(n_episodes: int):
+    files = sorted(Path("transcripts/episodes").glob("*/transcript.md"))[:n_episodes]
+    records = []
+    for filepath in files:
+        result = process_transcript_file(filepath)
+        if result:
+            records.extend({'text': text} for _, _, text, _ in result[2])
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs concurrent embedding")
+    parser.add_argument("--episodes", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rpm", type=int, default=3000)
+    parser.add_argument("--tpm", type=int, default=1_000_000)
+    parser.add_argument("--sequential-pause", type=float, default=2.0,
+                        help="Pause between batches in the old loop")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency_ms=args.latency_ms) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+        from chromadb.utils import embedding_functions
+        from embedding_pipeline import EmbeddingPipeline
+
+        records = load_chunks(args.episodes)
+        ef = embedding_functions.OpenAIEmbeddingFunction(
+            api_key=os.environ["OPENAI_API_KEY"],
+            model_name="text-embedding-3-small"
+        )
+        print(f"📚 {len(records)} chunks from {args.episodes} episodes, "
+              f"{args.latency_ms:.0f} ms simulated latency")
+
+        start = time.perf_counter()
+        for i in range(0, len(records), 50):
+            ef([r['text'] for r in records[i:i + 50]])
+            time.sleep(args.sequential_pause)
+        sequential = time.perf_counter() - start
+        print(f"  sequential (batches of 50): {sequential:6.2f}s")
+
+        pipeline = EmbeddingPipeline(
+            ef, model_name="text-embedding-3-small",
+            requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+            max_workers=args.workers
+        )
+        start = time.perf_counter()
+        n = sum(len(batch) for batch, vectors in pipeline.embed_records(records) if vectors)
+        concurrent = time.perf_counter() - start
+        stats = pipeline.stats()
+        print(f"  pipeline ({args.workers} workers):   {concurrent:6.2f}s "
+              f"({n} chunks, {stats['requests']} requests, {stats['retries']} retries)")
+        print(f"  speedup: {sequential / concurrent:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Parse/Chunk Benchmark
+
+Compares serial and process-pool wall time for parsing and chunking the
+bundled transcripts/episodes corpus, and the pure-Python vs libyaml
+frontmatter loaders.
+
+Usage:
+    python benchmarks/bench_parse_chunk.py --workers 8
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yaml
+import transcript_parser
+from transcript_parser import process_transcript_file
+
+
+def run_serial(files):
+    return [process_transcript_file(f) for f in files]
+
+
+def run_parallel(files, workers):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(process_transcript_file, files, chunksize=4))
+
+
+def time_it(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs parallel parse/chunk")
+    parser.add_argument("--transcripts", default="transcripts/episodes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    files = sorted(Path(args.transcripts).glob("*/transcript.md"))
+    size_mb = sum(f.stat().st_size for f in files) / 1e6
+    print(f"📚 {len(files)} transcripts, {size_mb:.1f} MB")
+
+    # Frontmatter loader comparison
+    transcript_parser.YamlLoader = yaml.SafeLoader
+    py_time, _ = time_it(run_serial, files)
+    transcript_parser.YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    loader = transcript_parser.YamlLoader.__name__
+
+    serial_time, serial = time_it(run_serial, files)
+    parallel_time, parallel = time_it(run_parallel, files, args.workers)
+    assert serial == parallel, "parallel output differs from serial"
+
+    n_chunks = sum(len(r[2]) for r in serial if r)
+    rows = [
+        ("serial, SafeLoader", py_time, ""),
+        (f"serial, {loader}", serial_time, ""),
+        (f"{args.workers} processes, {loader}", parallel_time,
+         f" ({serial_time / parallel_time:.1f}x vs serial)"),
+    ]
+    for label, seconds, note in rows:
+        print(f"  {label + ':':<30}{seconds:6.2f}s{note}")
+    print(f"  {n_chunks} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Quantization Benchmark
+
+Compares exact float32 search with quantized search over the exported
+index, for several codecs and re-ranking depths:
+- memory held in RAM for search (float matrix vs codes)
+- float bytes read per query for re-ranking
+- p50/p99 per-query latency
+- recall@k against exact search
+
+Codes are built in memory from the exported vectors, so the index does not
+need to be exported with --quantize. Queries are stored chunk embeddings
+with noise added, so no API calls are made.
+
+Usage:
+    python vector_index.py export
+    python benchmarks/bench_quantization.py --queries 200 --k 10 --rerank 0 2 4 10
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from vector_index import VectorIndex, INDEX_PATH, QuantizedVectors, normalize_rows
+from benchmarks.bench_retrieval import timed, percentile_ms, recall_at_k
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Float32 vs int8 / PQ / sign-bit search")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 2, 4, 10])
+    parser.add_argument("--prefilter", type=int, default=50)
+    parser.add_argument("--pq-subvectors", type=int, nargs="+", default=[48, 96])
+    args = parser.parse_args()
+
+    index = VectorIndex(args.index)
+    rng = np.random.default_rng(0)
+    sample = rng.choice(index.count, size=min(args.queries, index.count), replace=False)
+    queries = np.asarray(index.vectors[sample]) + rng.normal(0, args.noise, (len(sample), index.dim))
+    queries = normalize_rows(queries.astype(np.float32))
+    float_bytes = index.count * index.dim * 4
+    print(f"📊 {index.count} vectors x {index.dim} dims, {len(queries)} queries, k={args.k}")
+
+    def report(name, memory, floats_read, latencies, results):
+        print(f"  {name:<28} RAM {memory / 2**20:8.2f} MB   read/query {floats_read / 1024:7.1f} KB   "
+              f"p50 {percentile_ms(latencies, 50):6.2f} ms   p99 {percentile_ms(latencies, 99):6.2f} ms   "
+              f"recall@k {recall_at_k(results, truth):.3f}")
+
+    latencies, truth = timed(lambda q: index.search(q, args.k)[0][0], queries)
+    report("float32 exact", float_bytes, 0, latencies, truth)
+
+    variants = [("int8", dict(codec="int8")), ("sign bits", dict(binary=True)),
+                ("int8 + sign bits", dict(codec="int8", binary=True))]
+    variants += [(f"pq{m}", dict(codec="pq", pq_subvectors=m)) for m in args.pq_subvectors
+                 if index.dim % m == 0]
+    for name, options in variants:
+        start = time.time()
+        index.quantized = QuantizedVectors.build(index.vectors, **options)
+        print(f"  -- {name}: built in {time.time() - start:.1f}s")
+        for rerank in args.rerank:
+            latencies, results = timed(
+                lambda q: index.search(q, args.k, method="quantized", rerank=rerank,
+                                       prefilter=args.prefilter)[0][0],
+                queries
+            )
+            report(f"{name} rerank={rerank}", index.quantized.nbytes,
+                   args.k * rerank * index.dim * 4, latencies, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Query Embedding Batching Benchmark
+
+Many threads embed distinct questions at once through QueryEmbedder against
+the local fake OpenAI server, with micro-batching off and on, then ask the
+same questions again (served from the in-memory LRU):
+- embedding API requests made
+- p50/p95 per-question latency
+
+Usage:
+    python benchmarks/bench_query_batching.py --threads 32 --latency-ms 100 --window-ms 5
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from benchmarks.bench_retrieval import percentile_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-query vs micro-batched query embedding")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency_ms=args.latency_ms) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+        from embedding_backends import create_embedding_function
+        from query_embedder import QueryEmbedder
+
+        print(f"🧪 {args.queries} distinct questions from {args.threads} threads, "
+              f"{args.latency_ms:.0f} ms simulated latency")
+        for label, window in (("per query", 0.0), (f"batched ({args.window_ms:g} ms)", args.window_ms / 1000)):
+            embedder = QueryEmbedder(create_embedding_function("openai", cache_path=":memory:"),
+                                     batch_window=window)
+            queries = [f"What do guests say about topic {i} ({label})?" for i in range(args.queries)]
+            for phase in ("cold", "repeat"):
+                def timed_embed(query):
+                    start = time.perf_counter()
+                    embedder.embed(query)
+                    return time.perf_counter() - start
+
+                before = server.n_requests
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                    latencies = list(executor.map(timed_embed, queries))
+                elapsed = time.perf_counter() - start
+                print(f"  {label:<18} {phase:<6} {server.n_requests - before:4d} requests   "
+                      f"p50 {percentile_ms(latencies, 50):7.2f} ms   p95 {percentile_ms(latencies, 95):7.2f} ms   "
+                      f"total {elapsed:5.2f}s")
+            stats = embedder.stats()
+            print(f"    mean batch {stats['mean_batch_size']:.1f}, LRU hits {stats['lru_hits']}")
+
+
+if __name__ == "__main__":
+    main()
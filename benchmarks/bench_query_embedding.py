@@ -0,0 +1,59 @@
+"""
+Query Embedding Benchmark
+
+Times embedding one question at a time (the latency every uncached query
+pays before retrieval starts) and a bulk batch (ingestion throughput) for
+each embedding backend. The embedding cache is bypassed.
+
+The openai backend needs OPENAI_API_KEY (or OPENAI_BASE_URL pointing at
+benchmarks/fake_openai_server.py); the local backend needs the MiniLM ONNX
+model, downloaded on first use or found at LENNY_LOCAL_MODEL_PATH.
+
+Usage:
+    python benchmarks/bench_query_embedding.py --backends local openai --queries 100
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv
+
+from embedding_backends import EMBEDDING_BACKENDS, create_embedding_function
+from benchmarks.bench_retrieval import timed, percentile_ms
+
+TOPICS = ["pricing", "hiring", "product-market fit", "onboarding", "retention", "fundraising",
+          "roadmaps", "growth loops", "analytics", "leadership"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query embedding latency per backend")
+    parser.add_argument("--backends", nargs="+", choices=list(EMBEDDING_BACKENDS),
+                        default=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--bulk", type=int, default=512, help="Texts in the bulk batch")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # Distinct texts, so nothing is served from a server-side or local cache
+    queries = [f"What do guests say about {TOPICS[i % len(TOPICS)]}? ({i})" for i in range(args.queries)]
+    bulk = [f"{q} " * 20 for q in queries] * (args.bulk // max(1, len(queries)) + 1)
+    bulk = bulk[:args.bulk]
+
+    for backend in args.backends:
+        embedding_function = create_embedding_function(backend).embedding_function
+        embedding_function(["warm up"])
+        latencies, _ = timed(lambda q: embedding_function([q]), queries)
+        start = time.perf_counter()
+        embedding_function(bulk)
+        elapsed = time.perf_counter() - start
+        print(f"  {backend:<8} query p50 {percentile_ms(latencies, 50):7.2f} ms   "
+              f"p95 {percentile_ms(latencies, 95):7.2f} ms   "
+              f"bulk {len(bulk) / elapsed:8.0f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
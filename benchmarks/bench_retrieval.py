@@ -0,0 +1,100 @@
+"""
+Retrieval Benchmark
+
+Compares per-query latency and recall@k of the ChromaDB path against the
+local memory-mapped index (exact, IVF and, if exported, HNSW). Queries are
+stored chunk embeddings with a little noise added, so no API calls are made;
+exact NumPy search is the ground truth.
+
+Usage:
+    python vector_index.py export
+    python benchmarks/bench_retrieval.py --queries 200 --k 10
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from vector_index import VectorIndex, INDEX_PATH
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def recall_at_k(found_ids, truth_ids):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found_ids, truth_ids)])
+
+
+def timed(run, queries):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(run(query))
+        latencies.append(time.perf_counter() - start)
+    return latencies, results
+
+
+def report(name, latencies, found_ids, truth_ids):
+    print(f"  {name:<18} p50 {percentile_ms(latencies, 50):7.2f} ms   "
+          f"p95 {percentile_ms(latencies, 95):7.2f} ms   "
+          f"recall@k {recall_at_k(found_ids, truth_ids):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma vs local index retrieval")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--collection", default="lenny_transcripts")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--skip-chroma", action="store_true")
+    args = parser.parse_args()
+
+    index = VectorIndex(args.index)
+    rng = np.random.default_rng(0)
+    sample = rng.choice(index.count, size=min(args.queries, index.count), replace=False)
+    queries = np.asarray(index.vectors[sample]) + rng.normal(0, args.noise, (len(sample), index.dim))
+    queries = queries.astype(np.float32)
+    print(f"📊 {index.count} vectors x {index.dim} dims, {len(queries)} queries, k={args.k}")
+
+    def ids_of(indices):
+        return [index.chunks.row(int(i))['id'] for i in indices if i >= 0]
+
+    latencies, results = timed(lambda q: index.search(q, args.k)[0][0], queries)
+    truth = [ids_of(r) for r in results]
+    report("numpy exact", latencies, truth, truth)
+
+    latencies, results = timed(lambda q: index.query(q, args.k)['ids'][0], queries)
+    report("numpy exact+rows", latencies, results, truth)
+
+    if index.ivf_centroids is not None:
+        for nprobe in args.nprobe:
+            latencies, results = timed(
+                lambda q: index.search(q, args.k, method="ivf", nprobe=nprobe)[0][0], queries
+            )
+            report(f"ivf nprobe={nprobe}", latencies, [ids_of(r) for r in results], truth)
+
+    if index.hnsw is not None:
+        latencies, results = timed(lambda q: index.search(q, args.k, method="hnsw")[0][0], queries)
+        report("hnsw ef=64", latencies, [ids_of(r) for r in results], truth)
+
+    if not args.skip_chroma:
+        import chromadb
+        collection = chromadb.PersistentClient(path="./data/vector_db").get_collection(args.collection)
+        latencies, results = timed(
+            lambda q: collection.query(query_embeddings=[q.tolist()], n_results=args.k,
+                                       include=[])['ids'][0],
+            queries
+        )
+        report("chroma", latencies, results, truth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+"""
+Benchmark Suite
+
+End-to-end quality and performance numbers, as one JSON document that can
+be diffed against a previous run:
+- ingestion: wall time, chunks/s, peak RSS and stage breakdown of
+  TranscriptIngester (plus index export time)
+- search: recall@k, hit rate@k, MRR and precision@5 of expected episodes
+  for the golden queries (benchmarks/golden_set.json), p50/p95/p99 latency
+  per stage and throughput of LennyRAG.search, per retriever (query
+  embeddings cached), with and without reranking given --rerank
+- ask: p50/p95/p99 latency per stage (including query embedding and LLM
+  time to first token), tokens per answer and throughput of LennyRAG.ask
+
+By default everything runs offline: the transcripts of the golden episodes
+plus some distractors are ingested into a temporary workspace through the
+fake OpenAI server (deterministic embeddings and answers, configurable
+latency, no client-side rate limits), so runs are comparable across
+changes and cost nothing. Use --workspace . --no-fake to measure an
+existing deployment instead (golden queries are then scored only if it
+contains their episodes).
+
+Usage:
+    python benchmarks/bench_suite.py --output before.json
+    python benchmarks/bench_suite.py --output after.json --baseline before.json
+    python benchmarks/bench_suite.py --episodes all --retrievers chroma exact ivf
+    python benchmarks/bench_suite.py --skip-ask --rerank
+    python benchmarks/bench_suite.py --workspace . --no-fake --skip-ask
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import resource
+import tempfile
+import argparse
+import platform
+import subprocess
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import numpy as np
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+GOLDEN_SET_PATH = REPO_ROOT / "benchmarks" / "golden_set.json"
+TRANSCRIPTS_PATH = REPO_ROOT / "transcripts"
+# Metrics where a larger value is better; everything else numeric is a cost
+HIGHER_IS_BETTER = ("recall_at_k", "hit_rate_at_k", "mrr", "precision_at_5", "qps", "chunks_per_s")
+
+
+def load_golden_set(path: Path = GOLDEN_SET_PATH) -> List[Dict]:
+    """Golden queries: [{'query', 'episodes': [relevant episode folders]}]"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def select_episodes(golden: List[Dict], n_episodes: Optional[int], seed: int = 0) -> List[str]:
+    """Golden episodes plus randomly chosen distractors, up to n_episodes (None: all)"""
+    available = sorted(p.parent.name for p in (TRANSCRIPTS_PATH / "episodes").glob("*/transcript.md"))
+    wanted = sorted({e for item in golden for e in item['episodes']} & set(available))
+    if n_episodes is None:
+        return available
+    others = [e for e in available if e not in set(wanted)]
+    random.Random(seed).shuffle(others)
+    return sorted(wanted + others[:max(0, n_episodes - len(wanted))])
+
+
+def latency_summary(samples_ms: List[float]) -> Dict:
+    if not samples_ms:
+        return {}
+    return {
+        'p50': float(np.percentile(samples_ms, 50)),
+        'p95': float(np.percentile(samples_ms, 95)),
+        'p99': float(np.percentile(samples_ms, 99)),
+        'mean': float(np.mean(samples_ms)),
+        'n': len(samples_ms)
+    }
+
+
+def stage_latencies(summaries: List[Dict]) -> Dict:
+    """Per-stage percentiles over trace summaries (stages a request skipped are left out)"""
+    samples = {'total': [s['total_ms'] for s in summaries]}
+    for summary in summaries:
+        for stage in summary['stages']:
+            samples.setdefault(stage['name'], []).append(stage['ms'])
+    return {name: latency_summary(values) for name, values in samples.items()}
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """Peak resident set size (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def prepare_workspace(episodes: List[str]) -> str:
+    """Temporary project directory whose transcripts are links to the chosen episodes"""
+    workspace = tempfile.mkdtemp(prefix="lenny-bench-")
+    episodes_dir = Path(workspace) / "transcripts" / "episodes"
+    episodes_dir.mkdir(parents=True)
+    for episode in episodes:
+        (episodes_dir / episode).symlink_to(TRANSCRIPTS_PATH / "episodes" / episode, target_is_directory=True)
+    return workspace
+
+
+def ingest_worker(workspace: str, embedding_backend: Optional[str], results):
+    """Child process: ingest the workspace and export the indexes, reporting timings"""
+    os.chdir(workspace)
+    from ingest_transcripts import TranscriptIngester
+    from instrumentation import TRACER
+    from vector_index import VectorIndex, export_index, INDEX_PATH
+    from bm25_index import export_bm25_index
+    from episode_index import export_episode_index
+
+    traces = []
+
+    class Collect:
+        def emit(self, trace):
+            traces.append(trace.summary())
+
+    TRACER.sinks.append(Collect())
+    start = time.perf_counter()
+    ingester = TranscriptIngester("./transcripts", embedding_backend=embedding_backend)
+    summary = ingester.ingest_all_transcripts(full_rebuild=True)
+    ingest_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    export_index(ingester.collection, model_name=ingester.embedding_model)
+    export_bm25_index(ingester.collection)
+    export_episode_index(VectorIndex(INDEX_PATH), ingester.embedding_function, "./transcripts")
+    export_s = time.perf_counter() - start
+
+    trace = traces[-1] if traces else {'stages': [], 'counters': {}}
+    results.put({
+        'wall_s': ingest_s,
+        'index_export_s': export_s,
+        'chunks': summary['added'] if summary else 0,
+        'failed_chunks': summary['failed'] if summary else 0,
+        'chunks_per_s': (summary['added'] / ingest_s) if summary else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'parse_workers_peak_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+        'stage_s': {stage['name']: stage['ms'] / 1000 for stage in trace['stages']},
+        'counters': trace['counters']
+    })
+
+
+def run_ingest(workspace: str, embedding_backend: Optional[str]) -> Dict:
+    """Ingest in a fresh process, so peak RSS is ingestion's alone"""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=ingest_worker, args=(workspace, embedding_backend, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def rank_episodes(chunks: List[Dict]) -> List[str]:
+    """Episode folders in order of their best chunk"""
+    return list(dict.fromkeys(chunk['metadata'].get('episode_folder', '') for chunk in chunks))
+
+
+def score(chunks: List[Dict], relevant: List[str]) -> Dict:
+    ranked = rank_episodes(chunks)
+    found = [i for i, episode in enumerate(ranked) if episode in relevant]
+    top = [chunk['metadata'].get('episode_folder', '') for chunk in chunks[:5]]
+    return {
+        'recall': len(set(ranked) & set(relevant)) / len(relevant),
+        'hit': 1.0 if found else 0.0,
+        'reciprocal_rank': 1.0 / (found[0] + 1) if found else 0.0,
+        # The chunks citations and the prompt take first
+        'precision_at_5': sum(episode in relevant for episode in top) / len(top) if top else 0.0
+    }
+
+
+def evaluate_search(rag, golden: List[Dict], k: int, threads: int) -> Dict:
+    """Quality and per-stage latency (one query at a time), then throughput (concurrent)"""
+    from instrumentation import TRACER
+
+    summaries, scores, misses = [], [], []
+    for item in golden:
+        with TRACER.trace("search") as trace:
+            chunks = rag.search(item['query'], n_results=k)['chunks']
+        summaries.append(trace.summary())
+        item_score = score(chunks, item['episodes'])
+        scores.append(item_score)
+        if not item_score['hit']:
+            misses.append(item['query'])
+
+    # Query embeddings are cached by now, so this is the warm path
+    queries = [item['query'] for item in golden]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda q: rag.search(q, n_results=k), queries))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'recall_at_k': float(np.mean([s['recall'] for s in scores])),
+        'hit_rate_at_k': float(np.mean([s['hit'] for s in scores])),
+        'mrr': float(np.mean([s['reciprocal_rank'] for s in scores])),
+        'precision_at_5': float(np.mean([s['precision_at_5'] for s in scores])),
+        'latency_ms': stage_latencies(summaries),
+        'qps': len(queries) / elapsed,
+        'missed_queries': misses
+    }
+
+
+def evaluate_ask(rag, golden: List[Dict], k: int, threads: int) -> Dict:
+    """Per-stage latency from streamed answers (for time to first token), then ask() throughput"""
+    # Fresh spellings, so search's cached query embeddings don't hide the embed stage
+    summaries = []
+    for item in golden:
+        for event in rag.ask_stream(item['query'] + " Answer in detail.", n_results=k):
+            if event['type'] == 'done':
+                summaries.append(event['result']['trace'])
+
+    queries = [item['query'] + " Please be specific." for item in golden]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda q: rag.ask(q, n_results=k), queries))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'latency_ms': stage_latencies(summaries),
+        'prompt_tokens_mean': float(np.mean([s['counters'].get('prompt_tokens', 0) for s in summaries])),
+        'completion_tokens_mean': float(np.mean([s['counters'].get('completion_tokens', 0) for s in summaries])),
+        'qps': len(queries) / elapsed
+    }
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves keyed by dotted path"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print metric changes against a baseline run; returns the regressed metrics"""
+    current, previous = flatten(results), flatten(baseline)
+    regressions = []
+    print(f"\n📈 Against baseline ({baseline.get('meta', {}).get('git_commit', 'unknown')[:10]}), "
+          f"changes over {tolerance:.0%}:")
+    for path in sorted(current.keys() & previous.keys()):
+        if path.startswith("meta.") or path.endswith(".n"):
+            continue
+        old, new = previous[path], current[path]
+        change = (new - old) / abs(old) if old else (0.0 if new == old else float('inf'))
+        if abs(change) <= tolerance:
+            continue
+        higher_is_better = path.split(".")[-1] in HIGHER_IS_BETTER
+        worse = change < 0 if higher_is_better else change > 0
+        if worse:
+            regressions.append(path)
+        print(f"  {'⚠️ ' if worse else '✅'} {path:<48} {old:10.3f} → {new:10.3f} ({change:+.0%})")
+    if not regressions:
+        print("  No regressions")
+    return regressions
+
+
+def print_report(results: Dict):
+    ingest = results.get('ingest')
+    if ingest:
+        print(f"\n📥 Ingest: {ingest['chunks']} chunks in {ingest['wall_s']:.1f}s "
+              f"({ingest['chunks_per_s']:.0f} chunks/s), index export {ingest['index_export_s']:.1f}s, "
+              f"peak RSS {ingest['peak_rss_mb']:.0f} MB")
+    for retriever, search in results.get('search', {}).items():
+        print(f"\n🔍 Search ({retriever}): recall@k {search['recall_at_k']:.3f}   "
+              f"hit@k {search['hit_rate_at_k']:.3f}   MRR {search['mrr']:.3f}   "
+              f"P@5 {search.get('precision_at_5', 0.0):.3f}   {search['qps']:.1f} q/s")
+        print_latencies(search['latency_ms'])
+    ask = results.get('ask')
+    if ask:
+        print(f"\n💬 Ask: {ask['qps']:.2f} q/s, {ask['prompt_tokens_mean']:.0f} prompt / "
+              f"{ask['completion_tokens_mean']:.0f} completion tokens per answer")
+        print_latencies(ask['latency_ms'])
+
+
+def print_latencies(latencies: Dict):
+    for name, stats in latencies.items():
+        print(f"  {name:<16} p50 {stats['p50']:8.2f} ms   p95 {stats['p95']:8.2f} ms   "
+              f"p99 {stats['p99']:8.2f} ms   (n={stats['n']})")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion, retrieval quality and latency benchmark suite")
+    parser.add_argument("--golden", default=str(GOLDEN_SET_PATH))
+    parser.add_argument("--episodes", default="100",
+                        help="Transcripts to ingest: golden episodes plus distractors up to this many, or 'all'")
+    parser.add_argument("--workspace", default=None,
+                        help="Existing project directory (with data/) to evaluate instead of ingesting")
+    parser.add_argument("--no-fake", action="store_true", help="Use the real OpenAI API")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Fake embedding/chat latency")
+    parser.add_argument("--token-latency-ms", type=float, default=2.0, help="Fake delay per streamed token")
+    parser.add_argument("--answer-tokens", type=int, default=100)
+    parser.add_argument("--embedding-backend", default=None)
+    parser.add_argument("--retrievers", nargs="+", default=["chroma", "exact"])
+    parser.add_argument("--rerank", action="store_true",
+                        help="Also evaluate each retriever with reranking (ask uses it too)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ask-queries", type=int, default=20, help="Golden queries answered end to end")
+    parser.add_argument("--skip-ask", action="store_true")
+    parser.add_argument("--output", default="bench_suite_results.json")
+    parser.add_argument("--baseline", default=None, help="Earlier --output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative change worth reporting")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    golden = load_golden_set(Path(args.golden))
+    output = Path(args.output).resolve()
+    baseline = Path(args.baseline).resolve() if args.baseline else None
+
+    server = None
+    if not args.no_fake:
+        server = FakeOpenAIServer(latency_ms=args.latency_ms, token_latency_ms=args.token_latency_ms,
+                                  answer_tokens=args.answer_tokens).start()
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "fake"
+        # Measure the ingestion pipeline, not the production rate limits
+        os.environ.setdefault("OPENAI_EMBEDDING_RPM", str(10**6))
+        os.environ.setdefault("OPENAI_EMBEDDING_TPM", str(10**10))
+
+    results = {'meta': {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': vars(args)
+    }}
+    try:
+        if args.workspace:
+            workspace = os.path.abspath(args.workspace)
+        else:
+            episodes = select_episodes(golden, None if args.episodes == "all" else int(args.episodes))
+            workspace = prepare_workspace(episodes)
+            print(f"🧪 Ingesting {len(episodes)} transcripts into {workspace}")
+            results['ingest'] = run_ingest(workspace, args.embedding_backend)
+        os.chdir(workspace)
+
+        from rag_system import LennyRAG
+        from answer_cache import AnswerCache
+
+        results['search'] = {}
+        rag = None
+        configs = [(retriever, rerank) for retriever in args.retrievers
+                   for rerank in ((False, True) if args.rerank else (False,))]
+        for retriever, rerank in configs:
+            # Answers are never cached, so every ask runs the whole pipeline
+            rag = LennyRAG(retriever=retriever, answer_cache=AnswerCache(max_entries=0),
+                           embedding_backend=args.embedding_backend, rerank=rerank)
+            rag.warm_up()
+            if (retriever, rerank) == configs[0]:
+                stored = {m.get('episode_folder') for m in rag.collection.get(include=['metadatas'])['metadatas']}
+                scored = [item for item in golden if set(item['episodes']) & stored]
+                results['meta'].update(corpus_chunks=rag.collection.count(), corpus_episodes=len(stored),
+                                       golden_queries=len(scored), golden_skipped=len(golden) - len(scored))
+                print(f"📊 {len(scored)} golden queries ({len(golden) - len(scored)} skipped, "
+                      f"episodes not ingested), k={args.k}")
+                # Every retriever then reads query embeddings from the persistent
+                # cache; the embedding round trip shows up in the ask stages
+                rag.embedding_function([item['query'] for item in scored])
+            name = f"{retriever}+rerank" if rerank else retriever
+            results['search'][name] = evaluate_search(rag, scored, args.k, args.threads)
+
+        if not args.skip_ask and rag is not None:
+            results['ask'] = evaluate_ask(rag, scored[:args.ask_queries], args.k, args.threads)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print_report(results)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+    if baseline is not None:
+        with open(baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Two-Stage Retrieval Benchmark
+
+Compares flat exact search over every chunk with two-stage search (top-N
+episodes from the episode index, then exact search over their chunks):
+- per-query latency
+- chunks scanned per query
+- recall@k against flat exact search
+- distinct episodes among the top k
+
+Queries are stored chunk embeddings with noise added, so no API calls are
+made.
+
+Usage:
+    python vector_index.py export && python episode_index.py build
+    python benchmarks/bench_two_stage.py --queries 200 --k 10 --episodes 5 10 20
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from vector_index import VectorIndex, INDEX_PATH, normalize_rows
+from episode_index import EpisodeIndex, EPISODE_INDEX_PATH
+from metadata_filters import SearchFilter
+from benchmarks.bench_retrieval import timed, percentile_ms, recall_at_k
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flat vs two-stage (episode -> chunk) retrieval")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--episode-index", default=EPISODE_INDEX_PATH)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--episodes", type=int, nargs="+", default=[5, 10, 20])
+    args = parser.parse_args()
+
+    index = VectorIndex(args.index)
+    episodes = EpisodeIndex(args.episode_index)
+    rng = np.random.default_rng(0)
+    sample = rng.choice(index.count, size=min(args.queries, index.count), replace=False)
+    queries = np.asarray(index.vectors[sample]) + rng.normal(0, args.noise, (len(sample), index.dim))
+    queries = normalize_rows(queries.astype(np.float32))
+    episode_of_row = {}
+    for folder, rows in index.metadata.episode_row_lists().items():
+        episode_of_row.update(dict.fromkeys(rows.tolist(), folder))
+    print(f"📊 {index.count} chunks in {episodes.count} episodes, {len(queries)} queries, k={args.k}")
+
+    def spread(results):
+        return np.mean([len({episode_of_row[int(i)] for i in r}) for r in results])
+
+    latencies, truth = timed(lambda q: index.search(q, args.k)[0][0], queries)
+    print(f"  {'flat exact':<18} p50 {percentile_ms(latencies, 50):7.2f} ms   "
+          f"p95 {percentile_ms(latencies, 95):7.2f} ms   scanned {index.count:7d}   "
+          f"recall@k 1.000   episodes/top-k {spread(truth):.1f}")
+
+    for n_episodes in args.episodes:
+        scanned = []
+
+        def two_stage(query):
+            folders = episodes.search(query, n_episodes)[0]
+            rows = index.metadata.rows(SearchFilter(episodes=folders))
+            scanned.append(len(rows))
+            return index.search(query, args.k, rows=rows)[0][0]
+
+        latencies, results = timed(two_stage, queries)
+        print(f"  {f'two-stage top {n_episodes}':<18} p50 {percentile_ms(latencies, 50):7.2f} ms   "
+              f"p95 {percentile_ms(latencies, 95):7.2f} ms   scanned {np.mean(scanned):7.0f}   "
+              f"recall@k {recall_at_k(results, truth):.3f}   episodes/top-k {spread(results):.1f}")
+
+
+if __name__ == "__main__":
+    main()
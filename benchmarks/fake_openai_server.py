@@ -0,0 +1,258 @@
+"""
+Fake OpenAI Server
+
+A local, dependency-free stand-in for the OpenAI embeddings and chat
+completions APIs so ingestion and answering can be exercised and
+benchmarked without network access or API spend.
+
+Embeddings are deterministic hashed bag-of-words vectors, so texts sharing
+words are close in cosine space and retrieval still behaves sensibly.
+Chat completions return a canned answer naming the guests found in the
+prompt, streamed token by token (server-sent events) when stream=true.
+
+Usage:
+    python benchmarks/fake_openai_server.py --port 8765 --latency-ms 150 --rpm 600
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python ingest_transcripts.py
+"""
+
+import re
+import json
+import math
+import time
+import hashlib
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+GUEST_RE = re.compile(r"^Guest: (.+)$", re.MULTILINE)
+
+
+def fake_embedding(text: str, dimensions: int = 1536) -> List[float]:
+    """Deterministic unit vector from hashed word counts"""
+    vector = [0.0] * dimensions
+    for word in WORD_RE.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], 'little') % dimensions
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[index] += sign
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def fake_answer(prompt: str, max_tokens: int) -> List[str]:
+    """Canned markdown answer, split into word-sized stream deltas"""
+    guests = list(dict.fromkeys(GUEST_RE.findall(prompt)))[:3] or ["the guests"]
+    sentence = (f"According to {', '.join(guests)}, the answer depends on context. "
+                f"As one guest put it, \"focus on what customers actually do.\" ")
+    words = []
+    while len(words) < max_tokens:
+        words.extend(sentence.split(" "))
+    return [word + " " for word in words[:max_tokens] if word]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_POST(self):
+        request = self._read_json()
+        server: FakeOpenAIServer = self.server.fake
+
+        if server.rate_limited():
+            self._send_json(429, {'error': {
+                'message': 'Rate limit reached for requests',
+                'type': 'requests',
+                'code': 'rate_limit_exceeded'
+            }}, headers={'retry-after': '1'})
+            return
+
+        if self.path.rstrip('/').endswith('/embeddings'):
+            self.handle_embeddings(request)
+        elif self.path.rstrip('/').endswith('/chat/completions'):
+            self.handle_chat(request)
+        else:
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+    def handle_embeddings(self, request: dict):
+        server: FakeOpenAIServer = self.server.fake
+        inputs = request.get('input', [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimensions = request.get('dimensions') or server.dimensions
+
+        time.sleep(server.latency_s)
+        data = [
+            {'object': 'embedding', 'index': i, 'embedding': fake_embedding(text, dimensions)}
+            for i, text in enumerate(inputs)
+        ]
+        n_tokens = sum(len(text.split()) for text in inputs)
+        server.record(len(inputs), n_tokens)
+        self._send_json(200, {
+            'object': 'list',
+            'data': data,
+            'model': request.get('model', 'text-embedding-3-small'),
+            'usage': {'prompt_tokens': n_tokens, 'total_tokens': n_tokens}
+        })
+
+    def handle_chat(self, request: dict):
+        server: FakeOpenAIServer = self.server.fake
+        prompt = "\n".join(str(m.get('content', '')) for m in request.get('messages', []))
+        deltas = fake_answer(prompt, min(request.get('max_tokens') or 200, server.answer_tokens))
+        model = request.get('model', 'gpt-4-turbo-preview')
+        prompt_tokens = len(prompt.split())
+        server.record(1, prompt_tokens + len(deltas), chat=True)
+        time.sleep(server.latency_s)
+
+        if not request.get('stream'):
+            self._send_json(200, {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': "".join(deltas).strip()},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': len(deltas),
+                          'total_tokens': prompt_tokens + len(deltas)}
+            })
+            return
+
+        # Server-sent events; the connection is closed to end the body
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def send(payload: dict):
+            payload = dict({'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk',
+                            'created': int(time.time()), 'model': model}, **payload)
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        def event(delta: dict, finish_reason: Optional[str] = None):
+            send({'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]})
+
+        event({'role': 'assistant', 'content': ''})
+        for delta in deltas:
+            time.sleep(server.token_latency_s)
+            event({'content': delta})
+        event({}, finish_reason='stop')
+        if (request.get('stream_options') or {}).get('include_usage'):
+            send({'choices': [], 'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': len(deltas),
+                                           'total_tokens': prompt_tokens + len(deltas)}})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeOpenAIServer:
+    """Runs the fake API on a background thread (usable as a context manager)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 dimensions: int = 1536, rpm: Optional[int] = None,
+                 token_latency_ms: float = 0.0, answer_tokens: int = 200):
+        self.latency_s = latency_ms / 1000.0
+        self.token_latency_s = token_latency_ms / 1000.0
+        self.answer_tokens = answer_tokens
+        self.dimensions = dimensions
+        self.rpm = rpm
+        self.n_requests = 0
+        self.n_chat_requests = 0
+        self.n_inputs = 0
+        self.n_tokens = 0
+        self.n_rate_limited = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), FakeOpenAIHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def rate_limited(self) -> bool:
+        """Sliding one-minute window over request arrivals"""
+        if not self.rpm:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if len(self._recent) >= self.rpm:
+                self.n_rate_limited += 1
+                return True
+            self._recent.append(now)
+        return False
+
+    def record(self, n_inputs: int, n_tokens: int, chat: bool = False):
+        with self._lock:
+            self.n_requests += 1
+            self.n_chat_requests += chat
+            self.n_inputs += n_inputs
+            self.n_tokens += n_tokens
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    parser.add_argument("--token-latency-ms", type=float, default=0.0,
+                        help="Delay between streamed chat tokens")
+    parser.add_argument("--answer-tokens", type=int, default=200, help="Tokens per chat answer")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--rpm", type=int, default=None, help="Return 429s above this many requests/minute")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency_ms, args.dimensions, args.rpm,
+                              args.token_latency_ms, args.answer_tokens)
+    print(f"🧪 Fake OpenAI API listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+BM25 Keyword Index
+
+Lexical retrieval over the same chunks stored in ChromaDB, so exact product
+and company names ("Mixpanel", "Palantir") are found even when embedding
+search ranks them low. The index is built from the collection after
+ingestion and persisted as flat NumPy arrays:
+
+    data/bm25_index/
+        index.json        # doc count, average length, BM25 parameters
+        terms.json        # vocabulary, in term-id order
+        ids.json          # chunk ID of each doc
+        term_offsets.npy  # postings range of each term
+        postings_docs.npy # doc numbers, grouped by term (uint16/uint32)
+        postings_tfs.npy  # term frequencies, parallel to postings_docs (uint16)
+        doc_lengths.npy   # tokens per doc
+        filter_*          # guest/date/keyword columns (see metadata_filters.py)
+
+Usage:
+    python bm25_index.py build
+    python bm25_index.py search "Why did companies switch from Mixpanel?"
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vector_index import top_k, replace_directory
+from metadata_filters import MetadataColumns, MetadataColumnsWriter
+
+BM25_PATH = "./data/bm25_index"
+BM25_FORMAT_VERSION = 1
+EXPORT_PAGE_SIZE = 1000
+
+K1 = 1.2
+B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be because been but by can
+could did do does doing don for from had has have he her here him his how i
+if in into is it its just like me more most my no not now of on one or other
+our out over really so some such than that the their them then there these
+they this to too up us very was we were what when where which who why will
+with would yeah you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, minus stopwords and timestamp fragments"""
+    return [
+        token for token in TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS and not (token.isdigit() and len(token) <= 2)
+    ]
+
+
+class BM25Index:
+    """Okapi BM25 scoring over memory-mapped postings"""
+
+    def __init__(self, path: str = BM25_PATH):
+        self.path = Path(path)
+        # Exports repoint the path at each new build; read this one throughout
+        directory = self.path.resolve()
+        with open(directory / "index.json", 'r', encoding='utf-8') as f:
+            self.info = json.load(f)
+        if self.info.get('version') != BM25_FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index format in {self.path}")
+
+        with open(directory / "terms.json", 'r', encoding='utf-8') as f:
+            self.terms = {term: i for i, term in enumerate(json.load(f))}
+        with open(directory / "ids.json", 'r', encoding='utf-8') as f:
+            self.ids = json.load(f)
+
+        self.count = self.info['count']
+        self.k1 = self.info['k1']
+        self.term_offsets = np.load(directory / "term_offsets.npy")
+        self.postings_docs = np.load(directory / "postings_docs.npy", mmap_mode='r')
+        self.postings_tfs = np.load(directory / "postings_tfs.npy", mmap_mode='r')
+
+        # Length normalization only depends on the doc, so fold it in up front
+        doc_lengths = np.load(directory / "doc_lengths.npy").astype(np.float32)
+        avg_length = self.info['avg_length'] or 1.0
+        self.doc_norms = self.k1 * (1 - self.info['b'] + self.info['b'] * doc_lengths / avg_length)
+        self.metadata = MetadataColumns.load(directory)
+
+    def idf(self, df: int) -> float:
+        return float(np.log(1 + (self.count - df + 0.5) / (df + 0.5)))
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every doc for the query"""
+        scores = np.zeros(self.count, dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self.terms.get(token)
+            if term is None:
+                continue
+            start, end = self.term_offsets[term], self.term_offsets[term + 1]
+            docs = self.postings_docs[start:end]
+            tfs = self.postings_tfs[start:end].astype(np.float32)
+            # Each doc appears once per term, so fancy-index += is safe here
+            scores[docs] += self.idf(end - start) * tfs * (self.k1 + 1) / (tfs + self.doc_norms[docs])
+        return scores
+
+    def search(self, query: str, k: int = 10, rows: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k docs for a query
+
+        Args:
+            query: Keyword query
+            k: Results to return
+            rows: Only rank these docs (e.g. from MetadataColumns.rows)
+
+        Returns:
+            (chunk ID, BM25 score) pairs, best first; only docs matching at
+            least one query term
+        """
+        scores = self.scores(query)
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            matched = rows[scores[rows] > 0]
+        else:
+            matched = np.flatnonzero(scores)
+        best = matched[top_k(scores[matched], k)]
+        return [(self.ids[i], float(scores[i])) for i in best]
+
+
+def export_bm25_index(collection, path: str = BM25_PATH, k1: float = K1, b: float = B) -> Dict:
+    """
+    Build a BM25 index over a ChromaDB collection's documents
+
+    Like export_index, the new index is written to a temporary directory and
+    swapped in with renames.
+
+    Args:
+        collection: ChromaDB collection
+        path: Output directory
+        k1: Term frequency saturation
+        b: Length normalization strength
+
+    Returns:
+        The index.json contents
+    """
+    target = Path(path)
+    tmp = target.with_name(target.name + f".tmp-{os.getpid()}")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    start = time.time()
+    total = collection.count()
+    vocabulary: Dict[str, int] = {}
+    ids: List[str] = []
+    # Postings are collected as flat (term, doc, tf) columns; Python lists
+    # of tuples would need several times the memory on the full corpus
+    posting_terms, posting_docs, posting_tfs = array('I'), array('I'), array('I')
+    doc_lengths = array('I')
+    metadata_columns = MetadataColumnsWriter()
+
+    for offset in range(0, total, EXPORT_PAGE_SIZE):
+        page = collection.get(include=['documents', 'metadatas'], limit=EXPORT_PAGE_SIZE, offset=offset)
+        for chunk_id, document, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+            doc = len(ids)
+            ids.append(chunk_id)
+            metadata_columns.add(metadata)
+            tokens = tokenize(document or "")
+            doc_lengths.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                posting_terms.append(vocabulary.setdefault(token, len(vocabulary)))
+                posting_docs.append(doc)
+                posting_tfs.append(tf)
+
+    count = len(ids)
+    terms = np.frombuffer(posting_terms, dtype=np.uint32)
+    order = np.argsort(terms, kind='stable')  # Keeps docs ascending within a term
+    doc_dtype = np.uint16 if count <= np.iinfo(np.uint16).max else np.uint32
+    np.save(tmp / "postings_docs.npy", np.frombuffer(posting_docs, dtype=np.uint32)[order].astype(doc_dtype))
+    np.save(tmp / "postings_tfs.npy",
+            np.minimum(np.frombuffer(posting_tfs, dtype=np.uint32)[order], 65535).astype(np.uint16))
+    np.save(tmp / "term_offsets.npy",
+            np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=len(vocabulary)))]).astype(np.int64))
+    np.save(tmp / "doc_lengths.npy", np.frombuffer(doc_lengths, dtype=np.uint32))
+    metadata_columns.save(tmp)
+
+    with open(tmp / "terms.json", 'w', encoding='utf-8') as f:
+        json.dump(list(vocabulary), f, ensure_ascii=False)
+    with open(tmp / "ids.json", 'w', encoding='utf-8') as f:
+        json.dump(ids, f)
+
+    info = {
+        'version': BM25_FORMAT_VERSION,
+        'count': count,
+        'n_terms': len(vocabulary),
+        'n_postings': len(terms),
+        'avg_length': float(np.mean(doc_lengths)) if count else 0.0,
+        'k1': k1,
+        'b': b,
+        'collection': collection.name,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    with open(tmp / "index.json", 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+
+    replace_directory(tmp, target)
+
+    print(f"🔤 Built BM25 index: {count} chunks, {len(vocabulary)} terms, "
+          f"{len(terms)} postings in {time.time() - start:.1f}s")
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 keyword index tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build the index from the ChromaDB collection")
+    build.add_argument("--collection", default="lenny_transcripts")
+    build.add_argument("--path", default=BM25_PATH)
+    search = subparsers.add_parser("search", help="Run a keyword query")
+    search.add_argument("query")
+    search.add_argument("--path", default=BM25_PATH)
+    search.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        import chromadb
+        client = chromadb.PersistentClient(path="./data/vector_db")
+        export_bm25_index(client.get_collection(args.collection), args.path)
+    else:
+        index = BM25Index(args.path)
+        start = time.perf_counter()
+        results = index.search(args.query, args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        for chunk_id, score in results:
+            print(f"{score:8.3f}  {chunk_id}")
+        print(f"⏱️  {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Speaker-Turn Chunker
+
+Token-accurate chunking for podcast transcripts:
+1. Splits the transcript into speaker turns ("Lenny (00:00:36):" blocks);
+   continuation blocks like "(00:01:21):" inherit and are labelled with the
+   previous speaker
+2. Packs whole turns into chunks up to a tiktoken budget, only splitting a
+   turn (at sentence boundaries) when it alone exceeds the budget
+3. Starts each chunk with the tail of the previous one as overlap
+4. Records speaker and start/end timestamps for every chunk
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from token_counting import count_tokens, tokenizer_name
+
+CHUNKER_VERSION = 1
+DEFAULT_CHUNK_TOKENS = 512
+DEFAULT_OVERLAP_TOKENS = 64
+
+TURN_HEADER_RE = re.compile(
+    r'^(?P<speaker>[^\n()]*?)[ \t]*\((?P<ts>\d{1,2}:\d{2}(?::\d{2})?)\):[ \t]*$',
+    re.MULTILINE
+)
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+SEPARATOR = "\n\n"
+SEPARATOR_TOKENS = 1
+
+
+def timestamp_to_seconds(ts: str) -> int:
+    """'01:02:03' or '02:03' -> seconds"""
+    seconds = 0
+    for part in ts.split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+class Turn:
+    """One speaker turn, or a piece of one that had to be split"""
+
+    __slots__ = ('speaker', 'ts', 'body', 'n_tokens')
+
+    def __init__(self, speaker: str, ts: Optional[str], body: str):
+        self.speaker = speaker
+        self.ts = ts
+        self.body = body
+        self.n_tokens = count_tokens(self.text)
+
+    @property
+    def header(self) -> str:
+        if self.ts is None:
+            return ""
+        return f"{self.speaker} ({self.ts}):" if self.speaker else f"({self.ts}):"
+
+    @property
+    def text(self) -> str:
+        header = self.header
+        return f"{header}\n{self.body}" if header else self.body
+
+
+def split_turns(content: str) -> List[Turn]:
+    """Split transcript content into speaker turns"""
+    turns = []
+    headers = list(TURN_HEADER_RE.finditer(content))
+
+    # Anything before the first header (title, "## Transcript") is dropped;
+    # the episode title is already in the chunk metadata
+    preamble = content[:headers[0].start()] if headers else content
+    preamble = "\n".join(
+        line for line in preamble.strip().splitlines() if not line.startswith('#')
+    ).strip()
+    if preamble:
+        turns.append(Turn("", None, preamble))
+
+    speaker = ""
+    for i, match in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(content)
+        body = content[match.end():end].strip()
+        # Continuation blocks carry only a timestamp: same speaker as before
+        speaker = match.group('speaker').strip() or speaker
+        if body:
+            turns.append(Turn(speaker, match.group('ts'), body))
+    return turns
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """Split text at sentence (then word) boundaries into pieces of at most max_tokens"""
+    pieces = []
+    current, current_tokens = [], 0
+    for sentence in SENTENCE_END_RE.split(text):
+        n_tokens = count_tokens(sentence) + 1
+        if n_tokens > max_tokens:
+            # A single run-on "sentence": fall back to words
+            words = sentence.split()
+            pieces.extend(split_words(words, max_tokens, current))
+            current, current_tokens = [], 0
+            continue
+        if current and current_tokens + n_tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += n_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_words(words: List[str], max_tokens: int, prefix: List[str]) -> List[str]:
+    """Greedy word packing used for sentences longer than max_tokens"""
+    pieces = []
+    current = list(prefix)
+    for word in words:
+        candidate = " ".join(current + [word])
+        if current and count_tokens(candidate) > max_tokens:
+            pieces.append(" ".join(current))
+            current = [word]
+        else:
+            current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def tail_text(text: str, max_tokens: int) -> str:
+    """Last whole sentences of text fitting in max_tokens (for overlap)"""
+    if max_tokens <= 0:
+        return ""
+    sentences = SENTENCE_END_RE.split(text)
+    tail, n_tokens = [], 0
+    for sentence in reversed(sentences):
+        sentence_tokens = count_tokens(sentence) + 1
+        if n_tokens + sentence_tokens > max_tokens:
+            break
+        tail.insert(0, sentence)
+        n_tokens += sentence_tokens
+    return " ".join(tail)
+
+
+class TranscriptChunker:
+    """Packs speaker turns into token-bounded, overlapping chunks"""
+
+    def __init__(self, chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                 overlap_tokens: int = DEFAULT_OVERLAP_TOKENS):
+        """
+        Args:
+            chunk_tokens: Maximum tokens per chunk (cl100k_base)
+            overlap_tokens: Tokens of the previous chunk repeated at the start
+                of the next one
+        """
+        if overlap_tokens >= chunk_tokens // 2:
+            raise ValueError("overlap_tokens must be less than half of chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def config(self) -> Dict:
+        """
+        Settings that change chunk boundaries (stored in the ingest
+        manifest), including whether token counts came from tiktoken or the
+        offline estimate, so switching between them re-chunks everything
+        """
+        return {
+            'chunker': 'speaker_turn',
+            'chunker_version': CHUNKER_VERSION,
+            'chunk_tokens': self.chunk_tokens,
+            'overlap_tokens': self.overlap_tokens,
+            'tokenizer': tokenizer_name()
+        }
+
+    def _fit_turns(self, turns: List[Turn]) -> List[Turn]:
+        """Split any turn that cannot fit in a chunk next to the overlap"""
+        budget = self.chunk_tokens - self.overlap_tokens - SEPARATOR_TOKENS
+        fitted = []
+        for turn in turns:
+            if turn.n_tokens <= budget:
+                fitted.append(turn)
+                continue
+            header_tokens = count_tokens(turn.header) + 1
+            for piece in split_text(turn.body, budget - header_tokens):
+                fitted.append(Turn(turn.speaker, turn.ts, piece))
+        return fitted
+
+    def _overlap_turn(self, previous: List[Turn]) -> Optional[Turn]:
+        """Tail of the previous chunk's last turn, re-headed with its speaker"""
+        if not self.overlap_tokens or not previous:
+            return None
+        last = previous[-1]
+        header_tokens = count_tokens(last.header) + 1 if last.ts else 0
+        tail = tail_text(last.body, self.overlap_tokens - header_tokens)
+        if not tail:
+            return None
+        return Turn(last.speaker, last.ts, tail)
+
+    def _make_chunk(self, turns: List[Turn], next_ts: Optional[str]) -> Dict:
+        # Continuation blocks are re-headed with their inherited speaker, so
+        # every turn in a chunk is attributed even if the chunk starts mid-answer
+        text = SEPARATOR.join(turn.text for turn in turns)
+
+        by_speaker = Counter()
+        for turn in turns:
+            if turn.speaker:
+                by_speaker[turn.speaker] += turn.n_tokens
+        timestamps = [turn.ts for turn in turns if turn.ts]
+        start_ts = timestamps[0] if timestamps else ""
+        end_ts = next_ts or (timestamps[-1] if timestamps else "")
+
+        return {
+            'text': text,
+            'speaker': by_speaker.most_common(1)[0][0] if by_speaker else "",
+            'speakers': ", ".join(by_speaker),
+            'start_time': start_ts,
+            'end_time': end_ts,
+            'start_seconds': timestamp_to_seconds(start_ts) if start_ts else -1,
+            'end_seconds': timestamp_to_seconds(end_ts) if end_ts else -1,
+            'n_tokens': count_tokens(text)
+        }
+
+    def chunk(self, content: str) -> List[Dict]:
+        """
+        Chunk transcript content
+
+        Returns:
+            List of dicts with text, speaker, speakers, start/end timestamps
+            (as 'HH:MM:SS' strings and seconds) and n_tokens
+        """
+        turns = self._fit_turns(split_turns(content))
+
+        groups: List[Tuple[List[Turn], int]] = []
+        current: List[Turn] = []
+        current_tokens = 0
+        for index, turn in enumerate(turns):
+            added = turn.n_tokens + (SEPARATOR_TOKENS if current else 0)
+            if current and current_tokens + added > self.chunk_tokens:
+                groups.append((current, index))
+                overlap = self._overlap_turn(current)
+                current = [overlap] if overlap else []
+                current_tokens = overlap.n_tokens if overlap else 0
+                added = turn.n_tokens + (SEPARATOR_TOKENS if current else 0)
+            current.append(turn)
+            current_tokens += added
+        if current:
+            groups.append((current, len(turns)))
+
+        chunks = []
+        for group, next_index in groups:
+            # A chunk ends where the next turn starts, when that is known
+            next_ts = None
+            if next_index < len(turns) and turns[next_index].ts != group[-1].ts:
+                next_ts = turns[next_index].ts
+            chunks.append(self._make_chunk(group, next_ts))
+        return chunks
@@ -0,0 +1,168 @@
+"""
+Context Packing
+
+Turns retrieved chunks into the prompt's TRANSCRIPT EXCERPTS within a token
+budget:
+1. Drops near-identical chunks (re-uploaded episodes, repeated sponsor reads)
+2. Orders the rest by maximal marginal relevance (MMR): retrieval rank for
+   relevance, word-shingle overlap with already chosen chunks for redundancy
+3. Greedily adds chunks in that order while the packed context fits the
+   tiktoken budget
+4. Groups chosen chunks by episode under one Guest/Episode header, joining
+   adjacent chunks without the overlap the chunker repeated between them
+"""
+
+import os
+from typing import Dict, FrozenSet, List, Tuple
+
+from token_counting import count_tokens
+
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("LENNY_CONTEXT_TOKENS", "4000"))
+DUPLICATE_THRESHOLD = 0.8  # Shingle Jaccard similarity above which chunks count as copies
+MMR_LAMBDA = 0.7           # 1.0 = pure relevance, 0.0 = pure diversity
+SHINGLE_SIZE = 3
+
+SOURCE_SEPARATOR = "\n---\n\n"
+GAP_MARKER = "\n\n[...]\n\n"
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> FrozenSet[Tuple[str, ...]]:
+    """Set of word n-grams, the unit of lexical overlap between chunks"""
+    words = text.lower().split()
+    if len(words) < size:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def jaccard(a: FrozenSet, b: FrozenSet) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def strip_overlap(previous: str, text: str) -> str:
+    """
+    Remove the leading overlap turn the chunker copies from the end of the
+    previous chunk, if text directly follows previous
+    """
+    first, _, rest = text.partition("\n\n")
+    header, _, body = first.partition("\n")
+    tail = (body or header).strip()
+    if rest and tail and previous.rstrip().endswith(tail):
+        return rest
+    return text
+
+
+class ContextPacker:
+    """Deduplicate, diversify, merge and budget retrieved chunks"""
+
+    def __init__(self, max_tokens: int = DEFAULT_CONTEXT_TOKENS, mmr_lambda: float = MMR_LAMBDA,
+                 duplicate_threshold: float = DUPLICATE_THRESHOLD):
+        """
+        Args:
+            max_tokens: Token budget for the packed excerpts (cl100k_base)
+            mmr_lambda: Relevance/diversity trade-off for ordering
+            duplicate_threshold: Similarity above which a lower-ranked
+                chunk is dropped as a copy
+        """
+        self.max_tokens = max_tokens
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+
+    def deduplicate(self, chunks: List[Dict], chunk_shingles: List[FrozenSet]) -> List[int]:
+        """Indices of chunks kept, dropping later copies of earlier ones"""
+        kept = []
+        for i in range(len(chunks)):
+            if all(jaccard(chunk_shingles[i], chunk_shingles[j]) < self.duplicate_threshold for j in kept):
+                kept.append(i)
+        return kept
+
+    def mmr_order(self, candidates: List[int], chunk_shingles: List[FrozenSet]) -> List[int]:
+        """Reorder candidates (given best first) by maximal marginal relevance"""
+        n = len(candidates)
+        relevance = {index: 1.0 - rank / n for rank, index in enumerate(candidates)}
+        redundancy = {index: 0.0 for index in candidates}
+        remaining = list(candidates)
+        ordered = []
+        while remaining:
+            best = max(remaining, key=lambda i: self.mmr_lambda * relevance[i]
+                       - (1 - self.mmr_lambda) * redundancy[i])
+            remaining.remove(best)
+            ordered.append(best)
+            for i in remaining:
+                redundancy[i] = max(redundancy[i], jaccard(chunk_shingles[i], chunk_shingles[best]))
+        return ordered
+
+    def render(self, groups: List[List[Dict]]) -> List[str]:
+        """One excerpt block per episode group, adjacent chunks merged"""
+        blocks = []
+        for number, group in enumerate(groups, start=1):
+            meta = group[0]['metadata']
+            group = sorted(group, key=lambda c: c['metadata'].get('chunk_index', 0))
+            text = group[0]['text']
+            for previous, chunk in zip(group, group[1:]):
+                if chunk['metadata'].get('chunk_index') == previous['metadata'].get('chunk_index', -2) + 1:
+                    text += "\n\n" + strip_overlap(previous['text'], chunk['text'])
+                else:
+                    text += GAP_MARKER + chunk['text']
+            blocks.append(
+                f"[Source {number}]\n"
+                f"Guest: {meta.get('guest', 'Unknown')}\n"
+                f"Episode: {meta.get('title', 'Unknown')}\n"
+                f"Content:\n{text}\n"
+            )
+        return blocks
+
+    def pack(self, chunks: List[Dict]) -> Tuple[str, Dict]:
+        """
+        Pack chunks (best first) into the context string
+
+        Returns:
+            (context, stats) where stats counts tokens, chunks used and
+            chunks dropped as duplicates or for the budget
+        """
+        chunk_shingles = [shingles(chunk['text']) for chunk in chunks]
+        candidates = self.deduplicate(chunks, chunk_shingles)
+        ordered = self.mmr_order(candidates, chunk_shingles)
+
+        # Greedy fill: only the block of the episode a chunk joins changes,
+        # so just that block is recounted per step
+        groups: Dict[str, List[Dict]] = {}
+        block_tokens: Dict[str, int] = {}
+        separator_tokens = count_tokens(SOURCE_SEPARATOR)
+        selected = []
+        for i in ordered:
+            chunk = chunks[i]
+            key = chunk['metadata'].get('episode_folder') or chunk['metadata'].get('title', '')
+            group = groups.get(key, []) + [chunk]
+            tokens = count_tokens(self.render([group])[0])
+            total = (sum(block_tokens.values()) - block_tokens.get(key, 0) + tokens
+                     + separator_tokens * (len(block_tokens | {key: 0}) - 1))
+            if self.max_tokens and total > self.max_tokens:
+                continue
+            groups[key] = group
+            block_tokens[key] = tokens
+            selected.append(i)
+
+        context = SOURCE_SEPARATOR.join(self.render(list(groups.values())))
+        n_tokens = count_tokens(context)
+        # Source numbering and joins can shift the count slightly; trim to fit exactly
+        while self.max_tokens and n_tokens > self.max_tokens and len(selected) > 1:
+            dropped = chunks[selected.pop()]
+            for key, group in list(groups.items()):
+                if dropped in group:
+                    group.remove(dropped)
+                    if not group:
+                        del groups[key]
+            context = SOURCE_SEPARATOR.join(self.render(list(groups.values())))
+            n_tokens = count_tokens(context)
+
+        return context, {
+            'tokens': n_tokens,
+            'chunks': len(chunks),
+            'used': len(selected),
+            'duplicates': len(chunks) - len(candidates),
+            'over_budget': len(candidates) - len(selected),
+            'sources': len(groups)
+        }
+
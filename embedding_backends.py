@@ -0,0 +1,218 @@
+"""
+Embedding Backends
+
+The model that turns transcript chunks and questions into vectors:
+- openai: text-embedding-3-small over the API (1536 dims)
+- local: all-MiniLM-L6-v2 on CPU via ONNX Runtime (384 dims); no API key
+  or network once the model files are on disk, and a query embeds in a
+  few milliseconds instead of a ~100 ms round trip
+
+Vectors from different models can't be compared, so each collection
+records the backend, model and dimension that built it (see
+collection_backend). LennyRAG follows the record, and ingestion refuses
+to add vectors from another backend unless asked to rebuild with --full.
+
+Both backends go through the same persistent embedding cache; the model
+name in the cache key keeps their vectors apart.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+from embedding_cache import (CachedEmbeddingFunction, EmbeddingCache, EMBEDDING_CACHE_PATH,
+                             DEFAULT_MAX_ENTRIES)
+
+EMBEDDING_BACKENDS = {
+    'openai': {'model': "text-embedding-3-small", 'dim': 1536},
+    'local': {'model': ONNXMiniLM_L6_V2.MODEL_NAME, 'dim': 384},
+}
+DEFAULT_BACKEND = os.getenv("LENNY_EMBEDDING_BACKEND", "openai")
+
+# Local backend: model files (a copy of Chroma's all-MiniLM-L6-v2 ONNX
+# export, downloaded on first use), texts per inference call and threads
+LOCAL_MODEL_PATH = os.getenv("LENNY_LOCAL_MODEL_PATH",
+                             str(Path.home() / ".cache" / "chroma" / "onnx_models" / "all-MiniLM-L6-v2"))
+LOCAL_BATCH_SIZE = int(os.getenv("LENNY_LOCAL_EMBEDDING_BATCH", "32"))
+LOCAL_WORKERS = int(os.getenv("LENNY_LOCAL_EMBEDDING_WORKERS", str(os.cpu_count() or 1)))
+
+
+class LocalEmbeddingFunction(ONNXMiniLM_L6_V2):
+    """
+    Chroma's MiniLM ONNX embedding function, made faster for bulk and
+    single-query use:
+    - each batch is padded to its longest text, not always to 256 tokens
+    - texts are sorted by length first, so batches waste little padding
+    - batches run concurrently on a thread pool (ONNX Runtime releases the
+      GIL), each session call using its share of the CPU cores
+
+    Vectors match Chroma's implementation, and the registered name and
+    config are unchanged, so Chroma tooling can still rebuild it. It
+    overrides private members of the parent class, so requirements.txt pins
+    ChromaDB to the releases tests/test_local_embeddings.py was run against.
+    """
+
+    DOWNLOAD_PATH = Path(LOCAL_MODEL_PATH)
+
+    def __init__(self, preferred_providers: Optional[List[str]] = None,
+                 batch_size: int = LOCAL_BATCH_SIZE, max_workers: int = LOCAL_WORKERS):
+        """
+        Args:
+            preferred_providers: ONNX Runtime execution providers (default: all available)
+            batch_size: Texts per inference call
+            max_workers: Inference calls run concurrently
+        """
+        super().__init__(preferred_providers=preferred_providers)
+        self.batch_size = batch_size
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="local-embedding")
+
+    @cached_property
+    def tokenizer(self):
+        tokenizer = self.Tokenizer.from_file(
+            os.path.join(self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME, "tokenizer.json")
+        )
+        tokenizer.enable_truncation(max_length=self.max_tokens())
+        tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")  # to the batch's longest text
+        return tokenizer
+
+    @cached_property
+    def model(self):
+        providers = self._preferred_providers or self.ort.get_available_providers()
+        providers = [p for p in providers if p != "CoreMLExecutionProvider"]
+        options = self.ort.SessionOptions()
+        options.log_severity_level = 3
+        options.graph_optimization_level = self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Concurrent calls split the cores instead of oversubscribing them
+        options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+        return self.ort.InferenceSession(
+            os.path.join(self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME, "model.onnx"),
+            providers=providers,
+            sess_options=options
+        )
+
+    def _forward_batch(self, documents: List[str]) -> np.ndarray:
+        """Mean-pooled, unit-normalized embeddings for one batch"""
+        encoded = self.tokenizer.encode_batch(documents)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        last_hidden_state = self.model.run(None, {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.zeros_like(input_ids),
+        })[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        embeddings = (last_hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return self._normalize(embeddings).astype(np.float32)
+
+    def _forward(self, documents: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        if not documents:
+            return np.zeros((0, EMBEDDING_BACKENDS['local']['dim']), dtype=np.float32)
+        batch_size = batch_size or self.batch_size
+        order = sorted(range(len(documents)), key=lambda i: len(documents[i]))
+        batches = [[documents[i] for i in order[start:start + batch_size]]
+                   for start in range(0, len(order), batch_size)]
+        if len(batches) == 1:
+            sorted_embeddings = self._forward_batch(batches[0])
+        else:
+            sorted_embeddings = np.concatenate(list(self._executor.map(self._forward_batch, batches)))
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        return embeddings
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Validated backend name (default: LENNY_EMBEDDING_BACKEND, else openai)"""
+    backend = backend or DEFAULT_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, "
+                         f"expected one of {tuple(EMBEDDING_BACKENDS)}")
+    return backend
+
+
+def backend_for_model(model_name: Optional[str]) -> Optional[str]:
+    """Backend producing a model's vectors (e.g. from an index's recorded model), if known"""
+    for backend, spec in EMBEDDING_BACKENDS.items():
+        if spec['model'] == model_name:
+            return backend
+    return None
+
+
+def backend_record(backend: str) -> Dict:
+    """Collection metadata identifying the vectors a backend produces"""
+    spec = EMBEDDING_BACKENDS[backend]
+    return {
+        'embedding_backend': backend,
+        'embedding_model': spec['model'],
+        'embedding_dim': spec['dim']
+    }
+
+
+def collection_backend(collection) -> Optional[str]:
+    """
+    Backend that built the vectors in a collection
+
+    Returns:
+        The recorded backend, or "openai" for collections from before
+        backends were recorded (it was the only one); None if the
+        collection is empty, so any backend can fill it
+    """
+    if not collection.count():
+        return None
+    return (collection.metadata or {}).get('embedding_backend') or "openai"
+
+
+def check_collection(collection, backend: str):
+    """Raise ValueError if collection holds vectors from a different backend"""
+    built_with = collection_backend(collection)
+    if built_with is not None and built_with != backend:
+        raise ValueError(
+            f"Collection {collection.name!r} was built with the {built_with!r} embedding "
+            f"backend, not {backend!r}; its vectors are not comparable. Use "
+            f"LENNY_EMBEDDING_BACKEND={built_with}, or re-ingest with --full to switch."
+        )
+
+
+def record_backend(collection, backend: str):
+    """Store the backend record in the collection metadata, if missing"""
+    metadata = collection.metadata or {}
+    record = backend_record(backend)
+    if any(metadata.get(key) != value for key, value in record.items()):
+        collection.modify(metadata={**metadata, **record})
+
+
+def create_embedding_function(backend: Optional[str] = None,
+                              cache_path: str = EMBEDDING_CACHE_PATH,
+                              max_entries: int = DEFAULT_MAX_ENTRIES) -> CachedEmbeddingFunction:
+    """
+    Cached embedding function for a backend
+
+    Args:
+        backend: One of EMBEDDING_BACKENDS (default: LENNY_EMBEDDING_BACKEND, else openai)
+        cache_path: Embedding cache database
+        max_entries: Embedding cache size
+
+    Returns:
+        A CachedEmbeddingFunction; its model_name is the backend's model
+    """
+    backend = resolve_backend(backend)
+    model_name = EMBEDDING_BACKENDS[backend]['model']
+    if backend == "local":
+        embedding_function = LocalEmbeddingFunction()
+    else:
+        from chromadb.utils import embedding_functions
+        embedding_function = embedding_functions.OpenAIEmbeddingFunction(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            model_name=model_name
+        )
+    return CachedEmbeddingFunction(
+        embedding_function,
+        model_name=model_name,
+        cache=EmbeddingCache(cache_path, max_entries=max_entries)
+    )
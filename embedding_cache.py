@@ -0,0 +1,205 @@
+"""
+Persistent Embedding Cache
+
+Wraps an embedding function with an on-disk SQLite cache keyed by
+(model name, hash of normalized text), so:
+1. Rebuilding the index only embeds text that has never been seen
+2. Repeated queries skip the embedding API call entirely
+3. The cache stays bounded via least-recently-used eviction
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from array import array
+from typing import List, Dict, Optional
+
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+EMBEDDING_CACHE_PATH = "./data/embedding_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = 200_000  # ~1.2 GB at 1536 float32 dims
+EVICT_TO = 0.9                 # Eviction trims to this share of max_entries
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text before hashing so trivial whitespace changes still hit"""
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """Cache key for a (model, text) pair"""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding store with LRU eviction and hit/miss counters"""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+        # Row count kept in memory, so inserts don't scan the table; other
+        # processes sharing the file make it drift, so eviction re-counts
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Look up cached vectors; returns only the keys that were found"""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """Store vectors, evicting the least recently used entries if over budget"""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+        keys = list(items)
+        with self._lock:
+            existing = 0
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                (found,) = self._conn.execute(
+                    f"SELECT COUNT(*) FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchone()
+                existing += found
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows
+            )
+            self._count += len(rows) - existing
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Trim the table to EVICT_TO of max_entries, oldest first (caller holds the lock)"""
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = self._count - int(self.max_entries * EVICT_TO)
+        if self._count > self.max_entries and overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._count -= overflow
+            self.evictions += overflow
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self),
+            'max_entries': self.max_entries
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Embedding function that serves vectors from an EmbeddingCache and only
+    forwards cache misses to the wrapped function
+
+    It reports the wrapped function's name and config to ChromaDB, so
+    collections created with the plain OpenAI function keep loading.
+    """
+
+    def __init__(self, embedding_function: EmbeddingFunction, model_name: str,
+                 cache: Optional[EmbeddingCache] = None):
+        self.embedding_function = embedding_function
+        self.model_name = model_name
+        self.cache = cache if cache is not None else EmbeddingCache()
+
+    def __call__(self, input: Documents) -> Embeddings:
+        keys = [cache_key(self.model_name, text) for text in input]
+        cached = self.cache.get_many(keys)
+
+        # Embed each missing text once, even if it appears several times
+        missing = {}
+        for key, text in zip(keys, input):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embedding_function(list(missing.values()))
+            fresh = {key: [float(x) for x in vector] for key, vector in zip(missing, vectors)}
+            self.cache.put_many(fresh)
+            cached.update(fresh)
+
+        return [cached[key] for key in keys]
+
+    def name(self) -> str:
+        return self.embedding_function.name()
+
+    def get_config(self) -> Dict:
+        return self.embedding_function.get_config()
+
+    def build_from_config(self, config: Dict) -> EmbeddingFunction:
+        return self.embedding_function.build_from_config(config)
+
+    def default_space(self):
+        return self.embedding_function.default_space()
+
+    def supported_spaces(self):
+        return self.embedding_function.supported_spaces()
+
@@ -0,0 +1,269 @@
+"""
+Concurrent Embedding Pipeline
+
+Computes embeddings separately from the ChromaDB write:
+1. Serves already-embedded text from the embedding cache
+2. Packs the rest into requests by token count (not chunk count)
+3. Keeps several requests in flight on a thread pool
+4. Paces requests with token buckets sized from the RPM/TPM budgets
+5. Retries rate-limit and transient errors with exponential backoff
+
+Point OPENAI_BASE_URL at a local server (see benchmarks/fake_openai_server.py)
+to exercise it without the real API.
+"""
+
+import os
+import time
+import random
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import openai
+
+from embedding_cache import EmbeddingCache, cache_key
+from token_counting import count_tokens_batch
+from instrumentation import stage, count
+
+# Defaults for text-embedding-3-small on a tier-1 account; override per deployment
+DEFAULT_RPM = int(os.getenv("OPENAI_EMBEDDING_RPM", "3000"))
+DEFAULT_TPM = int(os.getenv("OPENAI_EMBEDDING_TPM", "1000000"))
+
+MAX_BATCH_TOKENS = 100_000  # OpenAI allows ~300k tokens per request
+MAX_BATCH_ITEMS = 512       # Also keeps each collection.add well under Chroma's limit
+CACHE_LOOKUP_SIZE = 256
+
+Vector = List[float]
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0):
+        """Block until amount tokens are available, then take them"""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait_time = (amount - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets enforced together"""
+
+    def __init__(self, requests_per_minute: int = DEFAULT_RPM, tokens_per_minute: int = DEFAULT_TPM):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, n_tokens: int):
+        self.requests.acquire(1)
+        self.tokens.acquire(n_tokens)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, timeouts, connection drops and 5xx responses are worth retrying"""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError,
+                          openai.APITimeoutError, openai.InternalServerError)):
+        return True
+    status = getattr(error, 'status_code', None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-suggested wait time, if the response carried one"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('retry-after')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class EmbeddingPipeline:
+    """Embeds a stream of records concurrently within the API rate budget"""
+
+    def __init__(self, embedding_function: Callable[[List[str]], List[Vector]],
+                 model_name: str, cache: Optional[EmbeddingCache] = None,
+                 requests_per_minute: int = DEFAULT_RPM,
+                 tokens_per_minute: int = DEFAULT_TPM,
+                 max_workers: int = 4,
+                 max_batch_tokens: int = MAX_BATCH_TOKENS,
+                 max_batch_items: int = MAX_BATCH_ITEMS,
+                 max_retries: int = 6):
+        """
+        Args:
+            embedding_function: Uncached function embedding a list of texts
+            model_name: Model name, used for cache keys
+            cache: Optional embedding cache consulted before calling the API
+            requests_per_minute: Request budget
+            tokens_per_minute: Token budget
+            max_workers: Requests kept in flight at once
+            max_batch_tokens: Token cap per embedding request
+            max_batch_items: Input cap per embedding request
+            max_retries: Attempts per request before giving up on it
+        """
+        self.embedding_function = embedding_function
+        self.model_name = model_name
+        self.cache = cache
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_workers = max_workers
+        self.max_batch_tokens = min(max_batch_tokens, tokens_per_minute)
+        self.max_batch_items = max_batch_items
+        self.max_retries = max_retries
+
+        self.n_requests = 0
+        self.n_tokens = 0
+        self.n_retries = 0
+        self._stats_lock = threading.Lock()
+
+    def _embed_batch(self, texts: List[str], n_tokens: int) -> List[Vector]:
+        """Embed one request's worth of texts, retrying retryable errors"""
+        for attempt in range(self.max_retries):
+            with stage("rate_limit_wait"):
+                self.limiter.acquire(n_tokens)
+            try:
+                with stage("embed_request", n_texts=len(texts)):
+                    vectors = self.embedding_function(texts)
+                with self._stats_lock:
+                    self.n_requests += 1
+                    self.n_tokens += n_tokens
+                count("embedding_requests")
+                count("embedding_tokens", n_tokens)
+                return [[float(x) for x in vector] for vector in vectors]
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries - 1:
+                    raise
+                with self._stats_lock:
+                    self.n_retries += 1
+                count("embedding_retries")
+                wait_time = retry_after_seconds(e) or min(60.0, 2 ** attempt)
+                wait_time *= random.uniform(1.0, 1.25)  # Jitter so workers don't retry in lockstep
+                print(f"  ⏳ {e.__class__.__name__}, retrying in {wait_time:.1f}s "
+                      f"(attempt {attempt + 1}/{self.max_retries})")
+                time.sleep(wait_time)
+
+    def _lookup_cached(self, records: List[Dict]) -> Tuple[List[Dict], List[Vector], List[Dict]]:
+        """Split records into (cached records, their vectors, records still to embed)"""
+        if self.cache is None:
+            return [], [], records
+        keys = [cache_key(self.model_name, r['text']) for r in records]
+        found = self.cache.get_many(keys)
+        hits, vectors, misses = [], [], []
+        for record, key in zip(records, keys):
+            if key in found:
+                hits.append(record)
+                vectors.append(found[key])
+            else:
+                misses.append(record)
+        return hits, vectors, misses
+
+    def _store_cached(self, records: List[Dict], vectors: List[Vector]):
+        if self.cache is not None:
+            self.cache.put_many({
+                cache_key(self.model_name, r['text']): vector
+                for r, vector in zip(records, vectors)
+            })
+
+    def _batches(self, records: Iterable[Dict]) -> Iterator[Tuple[str, List[Dict], object]]:
+        """
+        Group records into ('cached', records, vectors) and
+        ('embed', records, n_tokens) work items
+        """
+        pending, pending_tokens = [], 0
+        group = []
+
+        def drain(group):
+            nonlocal pending, pending_tokens
+            hits, vectors, misses = self._lookup_cached(group)
+            if hits:
+                count("embedding_cache_hits", len(hits))
+                yield ('cached', hits, vectors)
+            # The chunker already counted most records' tokens
+            uncounted = [r['text'] for r in misses if r.get('n_tokens') is None]
+            counted = iter(count_tokens_batch(uncounted))
+            for record in misses:
+                n_tokens = record.get('n_tokens')
+                if n_tokens is None:
+                    n_tokens = next(counted)
+                if pending and (pending_tokens + n_tokens > self.max_batch_tokens
+                                or len(pending) >= self.max_batch_items):
+                    yield ('embed', pending, pending_tokens)
+                    pending, pending_tokens = [], 0
+                pending.append(record)
+                pending_tokens += n_tokens
+
+        for record in records:
+            group.append(record)
+            if len(group) >= CACHE_LOOKUP_SIZE:
+                yield from drain(group)
+                group = []
+        if group:
+            yield from drain(group)
+        if pending:
+            yield ('embed', pending, pending_tokens)
+
+    def embed_records(self, records: Iterable[Dict]) -> Iterator[Tuple[List[Dict], Optional[List[Vector]]]]:
+        """
+        Embed records (dicts with a 'text' key and optionally a precomputed
+        'n_tokens') as they stream in
+
+        Yields:
+            (records, vectors) for each batch as soon as it completes, in
+            completion order; vectors is None if the batch failed for good
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight: Dict[Future, List[Dict]] = {}
+
+            def finished(futures) -> Iterator[Tuple[List[Dict], Optional[List[Vector]]]]:
+                for future in futures:
+                    batch = in_flight.pop(future)
+                    try:
+                        vectors = future.result()
+                    except Exception as e:
+                        print(f"  ❌ Embedding request for {len(batch)} chunks failed: {e}")
+                        yield batch, None
+                        continue
+                    self._store_cached(batch, vectors)
+                    yield batch, vectors
+
+            for kind, batch, payload in self._batches(records):
+                if kind == 'cached':
+                    yield batch, payload
+                    continue
+
+                # Bound the work queued ahead of the rate limiter
+                while len(in_flight) >= self.max_workers * 2:
+                    done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                    yield from finished(done)
+
+                # Each request's stages belong to the caller's trace
+                future = executor.submit(contextvars.copy_context().run, self._embed_batch,
+                                         [r['text'] for r in batch], payload)
+                in_flight[future] = batch
+
+            while in_flight:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                yield from finished(done)
+
+    def stats(self) -> Dict:
+        return {
+            'requests': self.n_requests,
+            'tokens': self.n_tokens,
+            'retries': self.n_retries
+        }
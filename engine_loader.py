@@ -0,0 +1,133 @@
+"""
+Engine Loader
+
+Builds the LennyRAG engine in a background thread, so a server can render
+its page (a "warming up" state) before the heavy imports (chromadb, openai,
+numpy), the collection and the local indexes are loaded:
+
+    loader = EngineLoader().start()   # returns immediately
+    ...
+    if loader.ready:
+        loader.rag.ask(...)
+
+This module only imports the standard library; everything else is imported
+by the loading thread. While a first-boot ingestion is still building the
+collection (see running_ingestion in ingest_state.py), the loader
+waits and swaps the engine in once the index is built; an incremental
+sync doesn't hold it up (the engine reloads the indexes it re-exports,
+see LennyRAG.reload_indexes).
+"""
+
+import os
+import time
+import threading
+from typing import Callable, Dict, Optional
+
+# Fast start: serve right away and load the engine in the background
+FAST_START = os.getenv("LENNY_FAST_START", "0") == "1"
+LOAD_RETRY_INTERVAL = float(os.getenv("LENNY_LOAD_RETRY_S", "5"))
+
+# Close enough to process start for startup timings: servers import this first
+PROCESS_START = time.time()
+
+
+def default_factory():
+    """A warmed-up LennyRAG configured from the environment"""
+    from rag_system import LennyRAG
+
+    rag = LennyRAG()
+    rag.warm_up()
+    return rag
+
+
+class EngineLoader:
+    """Loads an engine once, off the request path, and reports its progress"""
+
+    def __init__(self, factory: Optional[Callable] = None, retry_interval: float = LOAD_RETRY_INTERVAL):
+        """
+        Args:
+            factory: Builds the engine (default: a warmed-up LennyRAG)
+            retry_interval: Seconds between attempts while ingestion is
+                still building the index
+        """
+        self.factory = factory or default_factory
+        self.retry_interval = retry_interval
+        self.rag = None
+        self.error: Optional[str] = None
+        self.phase = "starting"
+        self.attempts = 0
+        self.timings: Dict[str, float] = {}
+        self._started = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.rag is not None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the process started"""
+        return time.time() - PROCESS_START
+
+    def start(self) -> "EngineLoader":
+        """Start loading in a daemon thread (once); returns self"""
+        with self._lock:
+            if not self._started.is_set():
+                self._started.set()
+                threading.Thread(target=self._load, name="engine-loader", daemon=True).start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until loading finished or failed; True if the engine is ready"""
+        self.start()
+        self._done.wait(timeout)
+        return self.ready
+
+    def _load(self):
+        try:
+            start = time.time()
+            self.phase = "importing modules"
+            from ingest_state import running_ingestion
+            import rag_system  # noqa: F401 - the bulk of the import time
+            self.timings['import_s'] = time.time() - start
+
+            while True:
+                if running_ingestion() == "build":
+                    # A half-built collection would load, but answer badly
+                    self._wait_for_ingestion("ingestion is building the index")
+                    continue
+                self.attempts += 1
+                self.phase = "loading the index"
+                step = time.time()
+                try:
+                    rag = self.factory()
+                    break
+                except Exception as e:
+                    if running_ingestion() is None:
+                        raise
+                    self._wait_for_ingestion(f"{e.__class__.__name__} while ingestion is running")
+            self.timings['load_s'] = time.time() - step
+            self.timings['ready_s'] = self.elapsed
+            self.rag = rag
+            self.phase = "ready"
+            print(f"🚀 Engine ready {self.timings['ready_s']:.1f}s after start "
+                  f"(imports {self.timings['import_s']:.1f}s, index and warm-up {self.timings['load_s']:.1f}s)")
+        except Exception as e:
+            self.error = f"{e.__class__.__name__}: {e}"
+            self.phase = "failed"
+            print(f"❌ Engine failed to load: {self.error}")
+        finally:
+            self._done.set()
+
+    def _wait_for_ingestion(self, reason: str):
+        if not self.phase.startswith("waiting"):
+            print(f"⏳ Waiting for ingestion to finish ({reason}), checking every {self.retry_interval:g}s")
+        self.phase = "waiting for ingestion to finish"
+        time.sleep(self.retry_interval)
+
+    def record_answer(self):
+        """Note the first answer served, for the time-to-first-answer report"""
+        if 'first_answer_s' not in self.timings:
+            self.timings['first_answer_s'] = self.elapsed
+            print(f"💬 First answer {self.timings['first_answer_s']:.1f}s after start")
@@ -0,0 +1,218 @@
+"""
+Episode Index
+
+Episode-level summary vectors for two-stage (coarse-to-fine) retrieval: the
+first stage ranks a few hundred episodes instead of every chunk, the second
+ranks chunks within the top episodes only (see LennyRAG's two_stage mode).
+
+Each episode's vector blends
+- the centroid of its chunk embeddings (what is said in it), and
+- the embedding of its title and description (what it is about)
+
+    data/episode_index/
+        index.json      # count, dimension, embedding model, title weight
+        vectors.npy     # (episodes, dim) float32, unit-normalized
+        episodes.json   # {"episode_folder", "guest", "title", "n_chunks"} per row
+        filter_*        # guest/date/keyword columns, one row per episode
+
+It is built from the exported vector index (vector_index.py) and the
+transcript frontmatter; the title/description embeddings go through the
+embedding cache, so rebuilding it is free once they are cached.
+
+Usage:
+    python episode_index.py build
+    python episode_index.py search "How do you find product-market fit?"
+"""
+
+import os
+import json
+import time
+import shutil
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import transcript_parser
+from vector_index import VectorIndex, INDEX_PATH, normalize_rows, top_k, replace_directory
+from metadata_filters import MetadataColumns, MetadataColumnsWriter, SearchFilter
+
+EPISODE_INDEX_PATH = "./data/episode_index"
+EPISODE_FORMAT_VERSION = 1
+TITLE_WEIGHT = 0.3       # Share of the title/description embedding in an episode vector
+EMBED_BATCH_SIZE = 500
+
+
+def episode_texts(transcripts_path: str) -> Dict[str, str]:
+    """Title and description of each episode folder, from the frontmatter"""
+    texts = {}
+    for filepath in sorted(Path(transcripts_path, "episodes").glob("*/transcript.md")):
+        transcript = transcript_parser.parse_transcript(filepath)
+        frontmatter = (transcript or {}).get('metadata') or {}
+        text = "\n\n".join(str(frontmatter[field]).strip()
+                           for field in ('title', 'description') if frontmatter.get(field))
+        if text:
+            texts[filepath.parent.name] = text
+    return texts
+
+
+class EpisodeIndex:
+    """One unit vector per episode, searched exhaustively (it is small)"""
+
+    def __init__(self, path: str = EPISODE_INDEX_PATH):
+        self.path = Path(path)
+        # Exports repoint the path at each new build; read this one throughout
+        directory = self.path.resolve()
+        with open(directory / "index.json", 'r', encoding='utf-8') as f:
+            self.info = json.load(f)
+        if self.info.get('version') != EPISODE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported episode index format in {self.path}")
+
+        self.vectors = np.load(directory / "vectors.npy")
+        with open(directory / "episodes.json", 'r', encoding='utf-8') as f:
+            self.episodes = json.load(f)
+        self.metadata = MetadataColumns.load(directory)
+        self.count = len(self.episodes)
+
+    def search(self, queries, n_episodes: int,
+               filters: Optional[SearchFilter] = None) -> List[List[str]]:
+        """
+        Top episodes per query
+
+        Args:
+            queries: (q, dim) query embeddings (normalized here)
+            n_episodes: Episodes to return per query
+            filters: Only rank episodes matching these restrictions
+
+        Returns:
+            Episode folders per query, best first
+        """
+        queries = normalize_rows(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        scores = queries @ self.vectors.T
+        if filters:
+            allowed = np.zeros(self.count, dtype=bool)
+            allowed[self.metadata.rows(filters)] = True
+            scores[:, ~allowed] = -np.inf
+            n_episodes = min(n_episodes, int(allowed.sum()))
+        return [[self.episodes[i]['episode_folder'] for i in row]
+                for row in top_k(scores, n_episodes)]
+
+
+def export_episode_index(index: VectorIndex, embedding_function=None,
+                         transcripts_path: str = "./transcripts",
+                         path: str = EPISODE_INDEX_PATH, title_weight: float = TITLE_WEIGHT) -> Dict:
+    """
+    Build the episode index from an exported VectorIndex
+
+    Like export_index, the new index is written to a temporary directory
+    and swapped in with renames.
+
+    Args:
+        index: Chunk-level index (needs its metadata columns)
+        embedding_function: Embeds the title/description texts; None (or
+            title_weight=0) uses the chunk centroids alone
+        transcripts_path: Transcripts folder, for the descriptions
+        path: Output directory
+        title_weight: Share of the title/description embedding in each
+            episode vector
+
+    Returns:
+        The index.json contents
+    """
+    if index.metadata is None:
+        raise ValueError(f"{index.path} has no metadata columns; re-export it with vector_index.py")
+
+    target = Path(path)
+    tmp = target.with_name(target.name + f".tmp-{os.getpid()}")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    start = time.time()
+    row_lists = {folder: rows for folder, rows in index.metadata.episode_row_lists().items() if len(rows)}
+    folders = sorted(row_lists)
+    episodes, centroids = [], []
+    metadata_columns = MetadataColumnsWriter()
+    for folder in folders:
+        rows = np.sort(row_lists[folder])
+        centroids.append(np.asarray(index.vectors[rows]).mean(axis=0))
+        metadata = index.chunks.row(int(rows[0]))['metadata']
+        metadata_columns.add(metadata)
+        episodes.append({
+            'episode_folder': folder,
+            'guest': metadata.get('guest', 'Unknown'),
+            'title': metadata.get('title', 'Unknown'),
+            'n_chunks': len(rows)
+        })
+    vectors = normalize_rows(np.array(centroids, dtype=np.float32).reshape(len(folders), index.dim))
+
+    if embedding_function is not None and title_weight > 0 and folders:
+        texts = episode_texts(transcripts_path)
+        inputs = [texts.get(e['episode_folder']) or e['title'] for e in episodes]
+        text_vectors = []
+        for i in range(0, len(inputs), EMBED_BATCH_SIZE):
+            text_vectors.extend(embedding_function(inputs[i:i + EMBED_BATCH_SIZE]))
+        text_vectors = normalize_rows(np.asarray(text_vectors, dtype=np.float32))
+        vectors = normalize_rows((1 - title_weight) * vectors + title_weight * text_vectors)
+    else:
+        title_weight = 0.0
+
+    np.save(tmp / "vectors.npy", vectors)
+    with open(tmp / "episodes.json", 'w', encoding='utf-8') as f:
+        json.dump(episodes, f, ensure_ascii=False)
+    metadata_columns.save(tmp)
+
+    info = {
+        'version': EPISODE_FORMAT_VERSION,
+        'count': len(episodes),
+        'dim': index.dim,
+        'model': index.info.get('model', ''),
+        'chunks': index.count,
+        'title_weight': title_weight,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    with open(tmp / "index.json", 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+
+    replace_directory(tmp, target)
+
+    print(f"🗂️  Built episode index: {len(episodes)} episodes from {index.count} chunks "
+          f"in {time.time() - start:.1f}s")
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Episode-level index tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build from the exported vector index")
+    build.add_argument("--index", default=INDEX_PATH)
+    build.add_argument("--transcripts", default="./transcripts")
+    build.add_argument("--path", default=EPISODE_INDEX_PATH)
+    build.add_argument("--title-weight", type=float, default=TITLE_WEIGHT)
+    search = subparsers.add_parser("search", help="Top episodes for a question")
+    search.add_argument("query")
+    search.add_argument("--path", default=EPISODE_INDEX_PATH)
+    search.add_argument("-n", type=int, default=10)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from embedding_backends import create_embedding_function, backend_for_model
+    load_dotenv()
+
+    # Embed with the model the vectors came from
+    if args.command == "build":
+        index = VectorIndex(args.index)
+        embedding_function = create_embedding_function(backend_for_model(index.info.get('model')))
+        export_episode_index(index, embedding_function, args.transcripts,
+                             args.path, args.title_weight)
+    else:
+        index = EpisodeIndex(args.path)
+        embedding_function = create_embedding_function(backend_for_model(index.info.get('model')))
+        by_folder = {e['episode_folder']: e for e in index.episodes}
+        for folder in index.search(embedding_function([args.query]), args.n)[0]:
+            print(f"  {by_folder[folder]['guest']:<30} {by_folder[folder]['title'][:70]}")
+
+
+if __name__ == "__main__":
+    main()
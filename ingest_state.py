@@ -0,0 +1,38 @@
+"""
+Ingestion State
+
+Paths and the lock check that servers need to follow ingestion, kept apart
+from ingest_transcripts.py so the query path doesn't import the ingestion
+pipeline (ChromaDB writers, parser pool, embedding pipeline). Standard
+library only.
+"""
+
+import os
+from typing import Optional
+
+MANIFEST_PATH = "./data/ingest_manifest.json"
+INGEST_LOCK_PATH = "./data/ingest.lock"    # PID and kind of a running ingestion
+
+
+def running_ingestion(lock_path: str = INGEST_LOCK_PATH) -> Optional[str]:
+    """
+    Ingestion running on this machine, from its lock file
+
+    Returns:
+        "build" if it is building the index from scratch (there is nothing
+        to serve until it finishes), "sync" if it is updating an existing
+        one, None if no ingestion is running
+    """
+    try:
+        with open(lock_path, 'r', encoding='utf-8') as f:
+            pid, kind = f.read().split()
+        pid = int(pid)
+    except (OSError, ValueError):
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None  # Stale lock from a killed run
+    except PermissionError:
+        pass
+    return kind
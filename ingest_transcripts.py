@@ -3,233 +3,532 @@ Ingest Lenny's Podcast Transcripts into Vector Database
 
 This script:
 1. Loads all 269 transcript files
-2. Chunks them appropriately
+2. Chunks them by speaker turn to a token budget
 3. Creates embeddings
 4. Stores in ChromaDB
+
+Re-running it is incremental: only new or changed transcripts are embedded
+(see data/ingest_manifest.json). Pass --full to rebuild from scratch.
 """
 
 import os
-import yaml
+import json
+import argparse
 import chromadb
-from chromadb.utils import embedding_functions
 from pathlib import Path
-from typing import List, Dict
-import re
+from typing import List, Dict, Optional
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 import time
+import queue
+import threading
+import contextvars
 from dotenv import load_dotenv
+from embedding_backends import (EMBEDDING_BACKENDS, resolve_backend, create_embedding_function,
+                                collection_backend, backend_record, record_backend)
+from embedding_pipeline import EmbeddingPipeline
+import transcript_parser
+from chunker import TranscriptChunker, DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS
+from vector_index import VectorIndex, export_index, export_options, INDEX_PATH
+from bm25_index import export_bm25_index, BM25_PATH
+from episode_index import export_episode_index, EPISODE_INDEX_PATH
+from snapshots import build_snapshot, current_version, publish
+from metadata_filters import MetadataColumns
+from instrumentation import TRACER, stage, count
+from ingest_state import MANIFEST_PATH, INGEST_LOCK_PATH
 
 load_dotenv()
 
+MANIFEST_VERSION = 3
+PARSE_QUEUE_SIZE = 8        # Parsed files buffered ahead of embedding
+WRITE_QUEUE_SIZE = 4        # Embedded batches buffered ahead of ChromaDB writes
+CHECKPOINT_INTERVAL = 5.0   # Seconds between manifest checkpoints
+UPDATE_BATCH_SIZE = 500     # Chunks per metadata-only update
+
+_DONE = object()
+
 class TranscriptIngester:
-    def __init__(self, transcripts_path: str, collection_name: str = "lenny_transcripts"):
+    def __init__(self, transcripts_path: str, collection_name: str = "lenny_transcripts",
+                 manifest_path: str = MANIFEST_PATH, parse_workers: Optional[int] = None,
+                 chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                 overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+                 embedding_backend: Optional[str] = None):
         self.transcripts_path = Path(transcripts_path)
+        self.chunker = TranscriptChunker(chunk_tokens, overlap_tokens)
+        self.parse_workers = parse_workers if parse_workers is not None else (os.cpu_count() or 1)
         self.collection_name = collection_name
+        self.manifest_path = Path(manifest_path)
         
         # Initialize ChromaDB
         self.client = chromadb.PersistentClient(path="./data/vector_db")
         
-        # Initialize OpenAI embeddings
-        openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            model_name="text-embedding-3-small"
+        # Initialize embeddings (cached on disk, so re-chunking only pays
+        # for text that has never been embedded)
+        self.embedding_backend = resolve_backend(embedding_backend)
+        self.embedding_model = EMBEDDING_BACKENDS[self.embedding_backend]['model']
+        self.embedding_function = create_embedding_function(self.embedding_backend)
+        
+        # Concurrent embedding for bulk ingestion; reads and fills the same
+        # cache as the embedding function. The local model has no rate
+        # limits and spreads each batch over the cores itself.
+        pipeline_options = {}
+        if self.embedding_backend == "local":
+            pipeline_options = {'requests_per_minute': 10**9, 'tokens_per_minute': 10**12,
+                                'max_workers': 1}
+        self.embedding_pipeline = EmbeddingPipeline(
+            self.embedding_function.embedding_function,
+            model_name=self.embedding_model,
+            cache=self.embedding_function.cache,
+            **pipeline_options
         )
         
         # Get or create collection
         self.collection = self.client.get_or_create_collection(
             name=collection_name,
-            embedding_function=openai_ef
+            embedding_function=self.embedding_function,
+            metadata=backend_record(self.embedding_backend)
         )
         
-        print(f"✅ Initialized ChromaDB collection: {collection_name}")
+        print(f"✅ Initialized ChromaDB collection: {collection_name} "
+              f"({self.embedding_backend} embeddings, {self.embedding_model})")
     
     def parse_transcript(self, filepath: Path) -> Dict:
         """Parse a transcript markdown file"""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Split frontmatter and content
-        parts = content.split('---')
-        if len(parts) >= 3:
-            frontmatter = yaml.safe_load(parts[1])
-            transcript_content = '---'.join(parts[2:]).strip()
-            
-            return {
-                'metadata': frontmatter,
-                'content': transcript_content,
-                'filepath': str(filepath)
-            }
-        return None
+        return transcript_parser.parse_transcript(filepath)
+    
+    def chunk_transcript(self, transcript: Dict) -> List[Dict]:
+        """Chunk transcript into speaker-turn-aligned, token-bounded pieces"""
+        return transcript_parser.chunk_transcript(
+            transcript, self.chunker.chunk_tokens, self.chunker.overlap_tokens
+        )
+    
+    def extract_speaker_context(self, text: str) -> str:
+        """Extract speaker names from text for better context"""
+        return transcript_parser.extract_speaker_context(text)
+    
+    def file_hash(self, filepath: Path) -> str:
+        """Content hash of a transcript file, used to skip unchanged episodes"""
+        return transcript_parser.file_hash(filepath)
     
-    def chunk_transcript(self, transcript: Dict, chunk_size: int = 500) -> List[Dict]:
+    def build_chunk_records(self, filepath: Path, transcript: Dict) -> List[Dict]:
         """
-        Chunk transcript into manageable pieces
-        Strategy: Split by paragraphs, combine into ~500 word chunks (max ~2000 tokens)
-        OpenAI embedding limit is 8192 tokens, so we stay well below that
+        Chunk a parsed transcript and prepare ChromaDB records
+        
+        Chunk IDs are derived from the episode folder and the chunk's content
+        hash, so they stay stable across runs.
         """
-        content = transcript['content']
-        metadata = transcript['metadata']
+        episode_folder = filepath.parent.name
+        compact = transcript_parser.compact_chunks(episode_folder, self.chunk_transcript(transcript))
+        episode = transcript_parser.episode_metadata(transcript['metadata'])
+        return transcript_parser.expand_chunks(episode_folder, episode, compact)
+    
+    def manifest_config(self) -> Dict:
+        """Settings that invalidate every stored chunk when they change"""
+        return {
+            'version': MANIFEST_VERSION,
+            'collection': self.collection_name,
+            'embedding_model': self.embedding_model,
+            **self.chunker.config()
+        }
+    
+    def load_manifest(self) -> Dict:
+        """
+        Load the ingestion manifest, discarding it if the config changed
         
-        # Split by double newlines (paragraphs)
-        paragraphs = content.split('\n\n')
+        A discarded manifest is marked 'rewrite', so stored chunks are
+        written again even where their IDs are unchanged (chunk metadata
+        may differ under the new config).
+        """
+        empty = {'config': self.manifest_config(), 'files': {}}
+        if not self.manifest_path.exists():
+            return empty
         
-        chunks = []
-        current_chunk = ""
-        current_size = 0
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️  Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return empty
         
-        for para in paragraphs:
-            para_size = len(para.split())  # Rough word count (tokens ≈ words * 1.3)
+        if manifest.get('config') != self.manifest_config():
+            print("  ℹ️  Chunking/embedding config changed, re-chunking all transcripts")
+            return dict(empty, rewrite=True)
+        return manifest
+    
+    def save_manifest(self, manifest: Dict):
+        """Atomically write the ingestion manifest"""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+    
+    def existing_chunk_ids(self) -> set:
+        """IDs currently stored in the collection"""
+        return set(self.collection.get(include=[])['ids'])
+    
+    def reset_collection(self):
+        """Drop and recreate the collection and forget the manifest"""
+        self.client.delete_collection(self.collection_name)
+        self.collection = self.client.get_or_create_collection(
+            name=self.collection_name,
+            embedding_function=self.embedding_function,
+            metadata=backend_record(self.embedding_backend)
+        )
+        if self.manifest_path.exists():
+            self.manifest_path.unlink()
+    
+    def delete_ids(self, ids: List[str], batch_size: int = 500):
+        """Delete chunks from the collection in batches"""
+        for i in range(0, len(ids), batch_size):
+            self.collection.delete(ids=ids[i:i + batch_size])
+    
+    def _parse_stage(self, transcript_files: List[Path], previous_files: Dict,
+                     existing_ids: set, out_queue: queue.Queue, errors: List):
+        """
+        Stage 1 (thread): hash files, then parse and chunk changed ones
+        
+        Parsing and chunking are CPU-bound, so they run on a process pool
+        that returns compact chunk tuples. At most a few files are in
+        flight and the output queue is bounded, so parsing never runs far
+        ahead of embedding.
+        """
+        executor = None
+        if self.parse_workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+        in_flight = deque()
+        n_done = [0]
+        
+        def emit(filepath: Path, file_sha: str, entry: Optional[Dict], future: Future):
+            n_done[0] += 1
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"  ⚠️  Error processing {filepath.name}: {e}")
+                count("transcripts_failed")
+                # Keep whatever was stored for this file rather than deleting it
+                if entry:
+                    out_queue.put({'folder': filepath.parent.name, 'entry': entry,
+                                   'records': [], 'unchanged': True})
+                return
+            if result is None:
+                return
             
-            # If this paragraph alone is too big, split it further
-            if para_size > chunk_size:
-                # Save current chunk if exists
-                if current_chunk.strip():
-                    chunks.append({
-                        'text': current_chunk.strip(),
-                        'metadata': metadata,
-                        'filepath': transcript['filepath']
-                    })
-                    current_chunk = ""
-                    current_size = 0
+            episode_folder, episode, compact = result
+            count("transcripts_parsed")
+            records = transcript_parser.expand_chunks(episode_folder, episode, compact)
+            # Stored chunks whose metadata changed (frontmatter edits, shifted
+            # chunk indexes) are updated in place without re-embedding
+            stored = entry['chunks'] if entry else {}
+            out_queue.put({
+                'folder': episode_folder,
+                'entry': {
+                    'sha256': file_sha,
+                    'chunks': {r['id']: r['hash'] for r in records}
+                },
+                'records': [r for r in records if r['id'] not in existing_ids],
+                'updates': [r for r in records
+                            if r['id'] in existing_ids and stored.get(r['id']) != r['hash']],
+                'unchanged': False
+            })
+            if n_done[0] % 10 == 0:
+                print(f"  Processed {n_done[0]} changed transcripts...")
+        
+        try:
+            for filepath in transcript_files:
+                entry = previous_files.get(filepath.parent.name)
+                try:
+                    file_sha = self.file_hash(filepath)
+                except OSError as e:
+                    print(f"  ⚠️  Error reading {filepath}: {e}")
+                    # Keep whatever was stored for this file rather than deleting it
+                    if entry:
+                        out_queue.put({'folder': filepath.parent.name, 'entry': entry,
+                                       'records': [], 'unchanged': True})
+                    continue
                 
-                # Split large paragraph by sentences
-                sentences = para.split('. ')
-                for sentence in sentences:
-                    sentence_size = len(sentence.split())
-                    if current_size + sentence_size > chunk_size and current_chunk:
-                        chunks.append({
-                            'text': current_chunk.strip(),
-                            'metadata': metadata,
-                            'filepath': transcript['filepath']
-                        })
-                        current_chunk = sentence + '. '
-                        current_size = sentence_size
-                    else:
-                        current_chunk += sentence + '. '
-                        current_size += sentence_size
-                continue
+                # Unchanged file whose chunks are all still stored: nothing to do
+                if (entry and entry['sha256'] == file_sha
+                        and all(cid in existing_ids for cid in entry['chunks'])):
+                    out_queue.put({'folder': filepath.parent.name, 'entry': entry,
+                                   'records': [], 'unchanged': True})
+                    continue
+                
+                args = (filepath, self.chunker.chunk_tokens, self.chunker.overlap_tokens)
+                if executor:
+                    future = executor.submit(transcript_parser.process_transcript_file, *args)
+                else:
+                    future = Future()
+                    try:
+                        future.set_result(transcript_parser.process_transcript_file(*args))
+                    except Exception as e:
+                        future.set_exception(e)
+                in_flight.append((filepath, file_sha, entry, future))
+                
+                while len(in_flight) > max(1, self.parse_workers) * 2:
+                    emit(*in_flight.popleft())
             
-            if current_size + para_size > chunk_size and current_chunk:
-                # Save current chunk
-                chunks.append({
-                    'text': current_chunk.strip(),
-                    'metadata': metadata,
-                    'filepath': transcript['filepath']
-                })
-                current_chunk = para
-                current_size = para_size
-            else:
-                current_chunk += "\n\n" + para
-                current_size += para_size
-        
-        # Add final chunk
-        if current_chunk.strip():
-            chunks.append({
-                'text': current_chunk.strip(),
-                'metadata': metadata,
-                'filepath': transcript['filepath']
-            })
+            while in_flight:
+                emit(*in_flight.popleft())
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            out_queue.put(_DONE)
+    
+    def update_metadata(self, records: List[Dict]):
+        """
+        Replace the metadata of stored chunks, keeping their vectors
         
-        return chunks
+        ChromaDB merges metadata on update, so keys the new metadata no
+        longer has (e.g. keywords removed from the frontmatter) are
+        cleared explicitly.
+        """
+        ids = [r['id'] for r in records]
+        stored = self.collection.get(ids=ids, include=['metadatas'])
+        old = dict(zip(stored['ids'], stored['metadatas']))
+        metadatas = []
+        for record in records:
+            metadata = dict(record['metadata'])
+            for key in old.get(record['id']) or {}:
+                metadata.setdefault(key, None)
+            metadatas.append(metadata)
+        self.collection.update(ids=ids, metadatas=metadatas)
     
-    def extract_speaker_context(self, text: str) -> str:
-        """Extract speaker names from text for better context"""
-        # Look for patterns like "Speaker Name (timestamp):"
-        speakers = re.findall(r'^([A-Z][a-zA-Z\s]+)\s*\(\d+:\d+:\d+\):', text, re.MULTILINE)
-        return ", ".join(set(speakers[:3])) if speakers else ""
+    def _write_stage(self, in_queue: queue.Queue, on_written, errors: List):
+        """
+        Stage 3 (thread): bulk-upsert embedded batches into ChromaDB
+        
+        Batches without vectors are metadata-only updates of stored chunks.
+        """
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                return
+            if errors:
+                continue  # Keep draining so upstream stages never block
+            batch, vectors = item
+            try:
+                with stage("write_batch", n_chunks=len(batch)):
+                    if vectors is None:
+                        self.update_metadata(batch)
+                    else:
+                        self.collection.upsert(
+                            ids=[r['id'] for r in batch],
+                            documents=[r['text'] for r in batch],
+                            metadatas=[r['metadata'] for r in batch],
+                            embeddings=vectors
+                        )
+                count("chunks_updated" if vectors is None else "chunks_written", len(batch))
+                on_written(batch, updated=vectors is None)
+            except BaseException as e:
+                errors.append(e)
+    
+    def ingest_all_transcripts(self, full_rebuild: bool = False):
+        """
+        Main ingestion process, traced (see instrumentation.py); prints
+        where the time went at the end
+        
+        Args:
+            full_rebuild: Drop the collection and re-embed everything
+        """
+        with TRACER.trace("ingest", full_rebuild=full_rebuild) as trace:
+            result = self._ingest_all_transcripts(full_rebuild)
+        if result is not None:
+            summary = trace.summary()
+            print(f"⏱️  {summary['total_ms'] / 1000:.1f}s total; stage time summed over workers:")
+            for entry in summary['stages']:
+                print(f"     {entry['name']:<16} {entry['ms'] / 1000:8.1f}s  ({entry['count']} calls)")
+        return result
     
-    def ingest_all_transcripts(self):
-        """Main ingestion process"""
+    def _ingest_all_transcripts(self, full_rebuild: bool):
+        """
+        Ingestion pipeline
+        
+        Runs as a streaming pipeline: parse/chunk → embed → write, with
+        bounded queues between the stages, so memory stays flat regardless
+        of corpus size and vectors start landing in the collection within
+        seconds.
+        
+        It is also incremental and resumable: a manifest of per-file and
+        per-chunk content and metadata hashes is checkpointed as each file's
+        chunks are fully stored. Unchanged files are not even re-chunked,
+        only chunks missing from the collection are embedded, stored chunks
+        whose metadata changed are updated in place, and chunks that no
+        longer exist in any transcript are deleted at the end.
+        
+        Args:
+            full_rebuild: Drop the collection and re-embed everything
+        """
         episodes_path = self.transcripts_path / "episodes"
         
         if not episodes_path.exists():
             print(f"❌ Transcripts not found at: {episodes_path}")
             return
         
+        if full_rebuild:
+            print("🧹 Full rebuild requested, dropping existing collection...")
+            self.reset_collection()
+        
+        # Vectors from another model can't share the collection
+        built_with = collection_backend(self.collection)
+        if built_with is not None and built_with != self.embedding_backend:
+            print(f"❌ Collection {self.collection_name} was built with {built_with} embeddings, "
+                  f"not {self.embedding_backend}")
+            print(f"   Re-run with --full to rebuild it, or set LENNY_EMBEDDING_BACKEND={built_with}")
+            return
+        record_backend(self.collection, self.embedding_backend)
+        
         # Get all transcript files
-        transcript_files = list(episodes_path.glob("*/transcript.md"))
-        print(f"📚 Found {len(transcript_files)} transcripts to ingest")
+        transcript_files = sorted(episodes_path.glob("*/transcript.md"))
+        print(f"📚 Found {len(transcript_files)} transcripts")
         
-        all_chunks = []
-        chunk_ids = []
-        chunk_metadatas = []
+        manifest = self.load_manifest()
+        previous_files = manifest['files']
+        existing_ids = self.existing_chunk_ids()
+        # Chunks already stored are skipped, unless the config changed
+        skip_ids = set() if manifest.pop('rewrite', False) else existing_ids
         
-        for i, filepath in enumerate(transcript_files):
-            try:
-                # Parse transcript
-                transcript = self.parse_transcript(filepath)
-                if not transcript:
-                    continue
-                
-                # Chunk it
-                chunks = self.chunk_transcript(transcript)
-                
-                # Prepare for ChromaDB
-                for j, chunk in enumerate(chunks):
-                    chunk_id = f"{transcript['metadata'].get('guest', 'unknown')}_{i}_{j}"
-                    
-                    # Extract additional context
-                    speakers = self.extract_speaker_context(chunk['text'])
-                    
-                    metadata = {
-                        'guest': transcript['metadata'].get('guest', 'Unknown'),
-                        'title': transcript['metadata'].get('title', 'Unknown'),
-                        'youtube_url': transcript['metadata'].get('youtube_url', ''),
-                        'publish_date': str(transcript['metadata'].get('publish_date', '')),
-                        'episode_folder': filepath.parent.name,
-                        'chunk_index': j,
-                        'speakers': speakers
-                    }
-                    
-                    all_chunks.append(chunk['text'])
-                    chunk_ids.append(chunk_id)
-                    chunk_metadatas.append(metadata)
-                
-                if (i + 1) % 10 == 0:
-                    print(f"  Processed {i + 1}/{len(transcript_files)} transcripts...")
-            
-            except Exception as e:
-                print(f"  ⚠️  Error processing {filepath.name}: {e}")
-                continue
+        # Checkpoint state, shared between the embed and write stages
+        lock = threading.Lock()
+        completed_files = {}
+        pending = {}      # folder -> chunks not yet stored
+        entries = {}      # folder -> manifest entry, once its chunks are stored
+        failed_folders = set()
+        wanted_ids = set()
+        counts = {'unchanged': 0, 'added': 0, 'updated': 0, 'failed': 0}
+        last_save = [0.0]
         
-        # Batch insert into ChromaDB with rate limiting
-        print(f"\n💾 Inserting {len(all_chunks)} chunks into vector database...")
-        print(f"   (This may take 10-15 minutes due to OpenAI rate limits)")
+        def checkpoint(force: bool = False):
+            """Persist completed files so a crash resumes from here"""
+            if force or time.monotonic() - last_save[0] > CHECKPOINT_INTERVAL:
+                manifest['files'] = {**previous_files, **completed_files}
+                self.save_manifest(manifest)
+                last_save[0] = time.monotonic()
         
-        batch_size = 50  # Smaller batches to avoid rate limits
-        for i in range(0, len(all_chunks), batch_size):
-            batch_end = min(i + batch_size, len(all_chunks))
-            
-            # Retry logic for rate limits
-            max_retries = 5
-            retry_count = 0
-            
-            while retry_count < max_retries:
+        def complete(folder: str):
+            completed_files[folder] = entries.pop(folder)
+            pending.pop(folder, None)
+        
+        def on_written(batch: List[Dict], updated: bool = False):
+            with lock:
+                counts['updated' if updated else 'added'] += len(batch)
+                for record in batch:
+                    folder = record['metadata']['episode_folder']
+                    if folder in failed_folders:
+                        continue
+                    pending[folder] -= 1
+                    if pending[folder] == 0:
+                        complete(folder)
+                checkpoint()
+                print(f"  ✓ {counts['added']} chunks stored, {counts['updated']} updated")
+        
+        parse_queue = queue.Queue(maxsize=PARSE_QUEUE_SIZE)
+        write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        errors = []
+        # Stage threads report into this run's trace
+        parser = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._parse_stage, transcript_files, previous_files, skip_ids, parse_queue, errors),
+            daemon=True
+        )
+        writer = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._write_stage, write_queue, on_written, errors),
+            daemon=True
+        )
+        
+        def records_stream():
+            """Stage 2 input: flatten parsed files into a stream of chunks"""
+            while True:
+                item = parse_queue.get()
+                if item is _DONE or errors:
+                    return
+                folder = item['folder']
+                wanted_ids.update(item['entry']['chunks'])
+                with lock:
+                    entries[folder] = item['entry']
+                    if item['unchanged']:
+                        counts['unchanged'] += 1
+                    updates = item.get('updates', [])
+                    if not item['records'] and not updates:
+                        complete(folder)
+                        continue
+                    pending[folder] = len(item['records']) + len(updates)
+                for i in range(0, len(updates), UPDATE_BATCH_SIZE):
+                    write_queue.put((updates[i:i + UPDATE_BATCH_SIZE], None))
+                yield from item['records']
+        
+        print("\n💾 Streaming new chunks into the vector database...")
+        parser.start()
+        writer.start()
+        try:
+            for batch, vectors in self.embedding_pipeline.embed_records(records_stream()):
+                if vectors is None:
+                    # Leave the file out of the manifest so the next run retries it
+                    count("chunks_failed", len(batch))
+                    with lock:
+                        counts['failed'] += len(batch)
+                        for record in batch:
+                            folder = record['metadata']['episode_folder']
+                            failed_folders.add(folder)
+                            entries.pop(folder, None)
+                            pending.pop(folder, None)
+                    continue
+                write_queue.put((batch, vectors))
+        finally:
+            write_queue.put(_DONE)
+            writer.join()
+            # Unblock the parser if we stopped early, then wait for it
+            while parser.is_alive():
                 try:
-                    self.collection.add(
-                        ids=chunk_ids[i:batch_end],
-                        documents=all_chunks[i:batch_end],
-                        metadatas=chunk_metadatas[i:batch_end]
-                    )
-                    print(f"  ✓ Batch {i//batch_size + 1}/{(len(all_chunks) + batch_size - 1)//batch_size}")
-                    
-                    # Small delay between batches to respect rate limits
-                    time.sleep(2)
-                    break
-                    
-                except Exception as e:
-                    if "rate_limit" in str(e).lower():
-                        retry_count += 1
-                        wait_time = 2 ** retry_count  # Exponential backoff: 2, 4, 8, 16, 32 seconds
-                        print(f"  ⏳ Rate limit hit. Waiting {wait_time}s... (retry {retry_count}/{max_retries})")
-                        time.sleep(wait_time)
-                    else:
-                        raise e
-            
-            if retry_count >= max_retries:
-                print(f"  ❌ Failed to insert batch after {max_retries} retries. Skipping...")
+                    parse_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            with lock:
+                checkpoint(force=True)
+        
+        if errors:
+            raise errors[0]
+        
+        # Episodes whose new chunks failed to embed keep their stored chunks
+        # and manifest entry (its hash no longer matches, so the next run
+        # retries them)
+        for folder in failed_folders:
+            if folder in previous_files:
+                wanted_ids.update(previous_files[folder]['chunks'])
+                completed_files[folder] = previous_files[folder]
         
-        print(f"\n✅ Successfully ingested {len(transcript_files)} transcripts into {len(all_chunks)} chunks!")
+        # Remove stale chunks only after their replacements are stored
+        stale_ids = sorted(existing_ids - wanted_ids)
+        if stale_ids:
+            print(f"🗑️  Deleting {len(stale_ids)} stale chunks...")
+            with stage("delete_stale"):
+                self.delete_ids(stale_ids)
+        
+        # Forget episodes whose transcripts were removed
+        manifest['files'] = completed_files
+        self.save_manifest(manifest)
+        
+        stats = self.embedding_pipeline.stats()
+        print(f"  📡 {stats['requests']} embedding requests, {stats['tokens']:,} tokens, "
+              f"{stats['retries']} retries")
+        print(f"\n✅ Ingested {len(transcript_files)} transcripts "
+              f"({counts['unchanged']} unchanged, {counts['added']} chunks embedded, "
+              f"{counts['updated']} updated, {counts['failed']} failed, {len(stale_ids)} removed)")
         print(f"📊 Collection size: {self.collection.count()} documents")
+        
+        stats = self.embedding_function.cache.stats()
+        print(f"🧠 Embedding cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries")
+        
+        return {
+            'added': counts['added'],
+            'updated': counts['updated'],
+            'failed': counts['failed'],
+            'removed': len(stale_ids)
+        }
 
 def main():
     """Run the ingestion process"""
@@ -238,6 +537,21 @@ def main():
     print("=" * 70)
     print()
     
+    parser = argparse.ArgumentParser(description="Ingest transcripts into the vector database")
+    parser.add_argument("--full", action="store_true",
+                        help="Drop the collection and re-embed every transcript")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes for parsing/chunking (default: CPU count)")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS,
+                        help="Maximum tokens per chunk")
+    parser.add_argument("--overlap-tokens", type=int, default=DEFAULT_OVERLAP_TOKENS,
+                        help="Tokens of overlap between consecutive chunks")
+    parser.add_argument("--embedding-backend", choices=list(EMBEDDING_BACKENDS), default=None,
+                        help="Embedding model backend (default: LENNY_EMBEDDING_BACKEND, else openai)")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Build and publish an index snapshot if anything changed (see snapshots.py)")
+    args = parser.parse_args()
+    
     # Path to transcripts (now included in repo)
     transcripts_path = "./transcripts"
     
@@ -248,16 +562,24 @@ def main():
         print("Make sure you have the transcripts folder in the project directory")
         return
     
-    # Check for API key
-    if not os.getenv("OPENAI_API_KEY"):
+    # Check for API key (only the OpenAI backend needs one)
+    embedding_backend = resolve_backend(args.embedding_backend)
+    if embedding_backend == "openai" and not os.getenv("OPENAI_API_KEY"):
         print("❌ OPENAI_API_KEY not found!")
         print("   Create a .env file with your API key")
         print("   Copy .env.example to .env and fill in your key")
         return
     
-    # Run ingestion
-    ingester = TranscriptIngester(transcripts_path)
-    ingester.ingest_all_transcripts()
+    # Run ingestion; the lock file tells a fast-starting app whether to
+    # wait for it (see engine_loader.py)
+    kind = "build" if args.full or not os.path.exists(MANIFEST_PATH) else "sync"
+    os.makedirs(os.path.dirname(INGEST_LOCK_PATH), exist_ok=True)
+    with open(INGEST_LOCK_PATH, 'w', encoding='utf-8') as f:
+        f.write(f"{os.getpid()} {kind}")
+    try:
+        run_ingestion(args, transcripts_path, embedding_backend)
+    finally:
+        os.remove(INGEST_LOCK_PATH)
     
     print()
     print("=" * 70)
@@ -265,5 +587,39 @@ def main():
     print("   streamlit run app.py")
     print("=" * 70)
 
+def run_ingestion(args, transcripts_path: str, embedding_backend: str):
+    """Ingest, then refresh the derived indexes"""
+    ingester = TranscriptIngester(
+        transcripts_path,
+        parse_workers=args.workers,
+        chunk_tokens=args.chunk_tokens,
+        overlap_tokens=args.overlap_tokens,
+        embedding_backend=embedding_backend
+    )
+    summary = ingester.ingest_all_transcripts(full_rebuild=args.full)
+    
+    # Refresh the local in-process, BM25 and episode indexes (see
+    # vector_index.py, bm25_index.py and episode_index.py) if anything changed
+    if summary is not None:
+        changed = summary['added'] or summary['updated'] or summary['removed']
+        # Episode vectors are derived from the exported chunk vectors
+        rebuild_episodes = changed or not (Path(EPISODE_INDEX_PATH) / "index.json").exists()
+        # Indexes that are missing or predate the metadata columns are re-exported too
+        if changed or MetadataColumns.load(INDEX_PATH) is None:
+            # Keep the IVF, HNSW and quantized structures the index was exported with
+            export_index(ingester.collection, model_name=ingester.embedding_model,
+                         **export_options(INDEX_PATH))
+            rebuild_episodes = True
+        if changed or MetadataColumns.load(BM25_PATH) is None:
+            export_bm25_index(ingester.collection)
+        if rebuild_episodes:
+            export_episode_index(VectorIndex(INDEX_PATH), ingester.embedding_function, transcripts_path)
+        
+        # Servers following the published snapshot swap to the new one
+        if args.snapshot and (changed or current_version() is None):
+            manifest = build_snapshot(ingester.collection, ingester.embedding_function, transcripts_path,
+                                      chunker_config=ingester.manifest_config())
+            publish(manifest['version'])
+
 if __name__ == "__main__":
     main()
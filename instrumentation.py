@@ -0,0 +1,330 @@
+"""
+Instrumentation
+
+Per-stage timers, token counters, cache hit and error counts for the RAG
+pipeline and ingestion:
+
+    with TRACER.trace("ask", query=query) as trace:   # one per request
+        with stage("retrieve"):                        # anywhere below it,
+            ...                                        # nested or in threads
+        count("prompt_tokens", 1234)
+
+Stages and counters land in two places:
+1. The current trace (a ContextVar, so it follows asyncio tasks and
+   asyncio.to_thread), whose summary() drives the app's timing panel
+2. Process-wide aggregates (METRICS), rendered as Prometheus text by
+   api_server's GET /metrics
+
+Finished traces go to pluggable sinks, chosen with LENNY_TRACE_SINKS
+(comma-separated):
+- log: one line per trace on stdout
+- jsonl: OpenTelemetry-style spans, one JSON object per line, appended to
+  LENNY_TRACE_FILE
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TRACE_SINKS = os.getenv("LENNY_TRACE_SINKS", "")
+TRACE_FILE = os.getenv("LENNY_TRACE_FILE", "./data/traces.jsonl")
+METRIC_PREFIX = "lenny_"
+
+
+class Span:
+    """One timed stage"""
+
+    def __init__(self, name: str, parent_id: Optional[str] = None, attributes: Optional[Dict] = None,
+                 start: Optional[float] = None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = start if start is not None else time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def finish(self, end: Optional[float] = None):
+        self.duration = (end if end is not None else time.time()) - self.start
+
+
+class Trace:
+    """Spans and counters of one request (or one ingestion run)"""
+
+    def __init__(self, name: str, attributes: Optional[Dict] = None):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.root = Span(name, attributes=attributes)
+        self.spans: List[Span] = []
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.root.error
+
+    def summary(self) -> Dict:
+        """
+        Stage breakdown, so far if the trace is still running
+
+        Returns:
+            {'name', 'trace_id', 'total_ms', 'stages': [{'name', 'ms',
+            'count', 'depth'}] (repeated stages summed, in first-seen order),
+            'counters', 'error'}
+        """
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        depths = {self.root.span_id: 0}
+        stages: Dict[str, Dict] = {}
+        for span in sorted(spans, key=lambda s: s.start):
+            depth = depths.get(span.parent_id, 0) + 1
+            depths[span.span_id] = depth
+            entry = stages.setdefault(span.name, {'name': span.name, 'ms': 0.0, 'count': 0, 'depth': depth})
+            entry['ms'] += (span.duration or 0.0) * 1000
+            entry['count'] += 1
+        total = self.root.duration if self.root.duration is not None else time.time() - self.root.start
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'total_ms': total * 1000,
+            'stages': list(stages.values()),
+            'counters': counters,
+            'error': self.error
+        }
+
+
+class Metrics:
+    """Process-wide counters and stage-latency histograms"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        # stage -> [bucket counts..., count, sum]
+        self.histograms: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, stage_name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.setdefault(stage_name, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    def snapshot(self) -> Dict:
+        """Counters and per-stage count / mean latency, for JSON stats"""
+        with self._lock:
+            counters = {name + "".join(f"{{{k}={v}}}" for k, v in labels): value
+                        for (name, labels), value in self.counters.items()}
+            stages = {name: {'count': int(h[-2]), 'mean_ms': h[-1] / h[-2] * 1000 if h[-2] else 0.0}
+                      for name, h in self.histograms.items()}
+        return {'counters': counters, 'stages': stages}
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                metric = f"{METRIC_PREFIX}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{metric}{_labels(dict(labels))} {value:g}")
+            if self.histograms:
+                metric = f"{METRIC_PREFIX}stage_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for name, histogram in sorted(self.histograms.items()):
+                    for bound, n in zip(self.buckets, histogram):
+                        lines.append(f"{metric}_bucket{_labels({'stage': name, 'le': f'{bound:g}'})} {n:g}")
+                    lines.append(f"{metric}_bucket{_labels({'stage': name, 'le': '+Inf'})} {histogram[-2]:g}")
+                    lines.append(f"{metric}_count{_labels({'stage': name})} {histogram[-2]:g}")
+                    lines.append(f"{metric}_sum{_labels({'stage': name})} {histogram[-1]:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for k, v in labels.items():
+        # Prometheus exposition format: escape backslash, quote and newline in values only
+        escaped = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{k}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class LogSink:
+    """Prints one line per finished trace"""
+
+    def emit(self, trace: Trace):
+        summary = trace.summary()
+        stages = ", ".join(f"{s['name']} {s['ms']:.1f}" + (f"×{s['count']}" if s['count'] > 1 else "")
+                           for s in summary['stages'])
+        counters = ", ".join(f"{k}={v:g}" for k, v in summary['counters'].items())
+        status = f" ❌ {summary['error']}" if summary['error'] else ""
+        print(f"⏱️  {summary['name']} {summary['total_ms']:.1f} ms: {stages or '-'}"
+              f"{' | ' + counters if counters else ''}{status}")
+
+
+class JSONLSpanSink:
+    """Appends OpenTelemetry-style span records (one JSON object per line)"""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def emit(self, trace: Trace):
+        lines = []
+        for span in [trace.root] + trace.spans:
+            attributes = dict(span.attributes)
+            if span is trace.root:
+                attributes.update(trace.counters)
+            lines.append(json.dumps({
+                'trace_id': trace.trace_id,
+                'span_id': span.span_id,
+                'parent_span_id': span.parent_id,
+                'name': span.name,
+                'start_time_unix_nano': int(span.start * 1e9),
+                'end_time_unix_nano': int((span.start + (span.duration or 0.0)) * 1e9),
+                'attributes': attributes,
+                'status': {'code': 'ERROR', 'message': span.error} if span.error else {'code': 'OK'}
+            }, ensure_ascii=False, default=str))
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+
+SINKS = {'log': LogSink, 'jsonl': JSONLSpanSink}
+
+
+def sinks_from_config(config: str = TRACE_SINKS) -> List:
+    """Sink instances from a comma-separated list of SINKS names"""
+    sinks = []
+    for name in filter(None, (part.strip() for part in config.split(","))):
+        if name not in SINKS:
+            raise ValueError(f"Unknown trace sink {name!r}, expected one of {tuple(SINKS)}")
+        sinks.append(SINKS[name]())
+    return sinks
+
+
+METRICS = Metrics()
+_current: ContextVar[Optional[Tuple[Trace, Span]]] = ContextVar("lenny_trace", default=None)
+
+
+class Tracer:
+    """Starts traces and hands finished ones to its sinks"""
+
+    def __init__(self, sinks: Optional[List] = None, metrics: Metrics = METRICS):
+        self.sinks = list(sinks or [])
+        self.metrics = metrics
+
+    @contextmanager
+    def trace(self, name: str, **attributes) -> Iterator[Trace]:
+        """Trace the enclosed block; stages inside it attach to the trace"""
+        trace = Trace(name, attributes)
+        token = _current.set((trace, trace.root))
+        try:
+            yield trace
+        except GeneratorExit:
+            raise  # Streaming consumer stopped early, not a failure
+        except BaseException as e:
+            trace.root.error = f"{e.__class__.__name__}: {e}"
+            self.metrics.count("errors", stage=name)
+            raise
+        finally:
+            trace.root.finish()
+            try:
+                _current.reset(token)
+            except ValueError:
+                pass  # Generator closed from another context
+            self.metrics.observe(name, trace.root.duration)
+            self.metrics.count("requests", trace=name)
+            for sink in self.sinks:
+                try:
+                    sink.emit(trace)
+                except Exception as e:
+                    print(f"⚠️  Trace sink {sink.__class__.__name__} failed: {e}")
+
+
+TRACER = Tracer(sinks_from_config())
+
+
+def current_trace() -> Optional[Trace]:
+    current = _current.get()
+    return current[0] if current else None
+
+
+@contextmanager
+def stage(name: str, **attributes) -> Iterator[Span]:
+    """Time a pipeline stage, as a child of the current stage if any"""
+    current = _current.get()
+    span = Span(name, current[1].span_id if current else None, attributes)
+    token = _current.set((current[0], span)) if current else None
+    try:
+        yield span
+    except GeneratorExit:
+        raise
+    except BaseException as e:
+        span.error = f"{e.__class__.__name__}: {e}"
+        METRICS.count("errors", stage=name)
+        raise
+    finally:
+        span.finish()
+        if token is not None:
+            try:
+                _current.reset(token)
+            except ValueError:
+                pass
+            current[0].add(span)
+        METRICS.observe(name, span.duration)
+
+
+def record(name: str, start: float, **attributes):
+    """Record a stage that started at start (time.time()) and ends now"""
+    current = _current.get()
+    span = Span(name, current[1].span_id if current else None, attributes, start=start)
+    span.finish()
+    if current:
+        current[0].add(span)
+    METRICS.observe(name, span.duration)
+
+
+def count(name: str, value: float = 1):
+    """Add to a counter on the current trace and the process-wide metrics"""
+    trace = current_trace()
+    if trace is not None:
+        trace.count(name, value)
+    METRICS.count(name, value)
+
+
+def count_usage(usage):
+    """Count an OpenAI response's token usage, if it reported any"""
+    if usage is not None:
+        count("prompt_tokens", usage.prompt_tokens or 0)
+        count("completion_tokens", usage.completion_tokens or 0)
@@ -0,0 +1,293 @@
+"""
+Metadata Filters
+
+Restrict retrieval to a slice of the corpus by guest, publish date range,
+episode keywords or specific episodes, e.g. "2024 episodes tagged
+monetization".
+
+- SearchFilter describes the slice and translates it into a ChromaDB
+  `where` clause for the "chroma" retriever
+- MetadataColumns stores the filterable fields of every row of a local
+  index (vector_index.py, bm25_index.py) as compact arrays, so the rows in
+  a slice are found before the vector or keyword scan instead of filtering
+  its results:
+
+    filter_guests.json           # distinct guest names
+    filter_guest_codes.npy       # guest of each row, as an index into the above
+    filter_days.npy              # publish date of each row as YYYYMMDD (0 = unknown)
+    filter_keywords.json         # distinct keywords
+    filter_keyword_offsets.npy   # rows range of each keyword
+    filter_keyword_rows.npy      # row numbers, grouped by keyword
+    filter_episodes.json         # distinct episode folders
+    filter_episode_offsets.npy   # rows range of each episode
+    filter_episode_rows.npy      # row numbers, grouped by episode
+"""
+
+import re
+import json
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+DATE_RE = re.compile(r'^(\d{4})(?:-(\d{1,2}))?(?:-(\d{1,2}))?$')
+
+
+def publish_day(value) -> int:
+    """A date (or 'YYYY-MM-DD' string) as a sortable YYYYMMDD integer; 0 if unknown"""
+    match = DATE_RE.match(str(value or '').strip())
+    if not match or not match.group(3):
+        return 0
+    year, month, day = (int(part) for part in match.groups())
+    return year * 10000 + month * 100 + day
+
+
+def parse_date_bound(value: str, end: bool = False) -> int:
+    """
+    'YYYY', 'YYYY-MM' or 'YYYY-MM-DD' as a YYYYMMDD bound
+
+    Partial dates cover the whole year or month: the start of the period
+    for a lower bound, its end for an upper bound (end=True).
+    """
+    match = DATE_RE.match(str(value).strip())
+    if not match:
+        raise ValueError(f"Invalid date {value!r}, expected YYYY, YYYY-MM or YYYY-MM-DD")
+    year, month, day = match.groups()
+    month = int(month) if month else (12 if end else 1)
+    # Days only need to sort correctly, so 31 closes any month
+    day = int(day) if day else (31 if end else 1)
+    if not 1 <= month <= 12 or not 1 <= day <= 31:
+        raise ValueError(f"Invalid date {value!r}")
+    return int(year) * 10000 + month * 100 + day
+
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(str(keyword).lower().split())
+
+
+class SearchFilter:
+    """A guest / publish date / keyword restriction on retrieval"""
+
+    def __init__(self, guest: Optional[str] = None, date_from: Optional[str] = None,
+                 date_to: Optional[str] = None, keywords: Optional[Iterable[str]] = None,
+                 episodes: Optional[Iterable[str]] = None):
+        """
+        Args:
+            guest: Exact guest name, as shown in citations
+            date_from: Earliest publish date, inclusive (YYYY, YYYY-MM or YYYY-MM-DD)
+            date_to: Latest publish date, inclusive (same formats)
+            keywords: Episode keywords that must all be present
+                (case-insensitive)
+            episodes: Episode folders to search within (any of them)
+
+        Raises:
+            ValueError: on malformed dates or an empty date range
+        """
+        self.guest = guest.strip() if guest and guest.strip() else None
+        self.date_from = str(date_from).strip() if date_from else None
+        self.date_to = str(date_to).strip() if date_to else None
+        self.day_from = parse_date_bound(self.date_from) if self.date_from else None
+        self.day_to = parse_date_bound(self.date_to, end=True) if self.date_to else None
+        if self.day_from and self.day_to and self.day_from > self.day_to:
+            raise ValueError(f"Empty date range: {self.date_from} to {self.date_to}")
+        self.keywords = sorted({normalize_keyword(k) for k in keywords or [] if normalize_keyword(k)})
+        # None means any episode; an empty list matches nothing
+        self.episodes = sorted(set(episodes)) if episodes is not None else None
+
+    def with_episodes(self, episodes: Iterable[str]) -> "SearchFilter":
+        """Copy of this filter further restricted to the given episodes"""
+        episodes = set(episodes)
+        if self.episodes is not None:
+            episodes &= set(self.episodes)
+        return SearchFilter(self.guest, self.date_from, self.date_to, self.keywords, episodes)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> Optional["SearchFilter"]:
+        """
+        Build from a JSON-style dict ({"guest", "date_from", "date_to",
+        "keywords", "episodes"}); None or an empty dict means no filter
+
+        Raises:
+            ValueError: on unknown fields or wrongly typed values
+        """
+        if not data:
+            return None
+        if not isinstance(data, dict):
+            raise ValueError("'filters' must be an object")
+        unknown = set(data) - {'guest', 'date_from', 'date_to', 'keywords', 'episodes'}
+        if unknown:
+            raise ValueError(f"Unknown filter fields: {', '.join(sorted(unknown))}")
+        for field in ('guest', 'date_from', 'date_to'):
+            if data.get(field) is not None and not isinstance(data[field], (str, int)):
+                raise ValueError(f"'{field}' must be a string")
+        lists = {}
+        for field in ('keywords', 'episodes'):
+            values = data.get(field)
+            if isinstance(values, str):
+                values = [values]
+            if values is not None and not (isinstance(values, list)
+                                           and all(isinstance(v, str) for v in values)):
+                raise ValueError(f"'{field}' must be a list of strings")
+            lists[field] = values
+        search_filter = cls(data.get('guest'), data.get('date_from'), data.get('date_to'),
+                            lists['keywords'], lists['episodes'])
+        return search_filter if search_filter else None
+
+    def __bool__(self) -> bool:
+        return bool(self.guest or self.day_from or self.day_to or self.keywords
+                    or self.episodes is not None)
+
+    def key(self) -> str:
+        """Canonical string form, used to scope cached answers"""
+        return json.dumps([self.guest, self.day_from, self.day_to, self.keywords, self.episodes])
+
+    def to_dict(self) -> Dict:
+        return {'guest': self.guest, 'date_from': self.date_from,
+                'date_to': self.date_to, 'keywords': self.keywords, 'episodes': self.episodes}
+
+    def to_where(self) -> Optional[Dict]:
+        """The equivalent ChromaDB where clause (None if unrestricted)"""
+        conditions = []
+        if self.guest:
+            conditions.append({'guest': self.guest})
+        if self.day_from:
+            conditions.append({'publish_day': {'$gte': self.day_from}})
+        if self.day_to:
+            conditions.append({'publish_day': {'$lte': self.day_to}})
+        for keyword in self.keywords:
+            conditions.append({'keywords': {'$contains': keyword}})
+        if self.episodes is not None:
+            conditions.append({'episode_folder': {'$in': self.episodes}})
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {'$and': conditions}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.to_dict().items()
+                           if value or (name == 'episodes' and value is not None))
+        return f"SearchFilter({fields})"
+
+
+class MetadataColumnsWriter:
+    """Collects the filterable fields row by row during an index export"""
+
+    def __init__(self):
+        self.guests: Dict[str, int] = {}
+        self.keywords: Dict[str, int] = {}
+        self.episodes: Dict[str, int] = {}
+        self.guest_codes = array('I')
+        self.days = array('I')
+        # Flat (keyword, row) columns, grouped by keyword on save
+        self.keyword_ids = array('I')
+        self.keyword_rows = array('I')
+        self.episode_codes = array('I')
+
+    def add(self, metadata: Optional[Dict]):
+        metadata = metadata or {}
+        row = len(self.guest_codes)
+        guest = metadata.get('guest', 'Unknown')
+        self.guest_codes.append(self.guests.setdefault(guest, len(self.guests)))
+        self.days.append(metadata.get('publish_day') or publish_day(metadata.get('publish_date')))
+        for keyword in metadata.get('keywords') or []:
+            self.keyword_ids.append(self.keywords.setdefault(normalize_keyword(keyword), len(self.keywords)))
+            self.keyword_rows.append(row)
+        episode = metadata.get('episode_folder', '')
+        self.episode_codes.append(self.episodes.setdefault(episode, len(self.episodes)))
+
+    @staticmethod
+    def _save_lists(path: Path, name: str, ids: array, rows: Optional[array], n_lists: int):
+        """Group (list id, row) pairs into <name>_rows.npy + <name>_offsets.npy"""
+        ids = np.frombuffer(ids, dtype=np.uint32)
+        rows = np.frombuffer(rows, dtype=np.uint32) if rows is not None else np.arange(len(ids), dtype=np.uint32)
+        order = np.argsort(ids, kind='stable')  # Keeps rows ascending within a list
+        np.save(path / f"{name}_rows.npy", rows[order])
+        np.save(path / f"{name}_offsets.npy", np.concatenate(
+            [[0], np.cumsum(np.bincount(ids, minlength=n_lists))]).astype(np.int64))
+
+    def save(self, path: Path):
+        path = Path(path)
+        np.save(path / "filter_guest_codes.npy", np.frombuffer(self.guest_codes, dtype=np.uint32))
+        np.save(path / "filter_days.npy", np.frombuffer(self.days, dtype=np.uint32))
+        self._save_lists(path, "filter_keyword", self.keyword_ids, self.keyword_rows, len(self.keywords))
+        self._save_lists(path, "filter_episode", self.episode_codes, None, len(self.episodes))
+        for name, values in (("guests", self.guests), ("keywords", self.keywords), ("episodes", self.episodes)):
+            with open(path / f"filter_{name}.json", 'w', encoding='utf-8') as f:
+                json.dump(list(values), f, ensure_ascii=False)
+
+
+class MetadataColumns:
+    """Per-row guest, publish day, keyword and episode columns of a local index"""
+
+    def __init__(self, path: Union[str, Path]):
+        path = Path(path)
+        with open(path / "filter_guests.json", 'r', encoding='utf-8') as f:
+            self.guests = {guest: i for i, guest in enumerate(json.load(f))}
+        with open(path / "filter_keywords.json", 'r', encoding='utf-8') as f:
+            self.keywords = {keyword: i for i, keyword in enumerate(json.load(f))}
+        with open(path / "filter_episodes.json", 'r', encoding='utf-8') as f:
+            self.episodes = {episode: i for i, episode in enumerate(json.load(f))}
+        self.guest_codes = np.load(path / "filter_guest_codes.npy")
+        self.days = np.load(path / "filter_days.npy")
+        self.keyword_offsets = np.load(path / "filter_keyword_offsets.npy")
+        self.keyword_rows = np.load(path / "filter_keyword_rows.npy")
+        self.episode_offsets = np.load(path / "filter_episode_offsets.npy")
+        self.episode_rows = np.load(path / "filter_episode_rows.npy")
+        self.count = len(self.guest_codes)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional["MetadataColumns"]:
+        """Columns stored with an index, or None for indexes exported without them"""
+        if not (Path(path) / "filter_episode_rows.npy").exists():
+            return None
+        return cls(path)
+
+    def episode_row_lists(self) -> Dict[str, np.ndarray]:
+        """Rows of each episode, by episode folder"""
+        return {
+            episode: self.episode_rows[self.episode_offsets[code]:self.episode_offsets[code + 1]]
+            for episode, code in self.episodes.items()
+        }
+
+    def rows(self, search_filter: SearchFilter) -> np.ndarray:
+        """Row numbers matching the filter, ascending"""
+        candidates = None
+        if search_filter.episodes is not None:
+            # Episode lists are short, so start from them instead of a full mask
+            codes = [self.episodes[e] for e in search_filter.episodes if e in self.episodes]
+            candidates = np.sort(np.concatenate([np.empty(0, dtype=np.uint32)] + [
+                self.episode_rows[self.episode_offsets[c]:self.episode_offsets[c + 1]] for c in codes
+            ])).astype(np.int64)
+            if not (search_filter.guest or search_filter.day_from or search_filter.day_to
+                    or search_filter.keywords):
+                return candidates
+
+        mask = np.ones(self.count, dtype=bool)
+        if search_filter.guest:
+            code = self.guests.get(search_filter.guest)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            mask &= self.guest_codes == code
+        if search_filter.day_from:
+            mask &= self.days >= search_filter.day_from
+        if search_filter.day_to:
+            # Unknown dates are stored as 0, which the lower check alone would keep
+            mask &= (self.days <= search_filter.day_to) & (self.days > 0)
+        for keyword in search_filter.keywords:
+            term = self.keywords.get(keyword)
+            if term is None:
+                return np.empty(0, dtype=np.int64)
+            tagged = np.zeros(self.count, dtype=bool)
+            tagged[self.keyword_rows[self.keyword_offsets[term]:self.keyword_offsets[term + 1]]] = True
+            mask &= tagged
+        if candidates is not None:
+            return candidates[mask[candidates]]
+        return np.flatnonzero(mask)
+
+    def options(self) -> Dict[str, List]:
+        """Distinct guests, keywords and publish years, for filter pickers"""
+        return {
+            'guests': sorted(self.guests),
+            'keywords': sorted(self.keywords),
+            'years': sorted({int(day) // 10000 for day in np.unique(self.days) if day})
+        }
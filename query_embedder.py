@@ -0,0 +1,201 @@
+"""
+Query Embedder
+
+Turns questions into embeddings for LennyRAG with as few model calls as
+possible:
+1. An in-memory LRU of recent query embeddings (no I/O at all)
+2. The persistent embedding cache (SQLite, shared with ingestion)
+3. A micro-batcher: misses from concurrent threads that arrive within a
+   few milliseconds of each other share one embedding call, and identical
+   questions in flight at once are embedded only once
+
+Keys are the embedding cache keys (model + normalized text), so trivially
+different spellings of the same question share an entry.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from embedding_cache import CachedEmbeddingFunction, cache_key
+from instrumentation import stage, count
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("LENNY_QUERY_EMBEDDING_CACHE_SIZE", "10000"))
+DEFAULT_BATCH_WINDOW = float(os.getenv("LENNY_EMBED_BATCH_WINDOW_MS", "5")) / 1000
+MAX_BATCH_SIZE = 256      # Questions per embedding call
+
+Vector = List[float]
+
+
+class QueryEmbedder:
+    """Thread-safe query embedding with an LRU in front and micro-batching behind"""
+
+    def __init__(self, embedding_function: CachedEmbeddingFunction,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 batch_window: float = DEFAULT_BATCH_WINDOW,
+                 max_batch_size: int = MAX_BATCH_SIZE):
+        """
+        Args:
+            embedding_function: Cached embedding function; its cache is
+                consulted after the LRU, its wrapped function embeds misses
+            max_entries: Query embeddings kept in memory (0 disables the LRU)
+            batch_window: Seconds the first miss waits for others to join
+                its embedding call (0 embeds every miss right away)
+            max_batch_size: Questions per embedding call
+        """
+        self.embedding_function = embedding_function.embedding_function
+        self.model_name = embedding_function.model_name
+        self.cache = embedding_function.cache
+        self.max_entries = max_entries
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+
+        self._lru: "OrderedDict[str, Vector]" = OrderedDict()
+        self._queue: List[Tuple[str, str]] = []
+        self._pending: Dict[str, Future] = {}
+        self._collecting = False
+        self._lock = threading.Lock()
+
+        self.lru_hits = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.embedded = 0
+        self.batches = 0
+
+    def key(self, query: str) -> str:
+        return cache_key(self.model_name, query)
+
+    def cached(self, query: str) -> Optional[Vector]:
+        """Embedding from the in-memory LRU only, if present"""
+        key = self.key(query)
+        with self._lock:
+            embedding = self._lru.get(key)
+            if embedding is not None:
+                self._lru.move_to_end(key)
+                self.lru_hits += 1
+            return embedding
+
+    def lookup(self, queries: List[str]) -> List[Optional[Vector]]:
+        """Embeddings from the LRU, else the persistent cache; None where neither has one"""
+        keys = [self.key(query) for query in queries]
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                    self.lru_hits += 1
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            from_cache = self.cache.get_many(missing)
+            with self._lock:
+                self.cache_hits += len(from_cache)
+                self._remember(from_cache)
+            found.update(from_cache)
+        return [found.get(key) for key in keys]
+
+    def store(self, queries: List[str], embeddings: List[Vector]):
+        """Add freshly computed embeddings to the LRU and the persistent cache"""
+        items = {self.key(query): [float(x) for x in embedding]
+                 for query, embedding in zip(queries, embeddings)}
+        self.cache.put_many(items)
+        with self._lock:
+            self._remember(items)
+
+    def embed(self, query: str) -> Vector:
+        return self.embed_many([query])[0]
+
+    def embed_many(self, queries: List[str]) -> List[Vector]:
+        """
+        Embeddings for queries, in order
+
+        Misses wait up to batch_window for concurrent callers' misses, then
+        one of the waiting threads embeds them all in one call.
+        """
+        with stage("embed", n_queries=len(queries)):
+            embeddings = self.lookup(queries)
+            missing = {self.key(query): query for query, embedding in zip(queries, embeddings)
+                       if embedding is None}
+            n_misses = sum(embedding is None for embedding in embeddings)
+            if n_misses < len(queries):
+                count("query_embedding_hits", len(queries) - n_misses)
+            if not missing:
+                return embeddings
+            count("query_embedding_misses", n_misses)
+
+            futures = self._submit(missing)
+            return [embedding if embedding is not None else futures[self.key(query)].result()
+                    for query, embedding in zip(queries, embeddings)]
+
+    def _submit(self, missing: Dict[str, str]) -> Dict[str, Future]:
+        """Queue misses; the thread that opens a batch waits out the window and runs it"""
+        futures = {}
+        with self._lock:
+            for key, query in missing.items():
+                future = self._pending.get(key)
+                if future is None:
+                    future = self._pending[key] = Future()
+                    self._queue.append((key, query))
+                else:
+                    self.coalesced += 1
+                futures[key] = future
+            lead = not self._collecting and bool(self._queue)
+            if lead:
+                self._collecting = True
+
+        if lead:
+            if self.batch_window > 0:
+                time.sleep(self.batch_window)
+            with self._lock:
+                batch, self._queue = self._queue, []
+                # Misses arriving from now on open the next batch
+                self._collecting = False
+            for i in range(0, len(batch), self.max_batch_size):
+                self._run(batch[i:i + self.max_batch_size])
+        return futures
+
+    def _run(self, batch: List[Tuple[str, str]]):
+        """Embed one batch and resolve its futures"""
+        try:
+            embeddings = [[float(x) for x in embedding]
+                          for embedding in self.embedding_function([query for _, query in batch])]
+            self.store([query for _, query in batch], embeddings)
+        except Exception as e:
+            with self._lock:
+                for key, _ in batch:
+                    self._pending.pop(key).set_exception(e)
+            return
+        with self._lock:
+            self.embedded += len(batch)
+            self.batches += 1
+            for (key, _), embedding in zip(batch, embeddings):
+                self._pending.pop(key).set_result(embedding)
+
+    def _remember(self, items: Dict[str, Vector]):
+        """Insert into the LRU, evicting the oldest entries (caller holds the lock)"""
+        if self.max_entries <= 0:
+            return
+        for key, embedding in items.items():
+            self._lru[key] = embedding
+            self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def stats(self) -> Dict:
+        """Hit and batching counters for monitoring"""
+        return {
+            'lru_hits': self.lru_hits,
+            'cache_hits': self.cache_hits,
+            'coalesced': self.coalesced,
+            'embedded': self.embedded,
+            'batches': self.batches,
+            'mean_batch_size': self.embedded / self.batches if self.batches else 0.0,
+            'entries': len(self),
+            'max_entries': self.max_entries
+        }
@@ -8,102 +8,692 @@ This module handles:
 """
 
 import os
+import json
+import time
+import threading
 import chromadb
-from chromadb.utils import embedding_functions
+import numpy as np
 from openai import OpenAI
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 from dotenv import load_dotenv
+from embedding_backends import (EMBEDDING_BACKENDS, resolve_backend, create_embedding_function,
+                                collection_backend, check_collection)
+from vector_index import VectorIndex, INDEX_PATH
+from bm25_index import BM25Index, BM25_PATH
+from episode_index import EpisodeIndex, EPISODE_INDEX_PATH
+from answer_cache import AnswerCache
+from query_embedder import QueryEmbedder
+from instrumentation import TRACER, stage, record, count, count_usage
+from context_packing import ContextPacker
+from reranking import Reranker, rerank_candidates
+from metadata_filters import SearchFilter
+from ingest_state import MANIFEST_PATH
+from snapshots import (SNAPSHOTS_PATH, SnapshotCollection, current_version, load_manifest,
+                       snapshot_path, acquire_lease, release_lease)
 
 load_dotenv()
 
+# Retrieval backends: "chroma" queries the collection; "exact", "ivf",
+# "hnsw" and "quantized" search the local memory-mapped index exported by
+# vector_index.py (or a snapshot's copy of it, see snapshots.py)
+RETRIEVERS = ("chroma", "exact", "ivf", "hnsw", "quantized")
+
+# What the approximate retrievers search, and the export flag that builds it
+STRUCTURES = {"ivf": "IVF lists", "hnsw": "HNSW graph", "quantized": "quantized codes"}
+EXPORT_FLAGS = {"ivf": "--ivf-lists 150", "hnsw": "--hnsw", "quantized": "--quantize int8"}
+
+# Hybrid search fuses this many candidates from each retriever
+RRF_K = 60
+MIN_FUSION_CANDIDATES = 30
+
+# Two-stage search ranks chunks within only this many top episodes
+TWO_STAGE_EPISODES = int(os.getenv("LENNY_TWO_STAGE_EPISODES", "20"))
+
+CHAT_MODEL = "gpt-4-turbo-preview"
+WARM_UP_QUERY = "How do you find product-market fit?"
+
+# How often ask() checks whether the collection was re-ingested
+VERSION_CHECK_INTERVAL = 5.0
+
+
+def fusion_candidates(n_results: int) -> int:
+    """Candidates to fetch from each retriever for n_results fused results"""
+    return max(n_results * 3, MIN_FUSION_CANDIDATES)
+
+
+def missing_structure(index: VectorIndex, retriever: str) -> bool:
+    """True if the index was exported without the structure retriever searches"""
+    return ((retriever == "ivf" and index.ivf_centroids is None)
+            or (retriever == "hnsw" and index.hnsw is None)
+            or (retriever == "quantized" and index.quantized is None))
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Merge ranked ID lists by summing 1 / (k + rank) across lists
+
+    Returns:
+        (ID, fused score) pairs, best first
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+def answer_scope(n_results: int, filters: Optional[SearchFilter] = None) -> Union[int, str]:
+    """Answer cache scope: answers are only reused for the same n_results and filters"""
+    return f"{n_results}|{filters.key()}" if filters else n_results
+
 class LennyRAG:
-    def __init__(self, collection_name: str = "lenny_transcripts"):
-        """Initialize RAG system"""
+    """
+    Retrieval and answer synthesis over the transcript collection
+
+    One instance can serve concurrent threads: the clients, indexes and
+    caches it holds are either read-only or lock-protected.
+    """
+    
+    def __init__(self, collection_name: str = "lenny_transcripts",
+                 retriever: Optional[str] = None, index_path: str = INDEX_PATH,
+                 hybrid: Optional[bool] = None, bm25_path: str = BM25_PATH,
+                 answer_cache: Optional[AnswerCache] = None,
+                 two_stage: Optional[bool] = None, episode_index_path: str = EPISODE_INDEX_PATH,
+                 n_episodes: int = TWO_STAGE_EPISODES,
+                 embedding_backend: Optional[str] = None,
+                 rerank: Optional[bool] = None,
+                 snapshot: Optional[str] = None, snapshots_path: str = SNAPSHOTS_PATH):
+        """
+        Initialize RAG system
         
-        # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(path="./data/vector_db")
+        Args:
+            collection_name: ChromaDB collection to load
+            retriever: Retrieval backend, one of RETRIEVERS (default: the
+                LENNY_RETRIEVER environment variable, else "chroma")
+            index_path: Local index directory for the non-Chroma backends
+            hybrid: Fuse BM25 keyword results with the vector results
+                (default: on unless LENNY_HYBRID=0)
+            bm25_path: BM25 index directory
+            answer_cache: Cache for ask() results (default: a new in-memory
+                AnswerCache configured from the environment)
+            two_stage: Pick the top n_episodes episodes from the episode
+                index first, then rank chunks within them only (default:
+                off unless LENNY_TWO_STAGE=1)
+            episode_index_path: Episode index directory for two_stage
+            n_episodes: Episodes kept by the first stage
+            embedding_backend: Embedding backend for queries, one of
+                EMBEDDING_BACKENDS (default: LENNY_EMBEDDING_BACKEND, else
+                whichever built the collection); must match the collection
+            rerank: Over-fetch candidates and rescore them on CPU within a
+                latency budget before keeping n_results (default: off
+                unless LENNY_RERANK=1; see reranking.py)
+            snapshot: Serve a prebuilt index snapshot instead of ChromaDB
+                and the ./data indexes: a version, or "current" to follow
+                the published one and hot-swap to each newly published
+                snapshot (default: LENNY_SNAPSHOT, else off; see
+                snapshots.py). Chunks come from the snapshot, so the
+                retriever defaults to "exact" and "chroma" is unavailable.
+            snapshots_path: Snapshots directory
+        """
+        snapshot = snapshot or os.getenv("LENNY_SNAPSHOT") or None
+        self.retriever = retriever or os.getenv("LENNY_RETRIEVER") or ("exact" if snapshot else "chroma")
+        if self.retriever not in RETRIEVERS:
+            raise ValueError(f"Unknown retriever {self.retriever!r}, expected one of {RETRIEVERS}")
+        if snapshot and self.retriever == "chroma":
+            raise ValueError("Snapshots are served from the local index; use an 'exact', 'ivf', "
+                             "'hnsw' or 'quantized' retriever")
+        if hybrid is None:
+            hybrid = os.getenv("LENNY_HYBRID", "1") != "0"
+        if two_stage is None:
+            two_stage = os.getenv("LENNY_TWO_STAGE", "0") == "1"
+        if rerank is None:
+            rerank = os.getenv("LENNY_RERANK", "0") == "1"
+        self.hybrid = hybrid
+        self.two_stage = two_stage
         
-        # Initialize OpenAI embeddings
-        openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            model_name="text-embedding-3-small"
-        )
+        # Snapshot mode: load the published (or pinned) snapshot and skip ChromaDB
+        self.snapshots_path = snapshots_path
+        self.follow_snapshots = snapshot == "current"
+        self.snapshot = None
+        self._snapshot_lease = None
+        self._swap_lock = threading.Lock()
+        self._swap_thread = None
+        self._failed_snapshot = None
+        loaded = None
+        if snapshot:
+            version = current_version(snapshots_path) if self.follow_snapshots else snapshot
+            if version is None:
+                print(f"❌ No snapshot published in {snapshots_path}")
+                print(f"   Run 'python snapshots.py build --publish' first!")
+                raise FileNotFoundError(f"No snapshot published in {snapshots_path}")
+            loaded = self._open_snapshot(version)
+            self.client = None
+            self.collection = loaded['collection']
+        else:
+            # Initialize ChromaDB
+            self.client = chromadb.PersistentClient(path="./data/vector_db")
+            
+            # Get collection
+            try:
+                self.collection = self.client.get_collection(name=collection_name)
+            except Exception as e:
+                print(f"❌ Collection not found: {collection_name}")
+                print(f"   Run 'python ingest_transcripts.py' first!")
+                raise e
         
-        # Get collection
-        try:
+        # Initialize query embeddings with the model that built the
+        # collection (cached on disk, so repeat queries skip the model)
+        self.embedding_backend = resolve_backend(
+            embedding_backend or os.getenv("LENNY_EMBEDDING_BACKEND")
+            or collection_backend(self.collection)
+        )
+        check_collection(self.collection, self.embedding_backend)
+        self.embedding_function = create_embedding_function(self.embedding_backend)
+        if loaded is None:
             self.collection = self.client.get_collection(
                 name=collection_name,
-                embedding_function=openai_ef
+                embedding_function=self.embedding_function
             )
             print(f"✅ Loaded collection: {collection_name}")
-            print(f"📊 Collection size: {self.collection.count()} chunks")
-        except Exception as e:
-            print(f"❌ Collection not found: {collection_name}")
-            print(f"   Run 'python ingest_transcripts.py' first!")
-            raise e
+        else:
+            print(f"✅ Loaded snapshot: {loaded['version']} ({self.collection.name})")
+        print(f"📊 Collection size: {self.collection.count()} chunks "
+              f"({self.embedding_backend} embeddings)")
+        
+        # Query embeddings: in-memory LRU, then the embedding cache, then
+        # micro-batched calls shared by concurrent users
+        self.query_embedder = QueryEmbedder(self.embedding_function)
         
         # Initialize OpenAI client
         self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        
+        # Load the local indexes for in-process retrieval (a snapshot brings
+        # its own vector, BM25 and episode indexes)
+        self.index = None
+        self.bm25 = None
+        self.episode_index = None
+        self.n_episodes = n_episodes
+        self.index_path = index_path
+        self.bm25_path = bm25_path
+        self.episode_index_path = episode_index_path
+        self._install(loaded if loaded is not None else self._open_local_indexes())
+        
+        # Rescores over-fetched candidates, IDF-weighted by the BM25 index
+        self.reranker = Reranker(self.bm25) if rerank else None
+        if self.reranker is not None:
+            print(f"🎯 Reranking enabled: {self.reranker.budget_ms:g} ms budget")
+        
+        # Packs retrieved chunks into the prompt's token budget
+        self.context_packer = ContextPacker()
+        
+        # Cache answers to repeated and near-duplicate questions
+        self.answer_cache = answer_cache if answer_cache is not None else AnswerCache()
+        self._version_checked = 0.0
     
-    def search(self, query: str, n_results: int = 10) -> Dict:
+    def warm_up(self, query: str = WARM_UP_QUERY) -> Dict:
+        """
+        Pre-load everything the first real question would otherwise pay for:
+        the memory-mapped indexes (into the page cache), the ChromaDB
+        collection, the embedding client connection and one retrieval pass
+        
+        Returns:
+            Seconds spent per step
+        """
+        timings = {}
+        start = time.time()
+        if self.index is not None:
+            if self.retriever != "quantized":
+                # One sequential read faults the whole vector file in; quantized
+                # search keeps it on disk and only reads shortlisted rows
+                float(np.asarray(self.index.vectors).sum())
+            timings['vector_index'] = time.time() - start
+        if self.bm25 is not None:
+            step = time.time()
+            self.bm25.search(query, 1)
+            timings['bm25'] = time.time() - step
+        step = time.time()
+        self._check_version()
+        self.search(query, n_results=5)
+        timings['search'] = time.time() - step
+        timings['total'] = time.time() - start
+        print(f"🔥 Warmed up in {timings['total']:.2f}s")
+        return timings
+    
+    def collection_version(self) -> str:
+        """
+        Changes whenever ingestion adds, removes or updates chunks, the
+        local indexes are reloaded, or another snapshot is swapped in
+        """
+        if self.snapshot is not None:
+            return f"snapshot:{self.snapshot}"
+        try:
+            manifest_mtime = os.path.getmtime(MANIFEST_PATH)
+        except OSError:
+            manifest_mtime = 0.0
+        index_created = self.index.info.get('created') if self.index is not None else None
+        return f"{self.collection.count()}:{manifest_mtime}:{index_created}"
+    
+    def _open_local_indexes(self) -> Dict:
+        """
+        Load the ./data indexes with this engine's retriever, hybrid and
+        two-stage settings
+        
+        Returns:
+            Dict with 'index', 'bm25' and 'episode_index' (None where not
+            enabled or not found)
+        """
+        embedding_dim = EMBEDDING_BACKENDS[self.embedding_backend]['dim']
+        index = None
+        if self.retriever != "chroma":
+            try:
+                index = VectorIndex(self.index_path)
+            except FileNotFoundError as e:
+                print(f"❌ Local index not found at {self.index_path}")
+                print(f"   Run 'python vector_index.py export' first!")
+                raise e
+            if index.count and index.dim != embedding_dim:
+                raise ValueError(f"Local index at {self.index_path} has {index.dim}-dim vectors, "
+                                 f"expected {embedding_dim}; re-export it with vector_index.py")
+            if missing_structure(index, self.retriever):
+                raise ValueError(f"Local index at {self.index_path} has no {STRUCTURES[self.retriever]} for "
+                                 f"{self.retriever} search; re-export it with "
+                                 f"'python vector_index.py export {EXPORT_FLAGS[self.retriever]}'")
+        
+        # Keyword index for hybrid search
+        bm25 = None
+        if self.hybrid:
+            try:
+                bm25 = BM25Index(self.bm25_path)
+            except FileNotFoundError:
+                print(f"⚠️  BM25 index not found at {self.bm25_path}, using vector search only")
+                print(f"   Run 'python bm25_index.py build' to enable hybrid search")
+        
+        # Episode index for two-stage search
+        episode_index = None
+        if self.two_stage:
+            try:
+                episode_index = EpisodeIndex(self.episode_index_path)
+            except FileNotFoundError:
+                print(f"⚠️  Episode index not found at {self.episode_index_path}, using flat search")
+                print(f"   Run 'python episode_index.py build' to enable two-stage search")
+            if (episode_index is not None and episode_index.count
+                    and episode_index.vectors.shape[1] != embedding_dim):
+                raise ValueError(f"Episode index at {self.episode_index_path} does not match the "
+                                 f"{self.embedding_backend} embeddings; rebuild it with episode_index.py")
+        return {'index': index, 'bm25': bm25, 'episode_index': episode_index}
+    
+    def local_indexes_changed(self) -> bool:
+        """True if ingestion re-exported a loaded local index since it was loaded"""
+        for index in (self.index, self.bm25, self.episode_index):
+            if index is None:
+                continue
+            try:
+                with open(index.path / "index.json", 'r', encoding='utf-8') as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                continue  # Missing or being written: look again at the next check
+            if (info.get('created'), info.get('count')) != (index.info.get('created'), index.info.get('count')):
+                return True
+        return False
+    
+    def reload_indexes(self) -> bool:
+        """
+        Reload the ./data indexes if ingestion re-exported them, switching
+        to them without interrupting requests (as swap_snapshot does)
+        
+        Returns:
+            True if new indexes are now being served
+        """
+        if self.snapshot is not None:
+            raise ValueError("Serving a snapshot; use swap_snapshot")
+        with self._swap_lock:
+            if not self.local_indexes_changed():
+                return False
+            start = time.time()
+            loaded = self._open_local_indexes()
+            if loaded['index'] is not None and self.retriever != "quantized":
+                float(np.asarray(loaded['index'].vectors).sum())
+            self._install(loaded)
+            self.answer_cache.set_version(self.collection_version())
+        print(f"🔄 Reloaded re-exported local indexes in {time.time() - start:.2f}s")
+        return True
+    
+    def _open_snapshot(self, version: str) -> Dict:
+        """
+        Load a snapshot's indexes with this engine's retriever, hybrid and
+        two-stage settings
+        
+        Returns:
+            Dict with 'version', 'lease' (held until another snapshot is
+            installed), 'manifest', 'collection', 'index', 'bm25' and
+            'episode_index' (None where not enabled or not in the snapshot)
+        """
+        # Lease it first, so prune can't delete it while it loads
+        lease = acquire_lease(version, self.snapshots_path)
+        try:
+            return self._load_snapshot(version, lease)
+        except BaseException:
+            release_lease(lease)
+            raise
+    
+    def _load_snapshot(self, version: str, lease) -> Dict:
+        manifest = load_manifest(version, self.snapshots_path)
+        path = snapshot_path(version, self.snapshots_path)
+        index = VectorIndex(str(path / "vector_index"))
+        if index.count and index.dim != manifest['embedding_dim']:
+            raise ValueError(f"Snapshot {version} has {index.dim}-dim vectors, "
+                             f"but its manifest says {manifest['embedding_dim']}")
+        if missing_structure(index, self.retriever):
+            raise ValueError(f"Snapshot {version} has no {STRUCTURES[self.retriever]} for "
+                             f"{self.retriever} search; build one with "
+                             f"'python snapshots.py build {EXPORT_FLAGS[self.retriever]}'")
+        bm25 = None
+        if self.hybrid:
+            if manifest['indexes']['bm25_index']:
+                bm25 = BM25Index(str(path / "bm25_index"))
+            else:
+                print(f"⚠️  Snapshot {version} has no BM25 index, using vector search only")
+        episode_index = None
+        if self.two_stage:
+            if manifest['indexes']['episode_index']:
+                episode_index = EpisodeIndex(str(path / "episode_index"))
+            else:
+                print(f"⚠️  Snapshot {version} has no episode index, using flat search")
+        return {
+            'version': version,
+            'lease': lease,
+            'manifest': manifest,
+            'collection': SnapshotCollection(index, manifest),
+            'index': index,
+            'bm25': bm25,
+            'episode_index': episode_index
+        }
+    
+    def _install(self, loaded: Dict):
+        """Switch retrieval to loaded indexes (a snapshot's, or the ./data ones)"""
+        # Requests read these attributes as they go; one started on the old
+        # indexes may see a mix for an instant, which only costs it chunk
+        # IDs the new ones no longer have (get() skips them). The old
+        # indexes are released once the last request using them returns.
+        if 'collection' in loaded:
+            self.collection = loaded['collection']
+            self.snapshot = loaded['version']
+            if self._snapshot_lease is not None:
+                release_lease(self._snapshot_lease)
+            self._snapshot_lease = loaded['lease']
+        self.index = loaded['index']
+        self.bm25 = loaded['bm25']
+        self.episode_index = loaded['episode_index']
+        if getattr(self, 'reranker', None) is not None:
+            self.reranker = Reranker(self.bm25, self.reranker.budget_ms, self.reranker.batch_size)
+        if self.index is not None:
+            print(f"⚡ Loaded local index: {self.index.count} vectors ({self.retriever} search)")
+        if self.bm25 is not None:
+            print(f"🔤 Loaded BM25 index: {self.bm25.count} chunks (hybrid search)")
+        if self.episode_index is not None:
+            print(f"🗂️  Loaded episode index: {self.episode_index.count} episodes "
+                  f"(two-stage search over the top {self.n_episodes})")
+    
+    def swap_snapshot(self, version: Optional[str] = None) -> bool:
+        """
+        Load another snapshot and switch to it without interrupting requests
+        
+        The new indexes are loaded and paged in while the old ones keep
+        serving, then swapped in at once; cached answers are dropped.
+        
+        Args:
+            version: Snapshot to serve (default: the published one)
+            
+        Returns:
+            True if a different snapshot is now being served
+        """
+        if self.snapshot is None:
+            raise ValueError("Not serving a snapshot; start with snapshot='current' or a version")
+        with self._swap_lock:
+            version = version or current_version(self.snapshots_path)
+            if version is None or version == self.snapshot:
+                return False
+            start = time.time()
+            loaded = self._open_snapshot(version)
+            if loaded['manifest']['embedding_backend'] != self.embedding_backend:
+                release_lease(loaded['lease'])
+                raise ValueError(f"Snapshot {version} was built with the "
+                                 f"{loaded['manifest']['embedding_backend']!r} embedding backend, "
+                                 f"not {self.embedding_backend!r}; restart to switch backends")
+            if self.retriever != "quantized":
+                float(np.asarray(loaded['index'].vectors).sum())
+            previous = self.snapshot
+            self._install(loaded)
+            self.answer_cache.set_version(self.collection_version())
+        print(f"🔄 Swapped snapshot {previous} -> {version} in {time.time() - start:.2f}s")
+        return True
+    
+    def _swap_in_background(self, version: Optional[str]):
+        try:
+            if version is None:
+                self.reload_indexes()
+            else:
+                self.swap_snapshot(version)
+        except Exception as e:
+            # Keep serving what is loaded; a snapshot isn't retried until
+            # another is published, local indexes at the next check
+            if version is not None:
+                self._failed_snapshot = version
+            print(f"❌ {'Snapshot ' + version if version else 'Re-exported indexes'} failed to load: "
+                  f"{e.__class__.__name__}: {e}")
+    
+    def filter_options(self) -> Dict[str, List]:
+        """
+        Guests, keywords and publish years that filters can select, from
+        the local indexes' metadata columns (empty lists if neither index
+        has them)
+        """
+        for index in (self.index, self.bm25):
+            if index is not None and index.metadata is not None:
+                return index.metadata.options()
+        return {'guests': [], 'keywords': [], 'years': []}
+    
+    def search(self, query: str, n_results: int = 10,
+               query_embedding: Optional[List[float]] = None,
+               filters: Optional[SearchFilter] = None) -> Dict:
         """
         Search for relevant transcript chunks
         
         Args:
             query: User's question
             n_results: Number of chunks to retrieve
+            query_embedding: Precomputed embedding of query, if available
+            filters: Only search chunks of episodes matching these guest,
+                date and keyword restrictions
             
         Returns:
             Dict with results and metadata
         """
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
+        n_ranked = rerank_candidates(n_results) if self.reranker is not None else n_results
+        with stage("retrieve"):
+            if self.bm25 is None:
+                chunks = self.vector_search(query, n_ranked, query_embedding, filters)
+            else:
+                # Over-fetch from both retrievers and keep the best fused ranks
+                n_candidates = fusion_candidates(n_results)
+                vector_chunks = self.vector_search(query, n_candidates, query_embedding, filters)
+                keyword_hits = self.keyword_search(query, n_candidates, filters)
+                chunks = self.fuse_results(vector_chunks, keyword_hits, n_ranked)
+            
+            return {
+                'query': query,
+                'chunks': self.rerank_results(query, chunks, n_results)
+            }
+    
+    def fuse_results(self, vector_chunks: List[Dict], keyword_hits: List[Tuple[str, float]],
+                     n_results: int) -> List[Dict]:
+        """Reciprocal rank fusion of vector and BM25 results, as chunk dicts"""
+        fused = reciprocal_rank_fusion([
+            [chunk['id'] for chunk in vector_chunks],
+            [chunk_id for chunk_id, _ in keyword_hits]
+        ])[:n_results]
+        
+        # Keyword-only hits still need their text and metadata
+        by_id = {chunk['id']: chunk for chunk in vector_chunks}
+        missing = [chunk_id for chunk_id, _ in fused if chunk_id not in by_id]
+        if missing:
+            with stage("chroma_get"):
+                extra = self.collection.get(ids=missing, include=['documents', 'metadatas'])
+            for chunk_id, text, metadata in zip(extra['ids'], extra['documents'], extra['metadatas']):
+                by_id[chunk_id] = {'id': chunk_id, 'text': text, 'metadata': metadata, 'distance': None}
         
-        # Format results
         chunks = []
-        for i in range(len(results['documents'][0])):
-            chunks.append({
-                'text': results['documents'][0][i],
-                'metadata': results['metadatas'][0][i],
-                'distance': results['distances'][0][i] if 'distances' in results else None
-            })
+        for chunk_id, score in fused:
+            if chunk_id in by_id:
+                chunks.append(dict(by_id[chunk_id], rrf_score=score))
+        return chunks
+    
+    def rerank_results(self, query: str, chunks: List[Dict], n_results: int) -> List[Dict]:
+        """Top n_results of the retrieved candidates, reranked if enabled"""
+        if self.reranker is None:
+            return chunks[:n_results]
+        with stage("rerank", candidates=len(chunks)):
+            chunks, stats = self.reranker.rerank(query, chunks, n_results)
+        if stats['timed_out']:
+            count("rerank_timeouts")
+        return chunks
+    
+    def vector_search(self, query: str, n_results: int = 10,
+                      query_embedding: Optional[List[float]] = None,
+                      filters: Optional[SearchFilter] = None) -> List[Dict]:
+        """Embedding search with the configured retriever backend"""
+        if query_embedding is None:
+            query_embedding = self.query_embedder.embed(query)
+        return self.vector_search_batch([query_embedding], n_results, filters)[0]
+    
+    def top_episodes(self, query_embeddings: List[List[float]],
+                     filters: Optional[SearchFilter] = None) -> List[SearchFilter]:
+        """
+        First stage of two-stage search: the best n_episodes episodes per
+        query (among those matching filters), as a filter for the second
+        """
+        with stage("episode_search"):
+            episode_lists = self.episode_index.search(query_embeddings, self.n_episodes, filters)
+        return [(filters or SearchFilter()).with_episodes(episodes) for episodes in episode_lists]
+    
+    def vector_search_batch(self, query_embeddings: List[List[float]], n_results: int = 10,
+                            filters: Optional[SearchFilter] = None) -> List[List[Dict]]:
+        """
+        Embedding search for many queries in one index call (one matrix
+        product locally)
         
-        return {
-            'query': query,
-            'chunks': chunks
-        }
+        With filters, the local index first selects the matching rows from
+        its metadata columns and scans only those; ChromaDB gets the
+        equivalent where clause.
+        
+        In two-stage mode each query is first narrowed to its top episodes,
+        so only their chunks are scanned (one index call per query). BM25
+        is not narrowed, so exact-name matches in other episodes still
+        reach the fused results.
+        """
+        if self.episode_index is not None:
+            return [
+                self._vector_search_batch([query_embedding], n_results, episode_filter)[0]
+                for query_embedding, episode_filter
+                in zip(query_embeddings, self.top_episodes(query_embeddings, filters))
+            ]
+        return self._vector_search_batch(query_embeddings, n_results, filters)
     
-    def format_context(self, chunks: List[Dict]) -> str:
-        """Format retrieved chunks for LLM context"""
-        context_parts = []
+    def _vector_search_batch(self, query_embeddings: List[List[float]], n_results: int,
+                             filters: Optional[SearchFilter]) -> List[List[Dict]]:
+        if filters is not None and filters.episodes == []:
+            return [[] for _ in query_embeddings]
+        if self.index is not None and (not filters or self.index.metadata is not None):
+            with stage("index_query", retriever=self.retriever):
+                rows = self.index.metadata.rows(filters) if filters else None
+                results = self.index.query(query_embeddings, n_results=n_results,
+                                           method=self.retriever, rows=rows)
+        else:
+            with stage("chroma_query"):
+                results = self.collection.query(
+                    query_embeddings=list(query_embeddings),
+                    n_results=n_results,
+                    where=filters.to_where() if filters else None
+                )
         
-        for i, chunk in enumerate(chunks):
-            meta = chunk['metadata']
-            context_parts.append(
-                f"[Source {i+1}]\n"
-                f"Guest: {meta.get('guest', 'Unknown')}\n"
-                f"Episode: {meta.get('title', 'Unknown')}\n"
-                f"Content:\n{chunk['text']}\n"
-            )
+        # Format results
+        all_chunks = []
+        for q in range(len(results['ids'])):
+            chunks = []
+            for i in range(len(results['documents'][q])):
+                chunks.append({
+                    'id': results['ids'][q][i],
+                    'text': results['documents'][q][i],
+                    'metadata': results['metadatas'][q][i],
+                    'distance': results['distances'][q][i] if 'distances' in results else None
+                })
+            all_chunks.append(chunks)
+        return all_chunks
+    
+    def keyword_search(self, query: str, n_results: int = 10,
+                       filters: Optional[SearchFilter] = None) -> List[Tuple[str, float]]:
+        """
+        BM25 search, restricted to the filtered rows
         
-        return "\n---\n\n".join(context_parts)
+        Returns:
+            (chunk ID, score) pairs; empty without a BM25 index, or with
+            filters on an index built before metadata columns existed
+        """
+        if self.bm25 is None:
+            return []
+        if filters and self.bm25.metadata is None:
+            return []
+        with stage("bm25"):
+            if not filters:
+                return self.bm25.search(query, n_results)
+            return self.bm25.search(query, n_results, self.bm25.metadata.rows(filters))
     
-    def synthesize_answer(self, query: str, chunks: List[Dict]) -> Dict:
+    def search_batch(self, queries: List[str], n_results: int = 10,
+                     query_embeddings: Optional[List[List[float]]] = None,
+                     filters: Optional[SearchFilter] = None) -> List[Dict]:
         """
-        Use OpenAI GPT-4 to synthesize answer from retrieved chunks
+        search() for many queries at once: one embedding call for all of
+        them and one vector index call, then per-query BM25 fusion and
+        reranking
         
         Args:
-            query: User's question
-            chunks: Retrieved context chunks
+            queries: Questions
+            n_results: Chunks to retrieve per question
+            query_embeddings: Precomputed embeddings, if available
+            filters: Guest/date/keyword restrictions applied to every query
             
         Returns:
-            Dict with answer and citations
+            One search() result dict per query, in order
+        """
+        if not queries:
+            return []
+        if query_embeddings is None:
+            query_embeddings = self.query_embedder.embed_many(list(queries))
+        n_ranked = rerank_candidates(n_results) if self.reranker is not None else n_results
+        n_candidates = fusion_candidates(n_results) if self.bm25 is not None else n_ranked
+        all_vector_chunks = self.vector_search_batch(query_embeddings, n_candidates, filters)
+        
+        results = []
+        for query, vector_chunks in zip(queries, all_vector_chunks):
+            if self.bm25 is not None:
+                keyword_hits = self.keyword_search(query, n_candidates, filters)
+                vector_chunks = self.fuse_results(vector_chunks, keyword_hits, n_ranked)
+            results.append({'query': query, 'chunks': self.rerank_results(query, vector_chunks, n_results)})
+        return results
+    
+    def format_context(self, chunks: List[Dict]) -> str:
+        """
+        Format retrieved chunks for LLM context: duplicates dropped, one
+        header per episode, packed to the context token budget (see
+        context_packing.py)
         """
+        return self.context_packer.pack(chunks)[0]
+    
+    def build_prompt(self, query: str, chunks: List[Dict]) -> str:
+        """Answer-synthesis prompt for a question and its retrieved chunks"""
         context = self.format_context(chunks)
         
-        prompt = f"""You are an expert at analyzing podcast transcripts from Lenny's Podcast, which features interviews with world-class product leaders and growth experts.
+        return f"""You are an expert at analyzing podcast transcripts from Lenny's Podcast, which features interviews with world-class product leaders and growth experts.
 
 A user has asked a question. Your job is to answer it using ONLY information from the provided transcript excerpts. Be specific and cite your sources.
 
@@ -122,23 +712,11 @@ INSTRUCTIONS:
 6. Format your answer in markdown
 
 ANSWER:"""
-
-        # Call OpenAI GPT-4
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[{
-                "role": "user",
-                "content": prompt
-            }],
-            temperature=0.3,
-            max_tokens=2000
-        )
-        
-        answer_text = response.choices[0].message.content
-        
-        # Extract citations from chunks
+    
+    def extract_citations(self, chunks: List[Dict]) -> List[Dict]:
+        """Citations for the top 5 most relevant chunks"""
         citations = []
-        for chunk in chunks[:5]:  # Top 5 most relevant
+        for chunk in chunks[:5]:
             meta = chunk['metadata']
             citations.append({
                 'guest': meta.get('guest', 'Unknown'),
@@ -147,37 +725,213 @@ ANSWER:"""
                 'episode_folder': meta.get('episode_folder', ''),
                 'text_snippet': chunk['text'][:200] + "..."
             })
+        return citations
+    
+    def synthesize_answer(self, query: str, chunks: List[Dict]) -> Dict:
+        """
+        Use OpenAI GPT-4 to synthesize answer from retrieved chunks
+        
+        Args:
+            query: User's question
+            chunks: Retrieved context chunks
+            
+        Returns:
+            Dict with answer and citations
+        """
+        with stage("prompt"):
+            prompt = self.build_prompt(query, chunks)
+        
+        # Call OpenAI GPT-4
+        with stage("llm", model=CHAT_MODEL):
+            response = self.openai_client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=[{
+                    "role": "user",
+                    "content": prompt
+                }],
+                temperature=0.3,
+                max_tokens=2000
+            )
+        count_usage(response.usage)
         
         return {
-            'answer': answer_text,
-            'citations': citations,
+            'answer': response.choices[0].message.content,
+            'citations': self.extract_citations(chunks),
             'n_sources': len(chunks)
         }
     
-    def ask(self, query: str, n_results: int = 10) -> Dict:
+    def synthesize_answer_stream(self, query: str, chunks: List[Dict]) -> Iterator[str]:
+        """
+        Streaming variant of synthesize_answer
+        
+        Yields:
+            Answer text deltas as the model produces them
+        """
+        with stage("prompt"):
+            prompt = self.build_prompt(query, chunks)
+        
+        with stage("llm", model=CHAT_MODEL) as span:
+            stream = self.openai_client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=[{
+                    "role": "user",
+                    "content": prompt
+                }],
+                temperature=0.3,
+                max_tokens=2000,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            first_token = True
+            for event in stream:
+                if event.choices and event.choices[0].delta.content:
+                    if first_token:
+                        record("llm_first_token", span.start)
+                        first_token = False
+                    yield event.choices[0].delta.content
+                if event.usage:
+                    count_usage(event.usage)
+    
+    def _check_version(self):
+        """
+        Drop cached answers if the transcripts were re-ingested, and start
+        loading re-exported local indexes, or a newly published snapshot
+        when following them, in the background
+        """
+        if time.monotonic() - self._version_checked > VERSION_CHECK_INTERVAL:
+            self._version_checked = time.monotonic()
+            self.answer_cache.set_version(self.collection_version())
+            if self._swap_thread and self._swap_thread.is_alive():
+                return
+            if self.follow_snapshots:
+                version = current_version(self.snapshots_path)
+                if version in (None, self.snapshot, self._failed_snapshot):
+                    return
+            elif self.snapshot is None and self.local_indexes_changed():
+                version = None
+            else:
+                return
+            self._swap_thread = threading.Thread(target=self._swap_in_background, args=(version,),
+                                                 name="index-swap", daemon=True)
+            self._swap_thread.start()
+    
+    def _cached_answer(self, query: str, n_results: int,
+                       filters: Optional[SearchFilter] = None) -> Tuple[Optional[Dict], Optional[List[float]]]:
+        """
+        Look the question up in the answer cache
+        
+        Returns:
+            (cached result with cache_hit set, or None; query embedding if
+            one was computed for the semantic lookup)
+        """
+        self._check_version()
+        scope = answer_scope(n_results, filters)
+        
+        with stage("answer_cache"):
+            cached = self.answer_cache.get_exact(query, scope)
+        if cached is not None:
+            count("answer_cache_hits")
+            return dict(cached, query=query, cache_hit='exact'), None
+        
+        query_embedding = self.query_embedder.embed(query)
+        with stage("answer_cache"):
+            cached = self.answer_cache.get_similar(query_embedding, scope)
+        if cached is not None:
+            count("answer_cache_hits")
+            return dict(cached, query=query, cache_hit='semantic'), query_embedding
+        count("answer_cache_misses")
+        return None, query_embedding
+    
+    def ask(self, query: str, n_results: int = 10,
+            filters: Optional[SearchFilter] = None) -> Dict:
         """
         Main RAG pipeline: search + synthesize
         
         Args:
             query: User's question
             n_results: Number of chunks to retrieve
+            filters: Guest/date/keyword restrictions on the sources
             
         Returns:
-            Dict with answer and full context
+            Dict with answer and full context; 'cache_hit' is 'exact' or
+            'semantic' when the answer came from the answer cache; 'trace'
+            is the per-stage timing breakdown (see instrumentation.py)
         """
-        # Search
-        search_results = self.search(query, n_results)
-        
-        # Synthesize
-        answer_data = self.synthesize_answer(query, search_results['chunks'])
+        with TRACER.trace("ask", query=query) as trace:
+            cached, query_embedding = self._cached_answer(query, n_results, filters)
+            if cached is not None:
+                return dict(cached, trace=trace.summary())
+            
+            # Search
+            search_results = self.search(query, n_results, query_embedding, filters)
+            
+            # Synthesize
+            answer_data = self.synthesize_answer(query, search_results['chunks'])
+            
+            result = {
+                'query': query,
+                'answer': answer_data['answer'],
+                'citations': answer_data['citations'],
+                'n_sources': answer_data['n_sources'],
+                'raw_chunks': search_results['chunks']
+            }
+            self.answer_cache.put(query, answer_scope(n_results, filters), query_embedding, result)
+            return dict(result, cache_hit=None, trace=trace.summary())
+    
+    def ask_stream(self, query: str, n_results: int = 10,
+                   filters: Optional[SearchFilter] = None) -> Iterator[Dict]:
+        """
+        Streaming RAG pipeline: sources first, then the answer as it is written
         
-        return {
-            'query': query,
-            'answer': answer_data['answer'],
-            'citations': answer_data['citations'],
-            'n_sources': answer_data['n_sources'],
-            'raw_chunks': search_results['chunks']
-        }
+        Args:
+            query: User's question
+            n_results: Number of chunks to retrieve
+            filters: Guest/date/keyword restrictions on the sources
+            
+        Yields:
+            {'type': 'sources', 'citations', 'n_sources', 'raw_chunks', 'cache_hit'}
+            once retrieval is done, then {'type': 'token', 'text'} per answer
+            delta, then {'type': 'done', 'result'} with the same result ask()
+            would have returned
+        """
+        with TRACER.trace("ask_stream", query=query) as trace:
+            cached, query_embedding = self._cached_answer(query, n_results, filters)
+            if cached is not None:
+                yield {
+                    'type': 'sources',
+                    'citations': cached['citations'],
+                    'n_sources': cached['n_sources'],
+                    'raw_chunks': cached['raw_chunks'],
+                    'cache_hit': cached['cache_hit']
+                }
+                yield {'type': 'token', 'text': cached['answer']}
+                yield {'type': 'done', 'result': dict(cached, trace=trace.summary())}
+                return
+            
+            chunks = self.search(query, n_results, query_embedding, filters)['chunks']
+            citations = self.extract_citations(chunks)
+            yield {
+                'type': 'sources',
+                'citations': citations,
+                'n_sources': len(chunks),
+                'raw_chunks': chunks,
+                'cache_hit': None
+            }
+            
+            parts = []
+            for text in self.synthesize_answer_stream(query, chunks):
+                parts.append(text)
+                yield {'type': 'token', 'text': text}
+            
+            result = {
+                'query': query,
+                'answer': "".join(parts),
+                'citations': citations,
+                'n_sources': len(chunks),
+                'raw_chunks': chunks
+            }
+            self.answer_cache.put(query, answer_scope(n_results, filters), query_embedding, result)
+            yield {'type': 'done', 'result': dict(result, cache_hit=None, trace=trace.summary())}
     
     def export_to_markdown(self, result: Dict) -> str:
         """Export query result to markdown format"""
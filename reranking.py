@@ -0,0 +1,155 @@
+"""
+Reranking
+
+Rescores an over-fetched candidate set on CPU, so the chunks the prompt
+and citations take first are the most relevant ones, not just the best
+fused ranks. Each candidate's score blends:
+1. Embedding similarity to the question, from the retrieval distance
+   (min-max scaled over the candidates; keyword-only hits score 0 here)
+2. Term coverage: share of the question's IDF-weighted terms the chunk
+   contains, so chunks that answer every part of it beat chunks repeating
+   one word
+3. Proximity: share of the question's adjacent term pairs that are also
+   adjacent in the chunk ("product market fit", "word of mouth")
+4. Episode match: term coverage of the guest name and episode title
+5. The retrieval rank itself, which carries the fused vector and BM25
+   evidence the other features only adjust
+
+The weights are conservative, untuned defaults: embedding similarity and
+the retrieval rank carry most of the score and the lexical features only
+break near-ties. Tune them against real embeddings with
+benchmarks/bench_suite.py --no-fake --rerank; the offline suite's hashed
+bag-of-words stand-in vectors make semantic similarity look weaker than it
+is.
+
+Candidates are scored in batches, best retrieval rank first, within a
+latency budget. If the budget runs out, the scored prefix is reordered and
+the rest keeps its original order, so a slow request degrades to plain
+retrieval instead of waiting.
+"""
+
+import os
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from bm25_index import tokenize
+
+RERANK_CANDIDATES = int(os.getenv("LENNY_RERANK_CANDIDATES", "50"))
+RERANK_BUDGET_MS = float(os.getenv("LENNY_RERANK_BUDGET_MS", "30"))
+RERANK_BATCH_SIZE = int(os.getenv("LENNY_RERANK_BATCH", "16"))
+
+# Feature weights (untuned); they sum to 1, so scores stay within [0, 1]
+SEMANTIC_WEIGHT = 0.4
+COVERAGE_WEIGHT = 0.15
+PROXIMITY_WEIGHT = 0.05
+EPISODE_WEIGHT = 0.05
+PRIOR_WEIGHT = 0.35
+
+
+def rerank_candidates(n_results: int) -> int:
+    """Candidates to retrieve for n_results reranked results"""
+    return max(n_results, RERANK_CANDIDATES)
+
+
+class Reranker:
+    """Lexical-plus-embedding rescoring of retrieved chunks under a time budget"""
+
+    def __init__(self, bm25=None, budget_ms: float = RERANK_BUDGET_MS,
+                 batch_size: int = RERANK_BATCH_SIZE):
+        """
+        Args:
+            bm25: BM25Index whose document frequencies weight query terms
+                (default: every term weighs the same)
+            budget_ms: Time allowed for scoring; 0 disables the limit
+            batch_size: Candidates scored between budget checks
+        """
+        self.bm25 = bm25
+        self.budget_ms = budget_ms
+        self.batch_size = max(1, batch_size)
+
+    def term_weights(self, terms: List[str]) -> Dict[str, float]:
+        """IDF of each query term in the BM25 index (1.0 without one)"""
+        weights = {}
+        for term in terms:
+            if self.bm25 is None:
+                weights[term] = 1.0
+                continue
+            index = self.bm25.terms.get(term)
+            df = 0 if index is None else int(self.bm25.term_offsets[index + 1] - self.bm25.term_offsets[index])
+            weights[term] = self.bm25.idf(df)
+        return weights
+
+    @staticmethod
+    def similarities(chunks: List[Dict]) -> List[float]:
+        """
+        Retrieval distances as similarities in [0, 1] over the candidates
+
+        Min-max scaling makes Chroma's squared L2 and the local index's
+        cosine distance comparable (both are affine in cosine for unit
+        vectors).
+        """
+        distances = [chunk.get('distance') for chunk in chunks]
+        known = [d for d in distances if d is not None]
+        if not known:
+            return [0.0] * len(chunks)
+        low, high = min(known), max(known)
+        spread = (high - low) or 1.0
+        return [0.0 if d is None else (high - d) / spread if high > low else 1.0 for d in distances]
+
+    def score(self, query_terms: List[str], weights: Dict[str, float], pairs: FrozenSet[Tuple[str, str]],
+              chunk: Dict, similarity: float, prior: float) -> float:
+        """Relevance of one candidate in [0, 1]"""
+        tokens = tokenize(chunk['text'])
+        present = set(tokens)
+        total_weight = sum(weights.values()) or 1.0
+        coverage = sum(weights[t] for t in query_terms if t in present) / total_weight
+
+        proximity = 0.0
+        if pairs:
+            adjacent = set(zip(tokens, tokens[1:]))
+            proximity = len(pairs & adjacent) / len(pairs)
+
+        meta = chunk.get('metadata') or {}
+        episode_terms = set(tokenize(f"{meta.get('guest', '')} {meta.get('title', '')}"))
+        episode = sum(weights[t] for t in query_terms if t in episode_terms) / total_weight
+
+        return (SEMANTIC_WEIGHT * similarity + COVERAGE_WEIGHT * coverage + PROXIMITY_WEIGHT * proximity
+                + EPISODE_WEIGHT * episode + PRIOR_WEIGHT * prior)
+
+    def rerank(self, query: str, chunks: List[Dict], n_results: Optional[int] = None) -> Tuple[List[Dict], Dict]:
+        """
+        Reorder retrieved chunks (given best first) by relevance
+
+        Args:
+            query: User's question
+            chunks: Candidates in retrieval order
+            n_results: Chunks to return (default: all)
+
+        Returns:
+            (the top n_results chunks, each with a 'rerank_score' if it was
+            scored in time; stats with 'candidates', 'scored' and
+            'timed_out')
+        """
+        start = time.perf_counter()
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        weights = self.term_weights(query_terms)
+        pairs = frozenset(zip(query_terms, query_terms[1:]))
+        similarities = self.similarities(chunks)
+        n = len(chunks)
+
+        scored = []
+        timed_out = False
+        for batch_start in range(0, n, self.batch_size):
+            if self.budget_ms and batch_start and (time.perf_counter() - start) * 1000 > self.budget_ms:
+                timed_out = True
+                break
+            for i in range(batch_start, min(batch_start + self.batch_size, n)):
+                scored.append((self.score(query_terms, weights, pairs, chunks[i], similarities[i],
+                                          1.0 - i / n), i))
+
+        # Scored candidates are a prefix of the retrieval order, so the
+        # unscored rest can follow unchanged
+        ranked = [dict(chunks[i], rerank_score=s) for s, i in sorted(scored, key=lambda pair: -pair[0])]
+        ranked += chunks[len(scored):]
+        stats = {'candidates': n, 'scored': len(scored), 'timed_out': timed_out}
+        return ranked[:n_results] if n_results is not None else ranked, stats
@@ -0,0 +1,419 @@
+"""
+Index Snapshots
+
+Immutable, versioned copies of everything retrieval reads, so serving never
+touches the ChromaDB directory that ingestion writes to:
+
+    data/snapshots/
+        CURRENT                    # name of the published snapshot
+        20261017-014500-3f9c2a1b/  # one directory per build, files read-only
+            snapshot.json          # version, embedding model, chunker config,
+                                   # counts and a checksum of every file
+            vector_index/          # vectors, chunks, metadata columns (vector_index.py)
+            bm25_index/            # lexical index (bm25_index.py)
+            episode_index/         # episode vectors (episode_index.py)
+
+A build exports the collection into a temporary directory and renames it
+into place, so a snapshot is either complete or absent. Publishing rewrites
+CURRENT with a rename, so readers see the old name or the new one, never a
+partial write.
+
+LennyRAG(snapshot="current") serves the published snapshot without opening
+ChromaDB. When CURRENT changes, it loads the new snapshot in the background
+and swaps it in between requests (see LennyRAG.swap_snapshot). Deploying an
+index is then a copy of a snapshot directory and a publish, not a rebuild.
+
+Usage:
+    python snapshots.py build --publish [--quantize int8] [--hnsw]
+    python snapshots.py publish 20261017-014500-3f9c2a1b
+    python snapshots.py list
+    python snapshots.py verify [VERSION]
+    python snapshots.py prune --keep 3
+"""
+
+import os
+import json
+import stat
+import time
+import shutil
+import hashlib
+import tempfile
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from vector_index import VectorIndex
+
+SNAPSHOTS_PATH = os.getenv("LENNY_SNAPSHOTS_PATH", "./data/snapshots")
+SNAPSHOT_FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+PREVIOUS_FILE = "PREVIOUS"     # Published before CURRENT; prune keeps it for rollbacks
+LEASES_DIR = ".leases"         # One file per process serving a snapshot
+MANIFEST_FILE = "snapshot.json"
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_checksums(directory: Path) -> Dict[str, Dict]:
+    """{relative path: {'bytes', 'sha256'}} for every file below directory, except the manifest"""
+    return {
+        path.relative_to(directory).as_posix(): {'bytes': path.stat().st_size, 'sha256': file_sha256(path)}
+        for path in sorted(directory.rglob("*"))
+        if path.is_file() and path.name != MANIFEST_FILE
+    }
+
+
+def snapshot_path(version: str, root: str = SNAPSHOTS_PATH) -> Path:
+    if not version or "/" in version or version.startswith("."):
+        raise ValueError(f"Invalid snapshot version {version!r}")
+    return Path(root) / version
+
+
+def current_version(root: str = SNAPSHOTS_PATH) -> Optional[str]:
+    """The published snapshot, or None if none was published"""
+    return _read_pointer(Path(root) / CURRENT_FILE)
+
+
+def previous_version(root: str = SNAPSHOTS_PATH) -> Optional[str]:
+    """The snapshot published before the current one, if any"""
+    return _read_pointer(Path(root) / PREVIOUS_FILE)
+
+
+def _read_pointer(path: Path) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_pointer(path: Path, version: str):
+    """Replace a pointer file atomically"""
+    tmp = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def acquire_lease(version: str, root: str = SNAPSHOTS_PATH) -> Path:
+    """
+    Mark a snapshot as being served by this process, so prune leaves it
+    alone; returns the lease file to pass to release_lease
+    """
+    leases = Path(root) / LEASES_DIR
+    leases.mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=f"{version}@{os.getpid()}-", dir=leases)
+    os.close(fd)
+    return Path(path)
+
+
+def release_lease(lease: Path):
+    try:
+        lease.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def leased_versions(root: str = SNAPSHOTS_PATH) -> Set[str]:
+    """Snapshots some live process is serving (leases of exited processes are removed)"""
+    versions = set()
+    leases = Path(root) / LEASES_DIR
+    if not leases.exists():
+        return versions
+    for lease in leases.iterdir():
+        try:
+            version, owner = lease.name.split("@", 1)
+            pid = int(owner.split("-", 1)[0])
+        except ValueError:
+            continue
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            release_lease(lease)  # Stale lease from a process that exited
+            continue
+        except PermissionError:
+            pass
+        versions.add(version)
+    return versions
+
+
+def load_manifest(version: str, root: str = SNAPSHOTS_PATH) -> Dict:
+    """A snapshot's snapshot.json; raises FileNotFoundError if it doesn't exist"""
+    with open(snapshot_path(version, root) / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format in {snapshot_path(version, root)}")
+    return manifest
+
+
+def list_snapshots(root: str = SNAPSHOTS_PATH) -> List[Dict]:
+    """Manifests of the complete snapshots under root, oldest first"""
+    manifests = []
+    for path in sorted(Path(root).glob("*")):
+        if path.is_dir() and not path.name.startswith(".") and (path / MANIFEST_FILE).exists():
+            manifests.append(load_manifest(path.name, root))
+    return sorted(manifests, key=lambda m: m['created'])
+
+
+def publish(version: str, root: str = SNAPSHOTS_PATH):
+    """Point CURRENT at a snapshot (atomically); servers following it swap within seconds"""
+    load_manifest(version, root)  # Refuse to publish something that isn't there
+    current = current_version(root)
+    if current is not None and current != version:
+        _write_pointer(Path(root) / PREVIOUS_FILE, current)
+    _write_pointer(Path(root) / CURRENT_FILE, version)
+    print(f"📌 Published snapshot {version}")
+
+
+def verify(version: str, root: str = SNAPSHOTS_PATH) -> List[str]:
+    """
+    Check a snapshot's files against its manifest
+
+    Returns:
+        Problems found (missing, changed or unexpected files); empty if intact
+    """
+    manifest = load_manifest(version, root)
+    expected, actual = manifest['files'], file_checksums(snapshot_path(version, root))
+    problems = [f"missing {name}" for name in sorted(expected.keys() - actual.keys())]
+    problems += [f"unexpected {name}" for name in sorted(actual.keys() - expected.keys())]
+    problems += [f"changed {name}" for name in sorted(expected.keys() & actual.keys())
+                 if expected[name] != actual[name]]
+    return problems
+
+
+def prune(keep: int, root: str = SNAPSHOTS_PATH) -> List[str]:
+    """
+    Delete all but the newest keep snapshots; returns the deleted versions
+
+    The current and previously published snapshots are never deleted, and
+    neither is any snapshot a running server holds a lease on (one pinned
+    to an older version, or not yet swapped to the current one).
+    """
+    protected = {current_version(root), previous_version(root)} | leased_versions(root)
+    manifests = list_snapshots(root)
+    deleted = []
+    for manifest in manifests[:max(0, len(manifests) - keep)]:
+        if manifest['version'] in protected:
+            continue
+        path = snapshot_path(manifest['version'], root)
+        shutil.rmtree(path, onerror=lambda func, p, exc: (os.chmod(p, stat.S_IWUSR | stat.S_IRUSR), func(p)))
+        deleted.append(manifest['version'])
+    return deleted
+
+
+def build_snapshot(collection, embedding_function=None, transcripts_path: str = "./transcripts",
+                   root: str = SNAPSHOTS_PATH, chunker_config: Optional[Dict] = None,
+                   bm25: bool = True, episodes: bool = True, **export_options) -> Dict:
+    """
+    Export a collection into a new immutable snapshot
+
+    Args:
+        collection: ChromaDB collection to snapshot
+        embedding_function: Embeds episode titles for the episode index
+            (None: chunk centroids only)
+        transcripts_path: Transcripts, for the episode titles and descriptions
+        root: Snapshots directory
+        chunker_config: Chunking settings that produced the collection,
+            recorded in the manifest
+        bm25: Include the BM25 index
+        episodes: Include the episode index
+        export_options: Passed to export_index (ivf_lists, hnsw, quantize,
+            binary, pq_subvectors)
+
+    Returns:
+        The snapshot's manifest
+    """
+    from embedding_backends import collection_backend, backend_record
+    from vector_index import export_index
+    from bm25_index import export_bm25_index
+    from episode_index import export_episode_index
+
+    start = time.time()
+    backend = collection_backend(collection) or "openai"
+    embedding = backend_record(backend)
+    Path(root).mkdir(parents=True, exist_ok=True)
+    tmp = Path(root) / f".build-{os.getpid()}"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir()
+    try:
+        index_info = export_index(collection, str(tmp / "vector_index"),
+                                  model_name=embedding['embedding_model'], **export_options)
+        bm25_info = export_bm25_index(collection, str(tmp / "bm25_index")) if bm25 else None
+        episode_info = None
+        if episodes and index_info['count']:
+            index = VectorIndex(str(tmp / "vector_index"))
+            episode_info = export_episode_index(index, embedding_function, transcripts_path,
+                                                path=str(tmp / "episode_index"))
+            index.close()
+
+        # Exports publish through a symlink (see replace_directory); a
+        # snapshot never changes, so it holds the builds themselves
+        for name in ("vector_index", "bm25_index", "episode_index"):
+            link = tmp / name
+            if link.is_symlink():
+                build = link.resolve()
+                link.unlink()
+                os.replace(build, link)
+
+        files = file_checksums(tmp)
+        content = hashlib.sha256(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{content[:8]}"
+        manifest = {
+            'format': SNAPSHOT_FORMAT_VERSION,
+            'version': version,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'collection': collection.name,
+            'embedding_backend': embedding['embedding_backend'],
+            'embedding_model': embedding['embedding_model'],
+            'embedding_dim': index_info['dim'] or embedding['embedding_dim'],
+            'chunker': chunker_config,
+            'indexes': {
+                'vector_index': {key: index_info[key] for key in ('count', 'ivf', 'hnsw', 'quantized')},
+                'bm25_index': {'count': bm25_info['count']} if bm25_info else None,
+                'episode_index': {'count': episode_info['count']} if episode_info else None
+            },
+            'files': files
+        }
+        with open(tmp / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Read-only from here on; a snapshot is never modified in place
+        for path in tmp.rglob("*"):
+            if path.is_file():
+                path.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(tmp, snapshot_path(version, root))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    size = sum(entry['bytes'] for entry in files.values())
+    print(f"📦 Built snapshot {version}: {index_info['count']} chunks, {size / 2**20:.1f} MB "
+          f"in {time.time() - start:.1f}s")
+    return manifest
+
+
+class SnapshotCollection:
+    """
+    The parts of a ChromaDB collection LennyRAG reads (count, get by ID),
+    served from a snapshot's vector index
+    """
+
+    def __init__(self, index: VectorIndex, manifest: Dict):
+        self.index = index
+        self.name = manifest['collection']
+        self.metadata = {key: manifest[key] for key in ('embedding_backend', 'embedding_model', 'embedding_dim')}
+        self._rows: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+
+    def count(self) -> int:
+        return self.index.count
+
+    def rows_by_id(self) -> Dict[str, int]:
+        """Chunk ID -> row, read from the chunk table once"""
+        with self._lock:
+            if self._rows is None:
+                self._rows = {self.index.chunks.row(i)['id']: i for i in range(self.index.count)}
+            return self._rows
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: int = 0) -> Dict:
+        """Chunks by ID (unknown IDs are skipped, as Chroma does), or all of them"""
+        include = include or ['documents', 'metadatas']
+        if ids is None:
+            rows = range(offset, self.index.count if limit is None else min(self.index.count, offset + limit))
+        else:
+            rows_by_id = self.rows_by_id()
+            rows = [rows_by_id[chunk_id] for chunk_id in ids if chunk_id in rows_by_id]
+        chunks = self.index.chunks.rows(rows)
+        result = {'ids': [chunk['id'] for chunk in chunks]}
+        if 'documents' in include:
+            result['documents'] = [chunk['document'] for chunk in chunks]
+        if 'metadatas' in include:
+            result['metadatas'] = [chunk['metadata'] for chunk in chunks]
+        if 'embeddings' in include:
+            result['embeddings'] = self.index.vectors[list(rows)]
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versioned index snapshots")
+    parser.add_argument("--root", default=SNAPSHOTS_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Snapshot the ChromaDB collection")
+    build.add_argument("--collection", default="lenny_transcripts")
+    build.add_argument("--publish", action="store_true", help="Publish the new snapshot")
+    build.add_argument("--no-bm25", action="store_true", help="Leave out the BM25 index")
+    build.add_argument("--no-episodes", action="store_true", help="Leave out the episode index")
+    build.add_argument("--ivf-lists", type=int, default=None,
+                       help="IVF lists to build (default ~sqrt of chunk count, 0 to skip)")
+    build.add_argument("--hnsw", action="store_true", help="Build an HNSW graph (needs hnswlib)")
+    build.add_argument("--quantize", choices=("int8", "pq"), default=None,
+                       help="Store int8 or product-quantized codes for quantized search")
+    build.add_argument("--binary", action="store_true", help="Store sign bits for Hamming prefiltering")
+    publish_parser = subparsers.add_parser("publish", help="Point CURRENT at a snapshot")
+    publish_parser.add_argument("version")
+    subparsers.add_parser("list", help="List snapshots")
+    verify_parser = subparsers.add_parser("verify", help="Check a snapshot's files against its manifest")
+    verify_parser.add_argument("version", nargs="?", default=None, help="Default: the published one")
+    prune_parser = subparsers.add_parser("prune", help="Delete old snapshots")
+    prune_parser.add_argument("--keep", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        import chromadb
+        from dotenv import load_dotenv
+        from embedding_backends import collection_backend, create_embedding_function
+        from ingest_state import MANIFEST_PATH
+
+        load_dotenv()
+        collection = chromadb.PersistentClient(path="./data/vector_db").get_collection(args.collection)
+        chunker_config = None
+        if os.path.exists(MANIFEST_PATH):
+            with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+                chunker_config = json.load(f).get('config')
+        embedding_function = None
+        if not args.no_episodes:
+            embedding_function = create_embedding_function(collection_backend(collection))
+        manifest = build_snapshot(collection, embedding_function, root=args.root,
+                                  chunker_config=chunker_config, bm25=not args.no_bm25,
+                                  episodes=not args.no_episodes, ivf_lists=args.ivf_lists,
+                                  hnsw=args.hnsw, quantize=args.quantize, binary=args.binary)
+        if args.publish:
+            publish(manifest['version'], args.root)
+    elif args.command == "publish":
+        publish(args.version, args.root)
+    elif args.command == "list":
+        current = current_version(args.root)
+        for manifest in list_snapshots(args.root):
+            size = sum(entry['bytes'] for entry in manifest['files'].values())
+            print(f"{'*' if manifest['version'] == current else ' '} {manifest['version']}  "
+                  f"{manifest['created']}  {manifest['indexes']['vector_index']['count']:>7} chunks  "
+                  f"{size / 2**20:8.1f} MB  {manifest['embedding_model']}")
+    elif args.command == "verify":
+        version = args.version or current_version(args.root)
+        if version is None:
+            raise SystemExit("❌ No snapshot published")
+        problems = verify(version, args.root)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            raise SystemExit(1)
+        print(f"✅ Snapshot {version} is intact")
+    elif args.command == "prune":
+        for version in prune(args.keep, args.root):
+            print(f"🗑️  Deleted snapshot {version}")
+
+
+if __name__ == "__main__":
+    main()
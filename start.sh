@@ -2,8 +2,21 @@
 
 echo "🚀 Starting Ask Lenny..."
 
+if [ -n "$LENNY_SNAPSHOT" ]; then
+    # Prebuilt snapshot: nothing to ingest here (see snapshots.py)
+    echo "📦 Serving index snapshot: $LENNY_SNAPSHOT"
+elif [ "$LENNY_FAST_START" = "1" ]; then
+    # Listen right away; the app shows a warming-up page, loads the index in
+    # the background and waits for a first-boot build (see engine_loader.py)
+    echo "⚡ Fast start: syncing transcripts in the background (log: data/ingest.log)"
+    mkdir -p data
+    python ingest_transcripts.py > data/ingest.log 2>&1 &
+    # Same lock ingestion writes once its imports are done, so the app
+    # can't miss it in between
+    [ -f data/ingest_manifest.json ] && kind=sync || kind=build
+    echo "$! $kind" > data/ingest.lock
 # Check if vector database exists
-if [ ! -f "data/vector_db/chroma.sqlite3" ]; then
+elif [ ! -f "data/vector_db/chroma.sqlite3" ]; then
     echo "📥 Vector database not found. Running ingestion..."
     echo "⏳ This will take 10-15 minutes on first deployment..."
     python ingest_transcripts.py
@@ -15,7 +28,9 @@ if [ ! -f "data/vector_db/chroma.sqlite3" ]; then
         exit 1
     fi
 else
-    echo "✅ Vector database found. Skipping ingestion."
+    # Incremental update: only new or changed transcripts are embedded
+    echo "✅ Vector database found. Syncing new or changed transcripts..."
+    python ingest_transcripts.py || echo "⚠️  Incremental ingestion failed, serving existing index."
 fi
 
 echo "🎙️ Starting Streamlit app..."
@@ -0,0 +1,82 @@
+"""
+Regression test: frontmatter-only edits reach the stored chunk metadata
+
+Chunk IDs come from the chunk text, so editing an episode's frontmatter
+keeps every ID. The ingester must still update the stored metadata
+(without re-embedding) and re-export the local indexes.
+
+Runs offline against the fake OpenAI server in a temporary workspace.
+"""
+
+import sys
+import shutil
+import argparse
+from pathlib import Path
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from chunker import DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS
+
+EPISODE = "ada-chen-rekhi"
+
+
+def ingest_args() -> argparse.Namespace:
+    return argparse.Namespace(full=False, workers=1, chunk_tokens=DEFAULT_CHUNK_TOKENS,
+                              overlap_tokens=DEFAULT_OVERLAP_TOKENS, snapshot=False)
+
+
+def edit_frontmatter(transcript: Path, **changes):
+    """Rewrite the frontmatter (None removes a field), leaving the body as is"""
+    _, frontmatter, body = transcript.read_text(encoding='utf-8').split('---', 2)
+    metadata = yaml.safe_load(frontmatter)
+    for key, value in changes.items():
+        if value is None:
+            metadata.pop(key, None)
+        else:
+            metadata[key] = value
+    transcript.write_text("---\n" + yaml.safe_dump(metadata, allow_unicode=True) + "---" + body,
+                          encoding='utf-8')
+
+
+def test_frontmatter_edit_updates_metadata_without_reembedding(tmp_path, monkeypatch):
+    transcript = tmp_path / "transcripts" / "episodes" / EPISODE / "transcript.md"
+    transcript.parent.mkdir(parents=True)
+    shutil.copy(REPO_ROOT / "transcripts" / "episodes" / EPISODE / "transcript.md", transcript)
+    monkeypatch.chdir(tmp_path)
+
+    with FakeOpenAIServer() as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "fake")
+        from ingest_transcripts import TranscriptIngester, run_ingestion
+        from vector_index import VectorIndex, INDEX_PATH
+
+        run_ingestion(ingest_args(), "./transcripts", "openai")
+        embedded_inputs = server.n_inputs
+
+        edit_frontmatter(transcript, title="A new title", keywords=None)
+
+        ingester = TranscriptIngester("./transcripts", parse_workers=1, embedding_backend="openai")
+        summary = ingester.ingest_all_transcripts()
+        assert summary['added'] == 0
+        assert summary['updated'] > 0
+        assert summary['removed'] == 0
+        assert server.n_inputs == embedded_inputs
+
+        stored = ingester.collection.get(include=['metadatas'])['metadatas']
+        assert len(stored) == summary['updated']
+        assert all(meta['title'] == "A new title" for meta in stored)
+        assert all('keywords' not in meta for meta in stored)
+
+        # A second pass finds nothing to do
+        assert TranscriptIngester("./transcripts", parse_workers=1,
+                                  embedding_backend="openai").ingest_all_transcripts()['updated'] == 0
+
+        # The local indexes are re-exported with the new metadata
+        edit_frontmatter(transcript, title="Another title")
+        run_ingestion(ingest_args(), "./transcripts", "openai")
+        index = VectorIndex(INDEX_PATH)
+        assert all(index.chunks.row(i)['metadata']['title'] == "Another title" for i in range(index.count))
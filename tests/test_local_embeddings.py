@@ -0,0 +1,56 @@
+"""
+LocalEmbeddingFunction against the pinned ChromaDB release
+
+LocalEmbeddingFunction overrides private members of Chroma's
+ONNXMiniLM_L6_V2 (model, tokenizer, _forward), so a ChromaDB upgrade can
+break it silently. This checks that it still yields 384-dim unit vectors
+matching Chroma's own implementation.
+
+Downloads the model files on first run; skipped when they can't be fetched.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+from embedding_backends import EMBEDDING_BACKENDS, LocalEmbeddingFunction
+
+TEXTS = [
+    "How do you know when it's time to leave your job?",
+    "Pricing",
+    "Lenny (00:01:02): Product-market fit is when the market pulls the product out of you. " * 20,
+]
+
+
+@pytest.fixture(scope="module")
+def local_function():
+    function = LocalEmbeddingFunction(max_workers=2, batch_size=2)
+    try:
+        function._download_model_if_not_exists()
+    except Exception as e:
+        pytest.skip(f"Model files unavailable: {e}")
+    return function
+
+
+def test_dimension_and_normalization(local_function):
+    embeddings = np.array(local_function(TEXTS))
+    assert embeddings.shape == (len(TEXTS), EMBEDDING_BACKENDS['local']['dim'])
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-5)
+
+
+def test_matches_chroma(local_function):
+    chroma = ONNXMiniLM_L6_V2()
+    chroma.DOWNLOAD_PATH = local_function.DOWNLOAD_PATH
+    expected = np.array(chroma(TEXTS))
+    assert np.allclose(np.array(local_function(TEXTS)), expected, atol=1e-4)
+
+
+def test_empty_batch(local_function):
+    assert local_function._forward([]).shape == (0, EMBEDDING_BACKENDS['local']['dim'])
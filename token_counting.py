@@ -0,0 +1,65 @@
+"""
+Token Counting
+
+Thin wrapper around tiktoken shared by the embedding pipeline and the chunker.
+text-embedding-3-small and the GPT-4 family both use the cl100k_base encoding.
+"""
+
+import threading
+from typing import List, Optional
+
+import tiktoken
+
+ENCODING_NAME = "cl100k_base"
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_encoding_failed = False
+
+
+def get_encoding() -> Optional["tiktoken.Encoding"]:
+    """
+    Load the tiktoken encoding once per process
+
+    tiktoken downloads the BPE file on first use; on a machine without network
+    access (and without a warm TIKTOKEN_CACHE_DIR) this returns None and
+    callers fall back to an estimate.
+    """
+    global _encoding, _encoding_failed
+    if _encoding is not None or _encoding_failed:
+        return _encoding
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                _encoding = tiktoken.get_encoding(ENCODING_NAME)
+            except Exception as e:
+                _encoding_failed = True
+                print(f"⚠️  tiktoken encoding unavailable ({e.__class__.__name__}), "
+                      f"estimating token counts")
+    return _encoding
+
+
+def tokenizer_name() -> str:
+    """Tokenizer behind count_tokens: the encoding name, or "estimate" without tiktoken"""
+    return ENCODING_NAME if get_encoding() is not None else "estimate"
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token estimate (~3 characters per token for English)"""
+    return len(text) // 3 + 1
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text"""
+    encoding = get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    """Token counts for many texts (tiktoken encodes batches on a thread pool)"""
+    encoding = get_encoding()
+    if encoding is None:
+        return [estimate_tokens(text) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_batch(texts, disallowed_special=())]
@@ -0,0 +1,184 @@
+"""
+Transcript Parsing and Chunking
+
+Pure functions for turning a transcript markdown file into chunk records.
+Kept free of ChromaDB/OpenAI imports so process-pool workers start fast and
+only ship compact records back to the parent process.
+"""
+
+import re
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from chunker import TranscriptChunker, DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS
+from metadata_filters import publish_day, normalize_keyword
+
+# libyaml's C loader is several times faster than the pure-Python one
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+SPEAKER_RE = re.compile(r'^([A-Z][a-zA-Z\s]+)\s*\(\d+:\d+:\d+\):', re.MULTILINE)
+
+# Per-chunk fields produced by the chunker and stored as chunk metadata
+CHUNK_FIELDS = ('speaker', 'speakers', 'start_time', 'end_time',
+                'start_seconds', 'end_seconds', 'n_tokens')
+
+
+def parse_transcript(filepath: Path, content: Optional[str] = None) -> Optional[Dict]:
+    """Parse a transcript markdown file into frontmatter and body"""
+    if content is None:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+    # Split frontmatter and content
+    parts = content.split('---', 2)
+    if len(parts) == 3:
+        frontmatter = yaml.load(parts[1], Loader=YamlLoader)
+        transcript_content = parts[2].strip()
+
+        return {
+            'metadata': frontmatter,
+            'content': transcript_content,
+            'filepath': str(filepath)
+        }
+    return None
+
+
+def chunk_transcript(transcript: Dict, chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                     overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> List[Dict]:
+    """
+    Chunk transcript into speaker-turn-aligned pieces of at most chunk_tokens
+    tokens, each starting with overlap_tokens of the previous chunk
+    (see chunker.TranscriptChunker)
+    """
+    chunker = TranscriptChunker(chunk_tokens, overlap_tokens)
+    chunks = chunker.chunk(transcript['content'])
+    for chunk in chunks:
+        chunk['metadata'] = transcript['metadata']
+        chunk['filepath'] = transcript['filepath']
+    return chunks
+
+
+def extract_speaker_context(text: str) -> str:
+    """Extract speaker names from text for better context"""
+    # Look for patterns like "Speaker Name (timestamp):"
+    speakers = SPEAKER_RE.findall(text)
+    return ", ".join(set(speakers[:3])) if speakers else ""
+
+
+def file_hash(filepath: Path) -> str:
+    """Content hash of a transcript file, used to skip unchanged episodes"""
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def chunk_hash(text: str) -> str:
+    """Content hash of a single chunk"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def record_hash(text_hash: str, metadata: Dict) -> str:
+    """
+    Hash of a chunk's text and metadata, so frontmatter edits and shifted
+    chunk indexes are detected even though the chunk ID stays the same
+    """
+    payload = json.dumps(metadata, sort_keys=True, default=str)
+    return hashlib.sha256((text_hash + payload).encode('utf-8')).hexdigest()
+
+
+def episode_metadata(frontmatter: Dict) -> Dict:
+    """
+    Episode-level metadata shared by all of an episode's chunks
+
+    Values are typed for metadata filtering (see metadata_filters.py):
+    publish_day is the date as a YYYYMMDD integer for range queries and
+    keywords a lowercased list. Fields missing from the frontmatter are
+    left out rather than stored empty, since ChromaDB rejects empty lists.
+    The long free-text description is not stored per chunk.
+    """
+    metadata = {
+        'guest': frontmatter.get('guest', 'Unknown'),
+        'title': frontmatter.get('title', 'Unknown'),
+        'youtube_url': frontmatter.get('youtube_url', ''),
+        'publish_date': str(frontmatter.get('publish_date', ''))
+    }
+    day = publish_day(frontmatter.get('publish_date'))
+    if day:
+        metadata['publish_day'] = day
+        metadata['publish_year'] = day // 10000
+    for field in ('video_id', 'channel', 'spotify_url'):
+        if frontmatter.get(field):
+            metadata[field] = str(frontmatter[field])
+    if frontmatter.get('duration_seconds') is not None:
+        metadata['duration_seconds'] = float(frontmatter['duration_seconds'])
+    if frontmatter.get('view_count') is not None:
+        metadata['view_count'] = int(frontmatter['view_count'])
+    keywords = list(dict.fromkeys(
+        normalize_keyword(k) for k in frontmatter.get('keywords') or [] if normalize_keyword(k)
+    ))
+    if keywords:
+        metadata['keywords'] = keywords
+    return metadata
+
+
+def compact_chunks(episode_folder: str, chunks: List[Dict]) -> List[Tuple[str, str, str, Dict]]:
+    """
+    Turn chunks into compact (id, text_hash, text, chunk fields) tuples
+
+    Chunk IDs are derived from the episode folder and the chunk's content
+    hash, so they stay the same across runs no matter which order the
+    files are globbed in or which other episodes were added.
+    """
+    compact = []
+    seen = {}
+    for chunk in chunks:
+        text_hash = chunk_hash(chunk['text'])
+
+        # Identical text can repeat within an episode (e.g. sponsor reads)
+        occurrence = seen.get(text_hash, 0)
+        seen[text_hash] = occurrence + 1
+        chunk_id = f"{episode_folder}_{text_hash[:16]}"
+        if occurrence:
+            chunk_id += f"_{occurrence}"
+
+        fields = {field: chunk[field] for field in CHUNK_FIELDS}
+        compact.append((chunk_id, text_hash, chunk['text'], fields))
+    return compact
+
+
+def expand_chunks(episode_folder: str, episode: Dict, compact: List[Tuple[str, str, str, Dict]]) -> List[Dict]:
+    """Expand compact chunk tuples into ChromaDB-ready records"""
+    records = []
+    for j, (chunk_id, text_hash, text, fields) in enumerate(compact):
+        metadata = dict(episode)
+        metadata['episode_folder'] = episode_folder
+        metadata['chunk_index'] = j
+        metadata.update(fields)
+        records.append({
+            'id': chunk_id,
+            'text': text,
+            'metadata': metadata,
+            'hash': record_hash(text_hash, metadata),
+            'n_tokens': fields['n_tokens']
+        })
+    return records
+
+
+def process_transcript_file(filepath: Path, chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                            overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> Optional[Tuple[str, Dict, List]]:
+    """
+    Parse and chunk one file (process-pool entry point)
+
+    Returns:
+        (episode_folder, episode metadata, compact chunks), or None if the
+        file has no frontmatter
+    """
+    transcript = parse_transcript(filepath)
+    if not transcript:
+        return None
+    episode_folder = Path(filepath).parent.name
+    chunks = chunk_transcript(transcript, chunk_tokens, overlap_tokens)
+    return episode_folder, episode_metadata(transcript['metadata']), compact_chunks(episode_folder, chunks)
@@ -0,0 +1,666 @@
+"""
+Local Vector Index
+
+Exports the ChromaDB collection into a compact on-disk format and serves
+retrieval in-process with NumPy, avoiding the Chroma client/SQLite overhead
+on every query:
+
+    data/vector_index/
+        index.json      # count, dimension, model, optional IVF/HNSW/quantization settings
+        vectors.f32     # (count, dim) float32, unit-normalized, memory-mapped
+        chunks.jsonl    # one {"id", "document", "metadata"} row per vector
+        offsets.npy     # byte offset of each row in chunks.jsonl
+        ivf_*.npy       # optional inverted-file (IVF) coarse index
+        hnsw.bin        # optional HNSW graph (needs the hnswlib package)
+        quantized_*.npy # optional int8 or product-quantized (PQ) codes
+        binary_codes.npy  # optional sign bits, one per dimension
+        filter_*        # guest/date/keyword columns (see metadata_filters.py)
+
+Quantized search ("quantized" method) keeps only the compact codes in RAM:
+a sign-bit Hamming prefilter and the int8/PQ codes pick a shortlist, and
+only those rows are read from vectors.f32 for exact re-ranking. The
+float matrix stays on disk, paged in a few rows at a time.
+
+Usage:
+    python vector_index.py export [--ivf-lists 150] [--hnsw] [--quantize int8|pq] [--binary]
+"""
+
+import os
+import json
+import mmap
+import time
+import shutil
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metadata_filters import MetadataColumns, MetadataColumnsWriter
+
+INDEX_PATH = "./data/vector_index"
+INDEX_FORMAT_VERSION = 1
+EXPORT_PAGE_SIZE = 1000
+
+# Quantized copies built on export, e.g. by ingestion (int8 / pq, sign bits)
+QUANTIZERS = ("int8", "pq")
+INDEX_QUANTIZE = os.getenv("LENNY_INDEX_QUANTIZE") or None
+INDEX_BINARY = os.getenv("LENNY_INDEX_BINARY", "0") == "1"
+PQ_SUBVECTORS = 96        # Bytes per vector for PQ; must divide the dimension
+PQ_CENTROIDS = 256
+
+# Quantized search knobs, as multiples of k: rows re-ranked with the float
+# vectors (0 = trust the compressed scores, never touch vectors.f32), and
+# rows kept by the sign-bit prefilter before code scoring (0 = no prefilter)
+QUANTIZED_RERANK = int(os.getenv("LENNY_QUANTIZED_RERANK", "4"))
+QUANTIZED_PREFILTER = int(os.getenv("LENNY_QUANTIZED_PREFILTER", "50"))
+SCORE_BLOCK = 16_384      # Code rows decoded at once while scoring
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so inner product equals cosine similarity"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores per row, best first (O(n) selection)"""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 10,
+                     sample_size: int = 50_000, seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity; returns unit centroids"""
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    sample = vectors[rng.choice(n, size=min(n, sample_size), replace=False)]
+    centroids = sample[rng.choice(sample.shape[0], size=n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+            else:
+                # Re-seed empty clusters with a random point
+                centroids[c] = sample[rng.integers(sample.shape[0])]
+        centroids = normalize_rows(centroids)
+    return centroids
+
+
+def kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 10,
+           sample_size: int = 20_000, seed: int = 0) -> np.ndarray:
+    """Euclidean k-means (for PQ codebooks); returns the centroids"""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(len(vectors), sample_size), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = nearest_centroids(sample, centroids)
+        counts = np.bincount(assign, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters with random points
+        centroids[~filled] = sample[rng.integers(len(sample), size=int((~filled).sum()))]
+    return centroids
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (Euclidean) for each row"""
+    return np.argmax(vectors @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1), axis=1)
+
+
+def pack_signs(vectors: np.ndarray) -> np.ndarray:
+    """One bit per dimension (set if positive), packed into uint64 words per row"""
+    bits = np.packbits(np.asarray(vectors) > 0, axis=1)
+    padding = -bits.shape[1] % 8
+    if padding:
+        bits = np.pad(bits, ((0, 0), (0, padding)))
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Differing sign bits between each row of codes and one query code"""
+    different = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(different).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[different.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+
+def replace_directory(tmp: Path, target: Path):
+    """
+    Publish a freshly built directory at target
+
+    The build is renamed to a versioned directory next to target
+    (vector_index@<time>), and target is a symlink repointed at it with one
+    rename, so a reader opening target finds the old build or the new one,
+    never nothing. Readers resolve the link once when they open an index.
+    The previous build is kept until the next export, so a reader that
+    resolved it just before the switch can still open it.
+
+    A plain directory left at target by older versions is moved aside
+    first; only that one-time upgrade has a moment without target.
+    """
+    build = target.with_name(f"{target.name}@{time.time_ns()}")
+    os.replace(tmp, build)
+    previous = os.readlink(target) if target.is_symlink() else None
+    link = target.with_name(f".{target.name}.link-{os.getpid()}")
+    if link.is_symlink():
+        link.unlink()
+    os.symlink(build.name, link)
+    legacy = target.with_name(target.name + ".old")
+    if target.exists() and not target.is_symlink():
+        if legacy.exists():
+            shutil.rmtree(legacy)
+        os.replace(target, legacy)
+    os.replace(link, target)
+
+    keep = {build.name, previous}
+    for old in target.parent.glob(f"{target.name}@*"):
+        if old.name not in keep:
+            shutil.rmtree(old, ignore_errors=True)
+    if legacy.exists():
+        shutil.rmtree(legacy)
+
+
+class ChunkTable:
+    """Row-addressable chunk documents and metadata backed by a memory-mapped JSONL file"""
+
+    def __init__(self, path: Path):
+        self.offsets = np.load(path / "offsets.npy")
+        self._file = open(path / "chunks.jsonl", 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def row(self, i: int) -> Dict:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return json.loads(self._mmap[start:end])
+
+    def rows(self, indices) -> List[Dict]:
+        return [self.row(int(i)) for i in indices]
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+class QuantizedVectors:
+    """
+    Compressed copy of an index's unit vectors: int8 or PQ codes, sign
+    bits, or both (sign bits then prefilter the rows that codes score)
+    """
+
+    def __init__(self, dim: int, codec: Optional[str] = None, codes: Optional[np.ndarray] = None,
+                 scale: Optional[np.ndarray] = None, codebooks: Optional[np.ndarray] = None,
+                 signs: Optional[np.ndarray] = None):
+        self.dim = dim
+        self.codec = codec
+        self.codes = codes
+        self.scale = scale
+        self.codebooks = codebooks
+        self.signs = signs
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, codec: Optional[str] = None,
+              pq_subvectors: int = PQ_SUBVECTORS, binary: bool = False) -> "QuantizedVectors":
+        """
+        Quantize unit vectors
+
+        Args:
+            vectors: (count, dim) float32 unit vectors (may be memory-mapped)
+            codec: 'int8', 'pq' or None (sign bits only)
+            pq_subvectors: PQ code bytes per vector; must divide dim
+            binary: Also keep one sign bit per dimension
+        """
+        count, dim = vectors.shape
+        blocks = range(0, count, SCORE_BLOCK)
+        codes = scale = codebooks = signs = None
+        if codec == "int8":
+            # Symmetric per-dimension scale, so scores stay a plain dot product
+            scale = np.max([np.abs(vectors[i:i + SCORE_BLOCK]).max(axis=0) for i in blocks], axis=0) / 127
+            scale[scale == 0] = 1.0
+            codes = np.concatenate([np.round(vectors[i:i + SCORE_BLOCK] / scale).astype(np.int8)
+                                    for i in blocks])
+            scale = scale.astype(np.float32)
+        elif codec == "pq":
+            if dim % pq_subvectors:
+                raise ValueError(f"PQ subvectors ({pq_subvectors}) must divide the dimension ({dim})")
+            width = dim // pq_subvectors
+            n_centroids = min(PQ_CENTROIDS, count)
+            codebooks = np.zeros((pq_subvectors, n_centroids, width), dtype=np.float32)
+            # Column-major, so scoring reads one contiguous column per subvector
+            codes = np.zeros((count, pq_subvectors), dtype=np.uint8, order='F')
+            for j in range(pq_subvectors):
+                sub = np.asarray(vectors[:, j * width:(j + 1) * width])
+                codebooks[j] = kmeans(sub, n_centroids, seed=j)
+                for i in blocks:
+                    codes[i:i + SCORE_BLOCK, j] = nearest_centroids(sub[i:i + SCORE_BLOCK], codebooks[j])
+        elif codec is not None:
+            raise ValueError(f"Unknown quantizer {codec!r}, expected one of {QUANTIZERS}")
+        if binary:
+            signs = np.concatenate([pack_signs(vectors[i:i + SCORE_BLOCK]) for i in blocks])
+        return cls(dim, codec, codes, scale, codebooks, signs)
+
+    @classmethod
+    def load(cls, path: Path, info: Optional[Dict]) -> Optional["QuantizedVectors"]:
+        """Codes saved next to an index, from its index.json 'quantized' entry"""
+        if not info:
+            return None
+
+        def optional(name):
+            return np.load(path / name) if (path / name).exists() else None
+
+        return cls(info['dim'], info.get('codec'), optional("quantized_codes.npy"),
+                   optional("quantized_scale.npy"), optional("quantized_codebooks.npy"),
+                   optional("binary_codes.npy"))
+
+    def save(self, path: Path) -> Dict:
+        """Write the codes into an index directory; returns the index.json entry"""
+        for name, array in (("quantized_codes.npy", self.codes), ("quantized_scale.npy", self.scale),
+                            ("quantized_codebooks.npy", self.codebooks), ("binary_codes.npy", self.signs)):
+            if array is not None:
+                np.save(path / name, array)
+        return {
+            'dim': self.dim,
+            'codec': self.codec,
+            'subvectors': self.codebooks.shape[0] if self.codebooks is not None else None,
+            'binary': self.signs is not None,
+            'bytes': self.nbytes
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the codes, scales and codebooks"""
+        return sum(a.nbytes for a in (self.codes, self.scale, self.codebooks, self.signs) if a is not None)
+
+    def score(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Approximate inner products of one query with every (or the given) row"""
+        if self.codes is not None:
+            codes = self.codes if rows is None else self.codes[rows]
+            if self.codec == "int8":
+                weights = query * self.scale
+
+                def score_block(block):
+                    return block @ weights
+            else:
+                # Asymmetric distance: one query-subvector x centroid table,
+                # then a lookup per code byte
+                width = self.dim // self.codebooks.shape[0]
+                table = np.einsum('mcw,mw->mc', self.codebooks, query.reshape(-1, width)).astype(np.float32)
+
+                def score_block(block):
+                    scores = np.zeros(len(block), dtype=np.float32)
+                    for j, centroid_scores in enumerate(table):
+                        scores += centroid_scores.take(block[:, j])
+                    return scores
+            return np.concatenate([score_block(codes[i:i + SCORE_BLOCK])
+                                   for i in range(0, max(len(codes), 1), SCORE_BLOCK)]).astype(np.float32)
+        signs = self.signs if rows is None else self.signs[rows]
+        distances = hamming_distances(signs, pack_signs(query[None])[0])
+        # The angle between two vectors is about pi * (differing sign bits / dim)
+        return np.cos(np.pi * distances / self.dim).astype(np.float32)
+
+    def shortlist(self, query: np.ndarray, n: int, n_prefilter: int = 0) -> np.ndarray:
+        """
+        Rows most likely to be nearest the query, best first
+
+        Args:
+            query: Unit query vector
+            n: Rows to return
+            n_prefilter: Rows kept by the sign-bit prefilter before the
+                codes score them (0 = score every row)
+        """
+        rows = None
+        if self.signs is not None and self.codes is not None and n_prefilter:
+            distances = hamming_distances(self.signs, pack_signs(query[None])[0])
+            rows = top_k(-distances, max(n_prefilter, n))
+        best = top_k(self.score(query, rows), n)
+        return best if rows is None else rows[best]
+
+
+class VectorIndex:
+    """Memory-mapped float32 matrix with exact, IVF or HNSW top-k search"""
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = Path(path)
+        # Exports repoint the path at each new build; read this one throughout
+        directory = self.path.resolve()
+        with open(directory / "index.json", 'r', encoding='utf-8') as f:
+            self.info = json.load(f)
+        if self.info.get('version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector index format in {self.path}")
+
+        self.count = self.info['count']
+        self.dim = self.info['dim']
+        self.vectors = np.memmap(directory / "vectors.f32", dtype=np.float32,
+                                 mode='r', shape=(self.count, self.dim))
+        self.chunks = ChunkTable(directory)
+        self.metadata = MetadataColumns.load(directory)
+
+        self.ivf_centroids = None
+        if self.info.get('ivf'):
+            self.ivf_centroids = np.load(directory / "ivf_centroids.npy")
+            self.ivf_rows = np.load(directory / "ivf_rows.npy")
+            self.ivf_offsets = np.load(directory / "ivf_offsets.npy")
+
+        self.quantized = QuantizedVectors.load(directory, self.info.get('quantized'))
+
+        self.hnsw = None
+        self._hnsw_lock = threading.Lock()
+        if self.info.get('hnsw'):
+            import hnswlib
+            self.hnsw = hnswlib.Index(space='ip', dim=self.dim)
+            self.hnsw.load_index(str(directory / "hnsw.bin"), max_elements=self.count)
+
+    def search_exact(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force inner product over every vector"""
+        scores = queries @ self.vectors.T
+        indices = top_k(scores, k)
+        return indices, np.take_along_axis(scores, indices, axis=1)
+
+    def search_rows(self, queries: np.ndarray, k: int, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force inner product over a pre-filtered subset of rows only"""
+        rows = np.asarray(rows, dtype=np.int64)
+        scores = queries @ self.vectors[rows].T
+        best = top_k(scores, k)
+        return rows[best], np.take_along_axis(scores, best, axis=1)
+
+    def search_ivf(self, queries: np.ndarray, k: int, nprobe: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+        """Scan only the nprobe inverted lists closest to each query"""
+        if self.ivf_centroids is None:
+            raise ValueError("Index was exported without IVF lists (use --ivf-lists)")
+        probe = top_k(queries @ self.ivf_centroids.T, nprobe)
+        all_indices, all_scores = [], []
+        for query, lists in zip(queries, probe):
+            rows = np.concatenate([
+                self.ivf_rows[self.ivf_offsets[c]:self.ivf_offsets[c + 1]] for c in lists
+            ])
+            scores = self.vectors[rows] @ query
+            best = top_k(scores, k)
+            indices = np.full(k, -1, dtype=np.int64)
+            values = np.full(k, -np.inf, dtype=np.float32)
+            indices[:len(best)] = rows[best]
+            values[:len(best)] = scores[best]
+            all_indices.append(indices)
+            all_scores.append(values)
+        return np.array(all_indices), np.array(all_scores)
+
+    def search_quantized(self, queries: np.ndarray, k: int, rerank: int = QUANTIZED_RERANK,
+                         prefilter: int = QUANTIZED_PREFILTER) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Shortlist with the compressed codes, then re-rank it exactly
+
+        Args:
+            rerank: Rows re-scored with the float vectors, as a multiple of
+                k (0 = return the approximate scores)
+            prefilter: Rows kept by the sign-bit prefilter, as a multiple of k
+        """
+        if self.quantized is None:
+            raise ValueError("Index was exported without quantized codes (use --quantize or --binary)")
+        all_indices, all_scores = [], []
+        for query in queries:
+            rows = self.quantized.shortlist(query, k * max(rerank, 1), k * prefilter)
+            if rerank:
+                rows = np.sort(rows)  # In file order, for sequential page reads
+                scores = self.vectors[rows] @ query
+            else:
+                scores = self.quantized.score(query, rows)
+            best = top_k(scores, k)
+            indices = np.full(k, -1, dtype=np.int64)
+            values = np.full(k, -np.inf, dtype=np.float32)
+            indices[:len(best)] = rows[best]
+            values[:len(best)] = scores[best]
+            all_indices.append(indices)
+            all_scores.append(values)
+        return np.array(all_indices), np.array(all_scores)
+
+    def search_hnsw(self, queries: np.ndarray, k: int, ef: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate search over the HNSW graph"""
+        if self.hnsw is None:
+            raise ValueError("Index was exported without an HNSW graph (use --hnsw)")
+        # ef is a property of the shared graph, so set and query together
+        with self._hnsw_lock:
+            self.hnsw.set_ef(max(ef, k))
+            labels, distances = self.hnsw.knn_query(queries, k=k)
+        return labels.astype(np.int64), (1.0 - distances).astype(np.float32)
+
+    def search(self, queries: np.ndarray, k: int, method: str = "exact",
+               rows: Optional[np.ndarray] = None, **kwargs) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k search
+
+        Args:
+            queries: (q, dim) query embeddings (normalized here)
+            k: Results per query
+            method: 'exact', 'ivf', 'hnsw' or 'quantized'
+            rows: Restrict the search to these rows (e.g. from
+                MetadataColumns.rows); a filtered slice is scanned exactly,
+                whatever the method
+
+        Returns:
+            (indices, cosine similarities), each shaped (q, k), or
+            (q, len(rows)) if fewer rows than k are allowed
+        """
+        queries = normalize_rows(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if rows is not None:
+            return self.search_rows(queries, k, rows)
+        if method == "exact":
+            return self.search_exact(queries, k)
+        if method == "ivf":
+            return self.search_ivf(queries, k, **kwargs)
+        if method == "hnsw":
+            return self.search_hnsw(queries, k, **kwargs)
+        if method == "quantized":
+            return self.search_quantized(queries, k, **kwargs)
+        raise ValueError(f"Unknown search method: {method}")
+
+    def query(self, query_embeddings, n_results: int = 10, method: str = "exact",
+              rows: Optional[np.ndarray] = None, **kwargs) -> Dict:
+        """Search and return results shaped like collection.query()"""
+        indices, scores = self.search(query_embeddings, n_results, method, rows, **kwargs)
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        for row_indices, row_scores in zip(indices, scores):
+            keep = row_indices >= 0
+            rows = self.chunks.rows(row_indices[keep])
+            results['ids'].append([r['id'] for r in rows])
+            results['documents'].append([r['document'] for r in rows])
+            results['metadatas'].append([r['metadata'] for r in rows])
+            # Chroma reports cosine distance, keep the same convention
+            results['distances'].append([float(1.0 - s) for s in row_scores[keep]])
+        return results
+
+    def close(self):
+        self.chunks.close()
+        del self.vectors
+
+
+def export_options(path: str = INDEX_PATH) -> Dict:
+    """
+    export_index options that rebuild the index at path with the same
+    structures (IVF lists, HNSW graph, quantized codes)
+
+    Returns:
+        Keyword arguments for export_index; empty if there is no index.
+        Quantization switched on by LENNY_INDEX_QUANTIZE/LENNY_INDEX_BINARY
+        is added to what the index already has.
+    """
+    try:
+        with open(Path(path) / "index.json", 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        return {}
+    options = info.get('options')
+    if options is None:
+        # Exported before the options were recorded: infer them
+        quantized = info.get('quantized') or {}
+        options = {
+            'ivf_lists': None if info.get('ivf') else 0,
+            'hnsw': bool(info.get('hnsw')),
+            'quantize': quantized.get('codec'),
+            'binary': bool(quantized.get('binary')),
+            'pq_subvectors': quantized.get('subvectors') or PQ_SUBVECTORS
+        }
+    return dict(options, quantize=options['quantize'] or INDEX_QUANTIZE,
+                binary=options['binary'] or INDEX_BINARY)
+
+
+def export_index(collection, path: str = INDEX_PATH, model_name: str = "",
+                 ivf_lists: Optional[int] = None, hnsw: bool = False,
+                 quantize: Optional[str] = INDEX_QUANTIZE, binary: bool = INDEX_BINARY,
+                 pq_subvectors: int = PQ_SUBVECTORS) -> Dict:
+    """
+    Dump a ChromaDB collection's embeddings, documents and metadata into a
+    VectorIndex directory
+
+    The new index is built next to the old one and published by repointing
+    a symlink (see replace_directory), so readers never see a half-written
+    or missing directory.
+
+    Args:
+        collection: ChromaDB collection
+        path: Output directory
+        model_name: Embedding model recorded in index.json
+        ivf_lists: Number of IVF lists to build (default ~sqrt(count),
+            0 = exact search only)
+        hnsw: Also build an HNSW graph (requires hnswlib)
+        quantize: Also store 'int8' or 'pq' codes for quantized search
+            (default: LENNY_INDEX_QUANTIZE)
+        binary: Also store sign bits for Hamming prefiltering
+            (default: LENNY_INDEX_BINARY=1)
+        pq_subvectors: PQ code bytes per vector
+
+    Returns:
+        The index.json contents
+    """
+    target = Path(path)
+    tmp = target.with_name(target.name + f".tmp-{os.getpid()}")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    start = time.time()
+    total = collection.count()
+    dim = None
+    offsets = [0]
+    metadata_columns = MetadataColumnsWriter()
+    with open(tmp / "vectors.f32", 'wb') as vector_file, open(tmp / "chunks.jsonl", 'wb') as chunk_file:
+        for offset in range(0, total, EXPORT_PAGE_SIZE):
+            page = collection.get(
+                include=['embeddings', 'documents', 'metadatas'],
+                limit=EXPORT_PAGE_SIZE,
+                offset=offset
+            )
+            vectors = normalize_rows(np.asarray(page['embeddings'], dtype=np.float32))
+            dim = dim or vectors.shape[1]
+            vector_file.write(vectors.tobytes())
+            for chunk_id, document, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+                line = json.dumps({'id': chunk_id, 'document': document, 'metadata': metadata},
+                                  ensure_ascii=False).encode('utf-8') + b"\n"
+                chunk_file.write(line)
+                offsets.append(offsets[-1] + len(line))
+                metadata_columns.add(metadata)
+    count = len(offsets) - 1
+    np.save(tmp / "offsets.npy", np.array(offsets, dtype=np.int64))
+    metadata_columns.save(tmp)
+    ivf_lists_option = ivf_lists
+    if ivf_lists is None:
+        ivf_lists = int(np.sqrt(count))
+
+    info = {
+        'version': INDEX_FORMAT_VERSION,
+        'count': count,
+        'dim': dim or 0,
+        'model': model_name,
+        'collection': collection.name,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'ivf': None,
+        'hnsw': None,
+        'quantized': None,
+        # As requested, so re-exports after ingestion build the same structures
+        'options': {'ivf_lists': ivf_lists_option, 'hnsw': hnsw, 'quantize': quantize,
+                    'binary': binary, 'pq_subvectors': pq_subvectors}
+    }
+
+    if count and (ivf_lists or hnsw or quantize or binary):
+        vectors = np.memmap(tmp / "vectors.f32", dtype=np.float32, mode='r', shape=(count, dim))
+        if ivf_lists:
+            n_lists = min(ivf_lists, count)
+            centroids = spherical_kmeans(vectors, n_lists)
+            assign = np.concatenate([
+                np.argmax(vectors[i:i + 10_000] @ centroids.T, axis=1)
+                for i in range(0, count, 10_000)
+            ])
+            rows = np.argsort(assign, kind='stable')
+            list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+            np.save(tmp / "ivf_centroids.npy", centroids)
+            np.save(tmp / "ivf_rows.npy", rows.astype(np.int64))
+            np.save(tmp / "ivf_offsets.npy", list_offsets.astype(np.int64))
+            info['ivf'] = {'n_lists': n_lists}
+        if hnsw:
+            try:
+                import hnswlib
+            except ImportError:
+                raise ImportError("HNSW export needs hnswlib: pip install hnswlib")
+            graph = hnswlib.Index(space='ip', dim=dim)
+            graph.init_index(max_elements=count, ef_construction=200, M=16)
+            graph.add_items(np.asarray(vectors), np.arange(count))
+            graph.save_index(str(tmp / "hnsw.bin"))
+            info['hnsw'] = {'M': 16, 'ef_construction': 200}
+        if quantize or binary:
+            quantized = QuantizedVectors.build(vectors, quantize, pq_subvectors, binary)
+            info['quantized'] = quantized.save(tmp)
+            print(f"🗜️  Quantized vectors: {quantize or 'sign bits'}{' + sign bits' if quantize and binary else ''}, "
+                  f"{quantized.nbytes / 2**20:.1f} MB vs {count * dim * 4 / 2**20:.1f} MB float32")
+        del vectors
+
+    with open(tmp / "index.json", 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+
+    replace_directory(tmp, target)
+
+    print(f"📦 Exported {count} vectors ({dim} dims) to {target} in {time.time() - start:.1f}s")
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local vector index tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Export the ChromaDB collection")
+    export.add_argument("--collection", default="lenny_transcripts")
+    export.add_argument("--path", default=INDEX_PATH)
+    export.add_argument("--ivf-lists", type=int, default=None,
+                        help="IVF lists to build (default ~sqrt of chunk count, 0 to skip)")
+    export.add_argument("--hnsw", action="store_true", help="Build an HNSW graph (needs hnswlib)")
+    export.add_argument("--quantize", choices=QUANTIZERS, default=INDEX_QUANTIZE,
+                        help="Store int8 or product-quantized codes for quantized search")
+    export.add_argument("--pq-subvectors", type=int, default=PQ_SUBVECTORS,
+                        help="PQ code bytes per vector (must divide the dimension)")
+    export.add_argument("--binary", action="store_true", default=INDEX_BINARY,
+                        help="Store sign bits for Hamming prefiltering")
+    args = parser.parse_args()
+
+    import chromadb
+    from embedding_backends import EMBEDDING_BACKENDS, collection_backend
+    client = chromadb.PersistentClient(path="./data/vector_db")
+    collection = client.get_collection(args.collection)
+    backend = collection_backend(collection) or "openai"
+    export_index(collection, args.path, model_name=EMBEDDING_BACKENDS[backend]['model'],
+                 ivf_lists=args.ivf_lists, hnsw=args.hnsw, quantize=args.quantize,
+                 binary=args.binary, pq_subvectors=args.pq_subvectors)
+
+
+if __name__ == "__main__":
+    main()